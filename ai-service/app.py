@@ -21,6 +21,8 @@ from dotenv import load_dotenv
 from app.detector import ParkingSlotDetector
 from app.camera_manager import CameraManager
 from app.config import settings
+from app.inference import InferenceBusyError, InferenceTimeoutError
+from app.loop_monitor import loop_monitor
 
 load_dotenv()
 
@@ -49,11 +51,20 @@ redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True) i
 async def startup_event():
     """Initialize on startup"""
     print("🤖 AI Service starting up...")
+    loop_monitor.interval = settings.LOOP_MONITOR_INTERVAL
+    await loop_monitor.start()
     print("📹 Loading parking slot detection model...")
     await detector.load_model()
     print("✅ AI Service ready!")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the inference pool"""
+    await loop_monitor.stop()
+    await detector.close()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -74,6 +85,17 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Inference queue and event loop lag metrics"""
+    return {
+        "inference": detector.executor.stats(),
+        "batching": detector.batcher.stats(),
+        "event_loop": loop_monitor.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 @app.post("/detect-slots")
 async def detect_slots(
     parking_lot_id: int,
@@ -114,6 +136,10 @@ async def detect_slots(
         
         return JSONResponse(content=results)
     
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except InferenceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection error: {str(e)}")
 
@@ -156,6 +182,10 @@ async def detect_from_url(
         
         return JSONResponse(content=results)
     
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except InferenceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection error: {str(e)}")
 
@@ -29,6 +29,15 @@ class Settings(BaseSettings):
     # Monitoring
     DETECTION_INTERVAL: int = 30  # seconds
     
+    # Inference
+    INFERENCE_EXECUTOR: str = "thread"  # thread, process or inline (blocks the loop)
+    INFERENCE_WORKERS: int = 1
+    INFERENCE_MAX_QUEUE: int = 8  # Jobs waiting for a worker before new ones are rejected
+    INFERENCE_TIMEOUT: float = 10.0  # seconds
+    INFERENCE_BATCH_SIZE: int = 8  # Frames per forward pass
+    INFERENCE_BATCH_WAIT_MS: float = 10.0  # Longest a frame waits for a batch to fill
+    LOOP_MONITOR_INTERVAL: float = 0.25  # seconds
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
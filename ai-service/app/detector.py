@@ -9,32 +9,70 @@ from ultralytics import YOLO
 import torch
 from pathlib import Path
 import asyncio
+import threading
 from datetime import datetime
 
+from app.config import settings
+from app.inference import (
+    InferenceExecutor, InferenceBusyError, InferenceTimeoutError, predict_in_worker
+)
+from app.batching import MicroBatcher
+from app.postprocess import Detections
+
 
 class ParkingSlotDetector:
     """AI-powered parking slot detector"""
     
-    def __init__(self):
+    def __init__(self, executor: Optional[InferenceExecutor] = None):
         self.model: Optional[YOLO] = None
+        self.weights: Optional[str] = None
+        # Ultralytics predictors are not thread-safe: each pool thread gets its own model
+        self.thread_models = threading.local()
+        self.thread_models_lock = threading.Lock()
+        self.model_claimed = False
         self.model_loaded = False
         self.model_path = Path("models/parking_slot_detector.pt")
         self.confidence_threshold = 0.5
+        # Inference runs in a worker pool so it never blocks the event loop
+        self.executor = executor or InferenceExecutor(
+            mode=settings.INFERENCE_EXECUTOR,
+            workers=settings.INFERENCE_WORKERS,
+            max_queue=settings.INFERENCE_MAX_QUEUE,
+            timeout=settings.INFERENCE_TIMEOUT
+        )
+        # Frames from concurrent callers share one forward pass
+        self.batcher = MicroBatcher(
+            self._run_batch,
+            max_batch_size=settings.INFERENCE_BATCH_SIZE,
+            max_wait_ms=settings.INFERENCE_BATCH_WAIT_MS,
+            concurrency=self.executor.workers,
+            max_pending=settings.INFERENCE_MAX_QUEUE * settings.INFERENCE_BATCH_SIZE
+        )
         
     async def load_model(self):
         """Load YOLOv8 model for parking slot detection"""
         try:
             # Try to load custom trained model
             if self.model_path.exists():
-                self.model = YOLO(str(self.model_path))
+                weights = str(self.model_path)
                 print(f"✅ Loaded custom model from {self.model_path}")
             else:
                 # Use pre-trained YOLOv8 model as fallback
                 # In production, you'd train a custom model for parking slots
-                self.model = YOLO("yolov8n.pt")  # nano version for speed
+                weights = "yolov8n.pt"  # nano version for speed
                 print("⚠️  Using pre-trained YOLOv8 model (custom model not found)")
                 print("💡 Train a custom model for better parking slot detection")
             
+            self.weights = weights
+            if self.executor.mode == "process":
+                # Each worker process loads its own copy of the model
+                self.executor.model_path = weights
+            else:
+                # Loading takes a while, so keep it off the event loop too
+                self.model = await asyncio.to_thread(YOLO, weights)
+                self.thread_models = threading.local()
+                self.model_claimed = False
+            
             self.model_loaded = True
             print("✅ Model loaded successfully")
             
@@ -58,8 +96,8 @@ class ParkingSlotDetector:
             await self.load_model()
         
         try:
-            # Run detection
-            results = self.model(image, conf=self.confidence_threshold)
+            # Run detection, batched with other callers' frames
+            results = [await self.batcher.submit(image)]
             
             # Process results
             detections = []
@@ -67,13 +105,10 @@ class ParkingSlotDetector:
             occupied_slots = 0
             
             for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    # Get bounding box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = float(box.conf[0].cpu().numpy())
-                    class_id = int(box.cls[0].cpu().numpy())
-                    class_name = self.model.names[class_id]
+                for (x1, y1, x2, y2), confidence, class_id in zip(
+                    result.boxes.tolist(), result.confidences.tolist(), result.class_ids.tolist()
+                ):
+                    class_name = result.names[class_id]
                     
                     # Filter for vehicles (car, truck, bus, motorcycle)
                     vehicle_classes = ['car', 'truck', 'bus', 'motorcycle', 'van']
@@ -103,6 +138,9 @@ class ParkingSlotDetector:
                 "image_shape": list(image.shape)
             }
             
+        except (InferenceBusyError, InferenceTimeoutError):
+            # Let callers tell overload apart from a broken image or model
+            raise
         except Exception as e:
             print(f"Detection error: {e}")
             return {
@@ -114,6 +152,34 @@ class ParkingSlotDetector:
                 "occupied_slots": 0
             }
     
+    async def _run_batch(self, images: List[np.ndarray]) -> List:
+        """Run one batched forward pass in the inference pool"""
+        if self.executor.mode == "process":
+            return await self.executor.run(predict_in_worker, images, self.confidence_threshold)
+        return await self.executor.run(self._predict, images)
+    
+    def _thread_model(self) -> YOLO:
+        """This pool thread's model; the loaded one serves the first thread, others load a copy"""
+        model = getattr(self.thread_models, "model", None)
+        if model is None:
+            with self.thread_models_lock:
+                if not self.model_claimed or self.weights is None:
+                    model, self.model_claimed = self.model, True
+                else:
+                    model = YOLO(self.weights)
+            self.thread_models.model = model
+        return model
+    
+    def _predict(self, images: List[np.ndarray]) -> List[Detections]:
+        """Run the model synchronously (called from the inference pool)"""
+        results = self._thread_model()(images, conf=self.confidence_threshold, verbose=False)
+        return [Detections.from_result(result) for result in results]
+    
+    async def close(self):
+        """Stop batching and release the inference pool"""
+        await self.batcher.stop()
+        self.executor.shutdown()
+    
     def _estimate_total_slots(self, image: np.ndarray, occupied_count: int) -> int:
         """
         Estimate total parking slots based on image analysis
@@ -0,0 +1,63 @@
+"""
+Event loop lag monitoring
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a sleeping task
+    
+    A healthy loop wakes the monitor within a millisecond or two of the
+    requested interval. Anything blocking the loop (CPU-bound inference,
+    synchronous I/O) shows up directly as lag.
+    """
+    
+    def __init__(self, interval: float = 0.25, window: int = 240):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.task: Optional[asyncio.Task] = None
+    
+    async def _run(self):
+        """Sleep, measure the overshoot, repeat"""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+    
+    async def start(self):
+        """Start monitoring the running loop"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop monitoring"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+    
+    def stats(self) -> Dict:
+        """Lag percentiles over the recent window, in milliseconds"""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(ordered),
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+            "max_ms": self.max_lag * 1000
+        }
+
+
+loop_monitor = LoopLagMonitor()
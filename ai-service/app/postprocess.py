@@ -0,0 +1,48 @@
+"""
+Compact detection results that are cheap to pass between workers
+"""
+
+from typing import Mapping, Optional
+
+import numpy as np
+
+
+def _to_numpy(tensor) -> np.ndarray:
+    """A result tensor (torch or numpy) as a numpy array"""
+    if isinstance(tensor, np.ndarray):
+        return tensor
+    return tensor.cpu().numpy()
+
+
+class Detections:
+    """
+    Detections of one frame as parallel arrays
+    
+    Unlike an ultralytics result it holds no copy of the input frame, so
+    it is small to pickle back from a worker process.
+    """
+    
+    __slots__ = ("boxes", "confidences", "class_ids", "names")
+    
+    def __init__(
+        self,
+        boxes: np.ndarray,
+        confidences: np.ndarray,
+        class_ids: np.ndarray,
+        names: Optional[Mapping[int, str]] = None
+    ):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        self.names = names or {}
+    
+    @classmethod
+    def from_result(cls, result) -> "Detections":
+        """Pull all boxes out of an ultralytics result, copying each tensor once"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), result.names)
+        return cls(_to_numpy(boxes.xyxy), _to_numpy(boxes.conf), _to_numpy(boxes.cls), result.names)
+    
+    def __len__(self) -> int:
+        return len(self.class_ids)
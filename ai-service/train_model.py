@@ -4,8 +4,13 @@ Training script for parking slot detection model using YOLOv8
 
 from ultralytics import YOLO
 from pathlib import Path
+import shutil
+import json
+import random
 import yaml
 import os
+import cv2
+import numpy as np
 
 
 def create_dataset_config():
@@ -85,6 +90,382 @@ def train_model(
     return results
 
 
+def export_detector(
+    weights='models/parking_slot_detector.pt',
+    formats=('onnx',),
+    imgsz=640,
+    batch=1
+):
+    """
+    Export the detector for fast CPU inference
+    
+    Writes each artifact next to the weights, where the backend's
+    INFERENCE_RUNTIME=auto picks the fastest one it can load:
+    
+    - onnx:        parking_slot_detector.onnx (needs onnxruntime)
+    - openvino:    parking_slot_detector_openvino_model/ (needs openvino)
+    - torchscript: parking_slot_detector.torchscript
+    
+    Shapes are fixed (no dynamic axes) so the runtimes can plan memory and
+    pick kernels ahead of time; the backend pads batches to `batch`. Keep
+    `batch` at 1 unless most batches are full, or padding wastes the gain.
+    
+    Args:
+        weights: Trained PyTorch weights
+        formats: Any of onnx, openvino, torchscript
+        imgsz: Input size baked into the artifacts
+        batch: Batch size baked into the artifacts
+    """
+    weights = Path(weights)
+    if not weights.exists():
+        print(f"⚠️  {weights} not found, train the model first")
+        return {}
+    
+    targets = {
+        'onnx': weights.with_suffix('.onnx'),
+        'openvino': weights.parent / f'{weights.stem}_openvino_model',
+        'torchscript': weights.with_suffix('.torchscript'),
+    }
+    exported = {}
+    for fmt in formats:
+        print(f"📦 Exporting {fmt} (imgsz={imgsz}, batch={batch})...")
+        options = {'simplify': True, 'opset': 12} if fmt == 'onnx' else {}
+        artifact = Path(YOLO(str(weights)).export(
+            format=fmt, imgsz=imgsz, batch=batch, dynamic=False, **options
+        ))
+        target = targets[fmt]
+        if artifact.resolve() != target.resolve():
+            if target.is_dir():
+                shutil.rmtree(target)
+            elif target.exists():
+                target.unlink()
+            shutil.move(str(artifact), target)
+        exported[fmt] = str(target)
+        print(f"✅ {fmt} model saved to {target}")
+    
+    manifest = weights.with_name(f'{weights.stem}.export.json')
+    previous = json.loads(manifest.read_text()) if manifest.exists() else {}
+    if (previous.get('imgsz'), previous.get('batch')) == (imgsz, batch):
+        # Same shapes, so earlier exports stay valid
+        previous['formats'] = {**previous.get('formats', {}), **exported}
+    else:
+        previous = {'imgsz': imgsz, 'batch': batch, 'formats': exported}
+    manifest.write_text(json.dumps(previous, indent=2))
+    print(f"💡 Copy {weights.parent}/{weights.stem}* to backend/models/ to use them")
+    return exported
+
+
+def letterbox(image, imgsz):
+    """Resize keeping aspect ratio and pad to a square, as ultralytics does"""
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    resized = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return canvas
+
+
+class CalibrationReader:
+    """Feeds letterboxed validation images to the ONNX Runtime calibrator"""
+    
+    def __init__(self, images, input_name, imgsz, batch):
+        self.images = list(images)
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self.batch = batch
+        self.position = 0
+    
+    def get_next(self):
+        frames = []
+        while not frames:
+            if self.position >= len(self.images):
+                return None
+            paths = self.images[self.position:self.position + self.batch]
+            self.position += self.batch
+            # Skip files OpenCV cannot read (stray non-images, truncated files)
+            images = [cv2.imread(str(path)) for path in paths]
+            frames = [letterbox(image, self.imgsz) for image in images if image is not None]
+        frames += [frames[-1]] * (self.batch - len(frames))
+        blob = np.stack(frames)[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32) / 255
+        return {self.input_name: np.ascontiguousarray(blob)}
+    
+    def rewind(self):
+        self.position = 0
+
+
+def split_images(data, split='val'):
+    """Image files of a dataset split, resolved from the dataset config as ultralytics does"""
+    config_path = Path(data)
+    config = yaml.safe_load(config_path.read_text())
+    root = Path(config.get('path') or config_path.parent)
+    if not root.is_absolute() and not root.exists():
+        root = config_path.parent / root
+    return sorted(path for path in (root / config[split]).glob('*') if path.is_file())
+
+
+def box_iou(a, b):
+    """Pairwise IoU of two sets of xyxy boxes"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def label_path(image_path):
+    """The YOLO label file of an image (the last images/ directory becomes labels/), as ultralytics maps them"""
+    parts = list(Path(image_path).parts)
+    if 'images' in parts:
+        parts[len(parts) - 1 - parts[::-1].index('images')] = 'labels'
+    return Path(*parts).with_suffix('.txt')
+
+
+def slot_accuracy(model_path, data='dataset/dataset.yaml', split='val', imgsz=640, batch=1, limit=None):
+    """
+    Share of labelled slots the model finds with the right status
+    
+    A labelled slot counts as correct when a detection of the same class
+    (empty_slot / occupied_slot) overlaps it with IoU of at least 0.5.
+    Images go through the model `batch` at a time, the last batch padded
+    with repeats, so exports with a fixed batch size can be evaluated.
+    """
+    model = YOLO(str(model_path), task='detect')
+    counts = [0, 0]  # correct, total
+    
+    def score(chunk):
+        images = [image for image, _, _ in chunk]
+        images += [images[-1]] * (batch - len(images))
+        results = model(images, imgsz=imgsz, batch=batch, verbose=False)
+        for (_, truth, truth_classes), result in zip(chunk, results):
+            boxes = result.boxes.xyxy.cpu().numpy()
+            classes = result.boxes.cls.cpu().numpy().astype(int)
+            counts[1] += len(truth)
+            if len(boxes):
+                iou = box_iou(truth, boxes)
+                iou[truth_classes[:, None] != classes[None, :]] = 0
+                counts[0] += int((iou.max(axis=1) >= 0.5).sum())
+    
+    chunk = []
+    for image_path in split_images(data, split)[:limit]:
+        labels_path = label_path(image_path)
+        image = cv2.imread(str(image_path))
+        if image is None or not labels_path.exists():
+            continue
+        height, width = image.shape[:2]
+        labels = np.array([
+            [float(value) for value in line.split()[:5]]
+            for line in labels_path.read_text().splitlines() if len(line.split()) >= 5
+        ]).reshape(-1, 5)
+        if not len(labels):
+            continue
+        cx, cy, w, h = labels[:, 1] * width, labels[:, 2] * height, labels[:, 3] * width, labels[:, 4] * height
+        truth = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        chunk.append((image, truth, labels[:, 0].astype(int)))
+        if len(chunk) == batch:
+            score(chunk)
+            chunk = []
+    if chunk:
+        score(chunk)
+    correct, total = counts
+    return correct / total if total else 0.0
+
+
+def evaluate_detector(model_path, data='dataset/dataset.yaml', imgsz=640, batch=1):
+    """mAP and per-slot accuracy of a detector on the validation split"""
+    metrics = YOLO(str(model_path), task='detect').val(
+        data=data, imgsz=imgsz, batch=batch, split='val', plots=False, verbose=False
+    )
+    return {
+        'map50': float(metrics.box.map50),
+        'map50_95': float(metrics.box.map),
+        'slot_accuracy': slot_accuracy(model_path, data, 'val', imgsz, batch)
+    }
+
+
+def quantize_detector(
+    weights='models/parking_slot_detector.pt',
+    method='static',
+    calibration_images=200,
+    max_map_drop=0.01,
+    max_slot_accuracy_drop=0.01,
+    data='dataset/dataset.yaml'
+):
+    """
+    Quantize the ONNX detector to INT8 and publish it only if accuracy holds
+    
+    Static quantization calibrates activation ranges on a sample of the
+    validation images listed in `data`; dynamic quantization needs no calibration but
+    quantizes weights only. The INT8 model is compared with the FP32 ONNX
+    model on mAP50-95 and per-slot accuracy, and written to
+    parking_slot_detector.int8.onnx (which the backend prefers) only if
+    neither drops by more than its budget.
+    
+    Args:
+        weights: Trained PyTorch weights (the FP32 ONNX export sits next to them)
+        method: "static" or "dynamic"
+        calibration_images: Validation images used for calibration
+        max_map_drop: Largest acceptable mAP50-95 drop (absolute)
+        max_slot_accuracy_drop: Largest acceptable per-slot accuracy drop (absolute)
+        data: Dataset config used for calibration and evaluation
+    
+    Returns:
+        True if the INT8 model was published
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationMethod, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+    
+    weights = Path(weights)
+    manifest_path = weights.with_name(f'{weights.stem}.export.json')
+    fp32_path = weights.with_suffix('.onnx')
+    if not fp32_path.exists():
+        export_detector(weights, formats=('onnx',))
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    imgsz = manifest.get('imgsz', 640)
+    batch = manifest.get('batch', 1)
+    
+    candidate = weights.with_suffix('.int8.candidate.onnx')
+    print(f"🧮 Quantizing {fp32_path} to INT8 ({method})...")
+    if method == 'static':
+        images = split_images(data, 'val')
+        random.Random(0).shuffle(images)
+        input_name = onnx.load(str(fp32_path), load_external_data=False).graph.input[0].name
+        reader = CalibrationReader(images[:calibration_images], input_name, imgsz, batch)
+        quantize_static(
+            str(fp32_path), str(candidate), reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax
+        )
+    else:
+        quantize_dynamic(str(fp32_path), str(candidate), weight_type=QuantType.QUInt8)
+    
+    # Keep the class names and strides ultralytics reads from the model metadata
+    source = onnx.load(str(fp32_path))
+    quantized = onnx.load(str(candidate))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, str(candidate))
+    
+    print("📏 Evaluating FP32 and INT8 models...")
+    fp32 = evaluate_detector(fp32_path, data, imgsz, batch)
+    int8 = evaluate_detector(candidate, data, imgsz, batch)
+    map_drop = fp32['map50_95'] - int8['map50_95']
+    accuracy_drop = fp32['slot_accuracy'] - int8['slot_accuracy']
+    print(f"   FP32: mAP50-95 {fp32['map50_95']:.4f}, slot accuracy {fp32['slot_accuracy']:.4f}")
+    print(f"   INT8: mAP50-95 {int8['map50_95']:.4f}, slot accuracy {int8['slot_accuracy']:.4f}")
+    
+    if map_drop > max_map_drop or accuracy_drop > max_slot_accuracy_drop:
+        candidate.unlink()
+        print(f"❌ INT8 model not published: mAP drop {map_drop:.4f} (budget {max_map_drop}), "
+              f"slot accuracy drop {accuracy_drop:.4f} (budget {max_slot_accuracy_drop})")
+        return False
+    
+    target = weights.with_suffix('.int8.onnx')
+    shutil.move(str(candidate), target)
+    manifest.setdefault('imgsz', imgsz)
+    manifest.setdefault('batch', batch)
+    manifest['int8'] = {'method': method, 'fp32': fp32, 'int8': int8}
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    print(f"✅ INT8 model saved to {target}")
+    return True
+
+
+def prepare_slot_crops(dataset='dataset', output='dataset/crops', splits=('train', 'val')):
+    """
+    Cut every labelled slot out of the detection dataset for the crop classifier
+    
+    Writes output/<split>/<empty|occupied>/<image>_<n>.jpg from the YOLO labels
+    (class 0 = empty_slot, 1 = occupied_slot).
+    """
+    class_dirs = {0: 'empty', 1: 'occupied'}
+    counts = {name: 0 for name in class_dirs.values()}
+    
+    for split in splits:
+        image_dir = Path(dataset) / 'images' / split
+        label_dir = Path(dataset) / 'labels' / split
+        for name in class_dirs.values():
+            os.makedirs(Path(output) / split / name, exist_ok=True)
+        
+        for image_path in sorted(image_dir.glob('*')):
+            label_path = label_dir / f'{image_path.stem}.txt'
+            image = cv2.imread(str(image_path))
+            if image is None or not label_path.exists():
+                continue
+            height, width = image.shape[:2]
+            for index, line in enumerate(label_path.read_text().splitlines()):
+                parts = line.split()
+                if len(parts) < 5 or int(parts[0]) not in class_dirs:
+                    continue
+                cx, cy, w, h = (float(value) for value in parts[1:5])
+                x1, y1 = max(0, int((cx - w / 2) * width)), max(0, int((cy - h / 2) * height))
+                x2, y2 = min(width, int((cx + w / 2) * width)), min(height, int((cy + h / 2) * height))
+                if x2 <= x1 or y2 <= y1:
+                    continue
+                name = class_dirs[int(parts[0])]
+                cv2.imwrite(str(Path(output) / split / name / f'{image_path.stem}_{index}.jpg'), image[y1:y2, x1:x2])
+                counts[name] += 1
+    
+    print(f"✅ Wrote slot crops to {output}: {counts['empty']} empty, {counts['occupied']} occupied")
+    return counts
+
+
+def train_slot_classifier(
+    epochs=30,
+    imgsz=64,
+    batch=64,
+    data='dataset/crops'
+):
+    """
+    Train the tiny empty/occupied classifier used by the backend's crop engine
+    
+    Fine-tunes YOLOv8n-cls on slot crops and exports it to ONNX with a dynamic
+    batch size, so the backend can classify all slots of a frame in one pass
+    with OpenCV alone.
+    
+    Args:
+        epochs: Number of training epochs
+        imgsz: Crop size (must match SLOT_CLASSIFIER_INPUT_SIZE in the backend)
+        batch: Batch size
+        data: Folder with train/ and val/ crops (see prepare_slot_crops)
+    """
+    print("🚀 Starting slot classifier training...")
+    print(f"📐 Crop size: {imgsz}")
+    print(f"🔄 Epochs: {epochs}")
+    
+    model = YOLO('yolov8n-cls.pt')
+    results = model.train(
+        data=data,
+        epochs=epochs,
+        imgsz=imgsz,
+        batch=batch,
+        name='slot_classifier',
+        project='runs',
+        patience=10,
+        plots=True,
+        device='cuda' if os.system('nvidia-smi') == 0 else 'cpu'
+    )
+    
+    best_model_path = Path(model.trainer.best)
+    if not best_model_path.exists():
+        print("⚠️  Best classifier not found, check training results")
+        return results
+    
+    exported = YOLO(str(best_model_path)).export(format='onnx', imgsz=imgsz, dynamic=True)
+    target_path = Path('models/slot_classifier.onnx')
+    os.makedirs('models', exist_ok=True)
+    shutil.copy(exported, target_path)
+    print(f"✅ Slot classifier saved to {target_path}")
+    print("💡 Copy it to backend/models/ and set a lot's detection_engine to \"classifier\"")
+    return results
+
+
 def prepare_dataset_structure():
     """Create dataset directory structure"""
     dirs = [
@@ -124,12 +505,39 @@ if __name__ == "__main__":
     parser.add_argument('--imgsz', type=int, default=640, help='Image size')
     parser.add_argument('--batch', type=int, default=16, help='Batch size')
     parser.add_argument('--prepare', action='store_true', help='Prepare dataset structure only')
+    parser.add_argument('--classifier', action='store_true',
+                        help='Train the per-slot crop classifier instead of the detector')
+    parser.add_argument('--export', nargs='+', choices=['onnx', 'openvino', 'torchscript'],
+                        help='Export the trained detector for CPU inference instead of training')
+    parser.add_argument('--export-batch', type=int, default=1, help='Batch size baked into exports')
+    parser.add_argument('--quantize', choices=['static', 'dynamic'],
+                        help='Quantize the ONNX detector to INT8, published only within the accuracy budget')
+    parser.add_argument('--calibration-images', type=int, default=200,
+                        help='Validation images used to calibrate static quantization')
+    parser.add_argument('--max-map-drop', type=float, default=0.01,
+                        help='Largest mAP50-95 drop the INT8 model may show')
+    parser.add_argument('--max-slot-accuracy-drop', type=float, default=0.01,
+                        help='Largest per-slot accuracy drop the INT8 model may show')
     
     args = parser.parse_args()
     
     if args.prepare:
         prepare_dataset_structure()
         create_dataset_config()
+    elif args.export:
+        export_detector(formats=args.export, imgsz=args.imgsz, batch=args.export_batch)
+    elif args.quantize:
+        published = quantize_detector(
+            method=args.quantize,
+            calibration_images=args.calibration_images,
+            max_map_drop=args.max_map_drop,
+            max_slot_accuracy_drop=args.max_slot_accuracy_drop
+        )
+        raise SystemExit(0 if published else 1)
+    elif args.classifier:
+        if not Path('dataset/crops/train').exists():
+            prepare_slot_crops()
+        train_slot_classifier(epochs=args.epochs, imgsz=64, batch=args.batch)
     else:
         # Check if dataset exists
         if not Path('dataset/dataset.yaml').exists():
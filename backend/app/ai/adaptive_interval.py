@@ -0,0 +1,197 @@
+"""
+Adaptive monitoring intervals from scene activity, time of day and bookings
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking, BookingStatus
+
+# Bookings whose start or end is worth watching for
+WATCHED_STATUSES = (BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.ACTIVE)
+
+
+def parse_profile(spec: str) -> np.ndarray:
+    """
+    Interval multipliers by hour of day from "start-end:multiplier,..."
+    
+    Hours run from `start` up to, not including, `end`; hours not listed
+    keep a multiplier of 1. "0-6:4,16-19:0.5" polls four times less often
+    at night and twice as often in the evening rush.
+    """
+    profile = np.ones(24)
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        hours, multiplier = part.split(":")
+        start, end = (int(hour) for hour in hours.split("-"))
+        profile[start:end] = float(multiplier)
+    return profile
+
+
+def _timestamp(value: datetime) -> float:
+    """Epoch seconds; naive datetimes are UTC, as stored by the booking endpoints"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class BookingCalendar:
+    """
+    Upcoming booking starts and ends per parking lot
+    
+    Loaded for all monitored lots with one query and refreshed every
+    `refresh` seconds, so the schedule can tighten around the moments
+    cars are expected to arrive or leave.
+    """
+    
+    def __init__(self, horizon: float = 3600.0, window: float = 120.0, refresh: float = 60.0):
+        self.horizon = horizon
+        self.window = window
+        self.refresh = refresh
+        self.boundaries: Dict[int, np.ndarray] = {}
+        self.loaded_at: Optional[float] = None
+    
+    def stale(self, now: float) -> bool:
+        return self.loaded_at is None or now - self.loaded_at >= self.refresh
+    
+    def load(self, db: Session, parking_lot_ids: Iterable[int], now: float):
+        """Read the starts and ends within the horizon of bookings at these lots"""
+        lot_ids = list(parking_lot_ids)
+        self.loaded_at = now
+        if not lot_ids:
+            self.boundaries = {}
+            return
+        current = datetime.utcfromtimestamp(now)
+        rows = (
+            db.query(Booking.parking_lot_id, Booking.start_time, Booking.end_time)
+            .filter(
+                Booking.parking_lot_id.in_(lot_ids),
+                Booking.status.in_(WATCHED_STATUSES),
+                Booking.end_time >= current - timedelta(seconds=self.window),
+                Booking.start_time <= current + timedelta(seconds=self.horizon)
+            )
+            .all()
+        )
+        times: Dict[int, list] = {}
+        for parking_lot_id, start_time, end_time in rows:
+            times.setdefault(parking_lot_id, []).extend((_timestamp(start_time), _timestamp(end_time)))
+        self.boundaries = {lot_id: np.sort(np.array(values)) for lot_id, values in times.items()}
+    
+    def until_window(self, parking_lot_id: int, now: float) -> Optional[float]:
+        """
+        Seconds until the next booking start or end is within `window`
+        
+        0 while one is; None if none is coming up.
+        """
+        boundaries = self.boundaries.get(parking_lot_id)
+        if boundaries is None:
+            return None
+        ahead = boundaries[boundaries >= now - self.window]
+        if ahead.size == 0:
+            return None
+        return max(0.0, float(ahead[0]) - self.window - now)
+
+
+class LotPolicy:
+    """A lot's interval bounds and recent activity"""
+    
+    __slots__ = ("base", "min_interval", "max_interval", "activity", "updated", "interval")
+    
+    def __init__(self, base: float, min_interval: float, max_interval: float):
+        self.base = base
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.activity = 0.0
+        self.updated: Optional[float] = None
+        self.interval = base
+
+
+class IntervalPolicy:
+    """
+    Chooses each monitored lot's next interval
+    
+    Starting from the lot's base interval:
+    
+    - time of day: multiplied by the hour's entry in `profile`
+    - activity: divided by sqrt(1 + `activity_gain` x recent slot
+      transitions), counted with an exponential decay of `half_life`
+      seconds, so a busy lot is polled more often and a quiet one settles
+      back. Waiting for a transition costs about half an interval, so
+      total delay plus ticks is smallest with intervals proportional to
+      1 / sqrt(transition rate).
+    - bookings: no longer than `booking_interval` while a booking starts or
+      ends within the calendar's window, and short enough to wake up when
+      the next such window opens
+    
+    and finally kept within the lot's own minimum and maximum.
+    """
+    
+    def __init__(
+        self,
+        calendar: Optional[BookingCalendar] = None,
+        profile: Optional[np.ndarray] = None,
+        half_life: float = 600.0,
+        activity_gain: float = 0.1,
+        booking_interval: float = 15.0
+    ):
+        self.calendar = calendar or BookingCalendar()
+        self.profile = profile if profile is not None else np.ones(24)
+        self.half_life = half_life
+        self.activity_gain = activity_gain
+        self.booking_interval = booking_interval
+        self.lots: Dict[int, LotPolicy] = {}
+    
+    def add(self, parking_lot_id: int, base: float, min_interval: float, max_interval: float):
+        self.lots[parking_lot_id] = LotPolicy(base, min_interval, max(min_interval, max_interval))
+    
+    def remove(self, parking_lot_id: int):
+        self.lots.pop(parking_lot_id, None)
+    
+    def _decay(self, lot: LotPolicy, now: float):
+        if lot.updated is not None:
+            lot.activity *= math.exp(-math.log(2) * max(0.0, now - lot.updated) / self.half_life)
+        lot.updated = now
+    
+    def record(self, parking_lot_id: int, transitions: int, now: float):
+        """Count slot status changes seen by a tick"""
+        lot = self.lots.get(parking_lot_id)
+        if lot is not None:
+            self._decay(lot, now)
+            lot.activity += transitions
+    
+    def interval(self, parking_lot_id: int, now: float, hour: Optional[int] = None) -> float:
+        """
+        Seconds until the lot's next tick
+        
+        Args:
+            now: Epoch seconds
+            hour: Local hour of day (from the clock if None)
+        """
+        lot = self.lots[parking_lot_id]
+        if hour is None:
+            hour = datetime.now().hour
+        self._decay(lot, now)
+        interval = lot.base * self.profile[hour] / math.sqrt(1 + self.activity_gain * lot.activity)
+        
+        until_window = self.calendar.until_window(parking_lot_id, now)
+        if until_window is not None:
+            interval = min(interval, until_window if until_window > 0 else self.booking_interval)
+        
+        lot.interval = float(min(max(interval, lot.min_interval), lot.max_interval))
+        return lot.interval
+    
+    def stats(self) -> Dict:
+        """Current intervals across monitored lots, in seconds"""
+        intervals = [lot.interval for lot in self.lots.values()]
+        if not intervals:
+            return {"lots": 0, "active": 0, "mean_interval": 0.0, "min_interval": 0.0, "max_interval": 0.0}
+        return {
+            "lots": len(intervals),
+            "active": sum(1 for lot in self.lots.values() if lot.activity >= 0.5),
+            "mean_interval": round(float(np.mean(intervals)), 2),
+            "min_interval": round(min(intervals), 2),
+            "max_interval": round(max(intervals), 2),
+        }
@@ -0,0 +1,152 @@
+"""
+Dynamic micro-batching for model inference
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.ai.inference import InferenceBusyError
+
+
+class MicroBatcher:
+    """
+    Groups frames from concurrent callers into batched forward passes
+    
+    A batch is dispatched once it holds `max_batch_size` frames or its first
+    frame has waited `max_wait_ms`, whichever comes first. While every worker
+    is busy, new frames keep accumulating, so batches grow with load and stay
+    small (low latency) when the service is quiet. Each caller gets back the
+    result for its own frame.
+    """
+    
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        concurrency: int = 1,
+        max_pending: int = 64
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max_pending
+        self.queue: Optional[asyncio.Queue] = None
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.in_flight: set = set()
+        self.collecting: List[Tuple[Any, asyncio.Future, float]] = []
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.queue_seconds = 0.0
+    
+    def _ensure_started(self):
+        """Start the dispatcher on the running loop"""
+        if self.dispatcher is None or self.dispatcher.done():
+            self.queue = asyncio.Queue()
+            self.slots = asyncio.Semaphore(self.concurrency)
+            self.dispatcher = asyncio.create_task(self._dispatch())
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one frame and wait for its result
+        
+        Raises:
+            InferenceBusyError: too many frames are already waiting
+        """
+        self._ensure_started()
+        if self.queue.qsize() >= self.max_pending:
+            self.rejected += 1
+            raise InferenceBusyError(f"Inference batch queue full ({self.queue.qsize()} frames waiting)")
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+    
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Wait for a first frame, then gather more until the batch is full or due"""
+        self.collecting = batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _dispatch(self):
+        """Form batches and hand them to free workers"""
+        while True:
+            # Only collect while a worker is free, so frames queue up behind busy ones
+            await self.slots.acquire()
+            try:
+                batch = await self._collect()
+            except asyncio.CancelledError:
+                self.slots.release()
+                raise
+            self.collecting = []
+            task = asyncio.create_task(self._run(batch))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+    
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        """Run one batch and route each result back to its caller"""
+        try:
+            started = time.perf_counter()
+            self.batches += 1
+            self.items += len(batch)
+            self.queue_seconds += sum(started - queued for _, _, queued in batch)
+            try:
+                results = await self.run_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} frames")
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (_, future, _), result in zip(batch, results):
+                # The caller may have given up (cancelled) while the batch ran
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.slots.release()
+    
+    def stats(self) -> Dict:
+        """Batch size and queueing counters"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "waiting": self.queue.qsize() if self.queue else 0,
+            "batches": self.batches,
+            "frames": self.items,
+            "rejected": self.rejected,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "avg_queue_ms": self.queue_seconds / self.items * 1000 if self.items else 0.0
+        }
+    
+    async def stop(self):
+        """Stop dispatching and fail frames not yet handed to a worker"""
+        if self.dispatcher:
+            self.dispatcher.cancel()
+            try:
+                await self.dispatcher
+            except asyncio.CancelledError:
+                pass
+            self.dispatcher = None
+        waiting = self.collecting
+        self.collecting = []
+        while self.queue is not None and not self.queue.empty():
+            waiting.append(self.queue.get_nowait())
+        for _, future, _ in waiting:
+            if not future.done():
+                future.set_exception(InferenceBusyError("Inference is shutting down"))
@@ -0,0 +1,175 @@
+"""
+Per-camera health with circuit breakers
+"""
+
+import time
+from typing import Dict, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CameraHealth:
+    """A monitored camera's fetch record and breaker state"""
+    
+    __slots__ = (
+        "key", "state", "successes", "failures", "consecutive_failures", "success_rate",
+        "latency", "backoff", "retry_at", "last_success", "last_failure"
+    )
+    
+    def __init__(self, key: int):
+        self.key = key
+        self.state = CLOSED
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        # Exponentially weighted, so recent fetches count most
+        self.success_rate = 1.0
+        self.latency: Optional[float] = None
+        self.backoff = 0.0
+        self.retry_at: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_failure: Optional[float] = None
+    
+    def to_dict(self, now: float) -> Dict:
+        return {
+            "parking_lot_id": self.key,
+            "state": self.state,
+            "success_rate": round(self.success_rate, 3),
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retry_in": round(max(0.0, self.retry_at - now), 1) if self.retry_at is not None else None,
+            "last_success": self.last_success,
+            "last_failure": self.last_failure,
+        }
+
+
+class CameraHealthTracker:
+    """
+    Tracks monitored cameras and takes failing ones out of rotation
+    
+    Each camera's breaker starts closed. After `failure_threshold` failed
+    fetches in a row it opens: the camera is not tried again for
+    `backoff_min` seconds, doubling with every further failure up to
+    `backoff_max`. The first tick after that is a half-open probe. If it
+    succeeds, the breaker closes and the camera returns to its usual
+    interval. If it fails, the breaker opens again with a longer backoff.
+    
+    Success rate and latency are exponentially weighted moving averages
+    in which the newest fetch has weight `alpha`.
+    """
+    
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        backoff_min: float = 60.0,
+        backoff_max: float = 1800.0,
+        alpha: float = 0.2
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.backoff_min = backoff_min
+        self.backoff_max = max(backoff_min, backoff_max)
+        self.alpha = alpha
+        self.cameras: Dict[int, CameraHealth] = {}
+        self.trips = 0
+        self.recoveries = 0
+    
+    def _camera(self, key: int) -> CameraHealth:
+        camera = self.cameras.get(key)
+        if camera is None:
+            camera = self.cameras[key] = CameraHealth(key)
+        return camera
+    
+    def remove(self, key: int):
+        self.cameras.pop(key, None)
+    
+    def allow(self, key: int, now: Optional[float] = None) -> bool:
+        """
+        Whether a camera may be fetched now
+        
+        An open breaker whose backoff has passed turns half-open and lets
+        the fetch through as a probe.
+        """
+        camera = self.cameras.get(key)
+        if camera is None or camera.state != OPEN:
+            return True
+        now = time.time() if now is None else now
+        if now < camera.retry_at:
+            return False
+        camera.state = HALF_OPEN
+        return True
+    
+    def record_success(self, key: int, latency: float, now: Optional[float] = None) -> bool:
+        """Count a successful fetch; whether it closed an open or half-open breaker"""
+        camera = self._camera(key)
+        camera.successes += 1
+        camera.consecutive_failures = 0
+        camera.success_rate += self.alpha * (1.0 - camera.success_rate)
+        camera.latency = latency if camera.latency is None else camera.latency + self.alpha * (latency - camera.latency)
+        camera.last_success = time.time() if now is None else now
+        
+        recovered = camera.state != CLOSED
+        if recovered:
+            self.recoveries += 1
+        camera.state, camera.backoff, camera.retry_at = CLOSED, 0.0, None
+        return recovered
+    
+    def record_failure(self, key: int, now: Optional[float] = None) -> Optional[float]:
+        """
+        Count a failed fetch
+        
+        Returns:
+            Seconds until the camera should be tried again if the breaker is
+            now open, or None while it stays closed
+        """
+        camera = self._camera(key)
+        now = time.time() if now is None else now
+        camera.failures += 1
+        camera.consecutive_failures += 1
+        camera.success_rate -= self.alpha * camera.success_rate
+        camera.last_failure = now
+        
+        if camera.state == CLOSED and camera.consecutive_failures < self.failure_threshold:
+            return None
+        if camera.state == CLOSED:
+            self.trips += 1
+            camera.backoff = self.backoff_min
+        else:
+            # A failed probe: back off for longer
+            camera.backoff = min(camera.backoff * 2, self.backoff_max)
+        camera.state = OPEN
+        camera.retry_at = now + camera.backoff
+        return camera.backoff
+    
+    def retry_in(self, key: int, now: Optional[float] = None) -> float:
+        """Seconds until an open breaker lets a probe through (0 if not open)"""
+        camera = self.cameras.get(key)
+        if camera is None or camera.state != OPEN:
+            return 0.0
+        now = time.time() if now is None else now
+        return max(0.0, camera.retry_at - now)
+    
+    def state(self, key: int) -> str:
+        camera = self.cameras.get(key)
+        return camera.state if camera is not None else CLOSED
+    
+    def snapshot(self, now: Optional[float] = None) -> List[Dict]:
+        """Health of every tracked camera, unhealthy first"""
+        now = time.time() if now is None else now
+        order = {OPEN: 0, HALF_OPEN: 1, CLOSED: 2}
+        cameras = sorted(self.cameras.values(), key=lambda camera: (order[camera.state], camera.key))
+        return [camera.to_dict(now) for camera in cameras]
+    
+    def stats(self) -> Dict:
+        states = [camera.state for camera in self.cameras.values()]
+        return {
+            "cameras": len(states),
+            "closed": states.count(CLOSED),
+            "open": states.count(OPEN),
+            "half_open": states.count(HALF_OPEN),
+            "trips": self.trips,
+            "recoveries": self.recoveries,
+        }
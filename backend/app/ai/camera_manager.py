@@ -2,57 +2,257 @@
 Camera Manager for fetching and processing camera feeds
 """
 
-import cv2
 import numpy as np
 import aiohttp
 import asyncio
-from typing import Optional, Dict
+import time
+from typing import Callable, Optional, Dict, Tuple, Union
 from datetime import datetime
 import logging
 
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.ai.adaptive_interval import BookingCalendar, IntervalPolicy, parse_profile
+from app.ai.camera_health import CameraHealthTracker
+from app.ai.monitoring_registry import active_assignments
+from app.ai.preprocess import decode_image, jpeg_size, restore_scale
+from app.ai.results_sink import ResultsSink
+from app.ai.scheduler import CameraScheduler
+from app.ai.slot_layout import lot_detection_config
+from app.ai.stream_reader import StreamReader, is_stream_url, read_one_frame
+
 logger = logging.getLogger(__name__)
 
+# Returned by conditional fetches when the camera's snapshot is unchanged (HTTP 304)
+NOT_MODIFIED = object()
+
 
 class CameraManager:
     """Manages camera feeds and monitoring"""
     
     def __init__(self):
-        self.monitoring_tasks: Dict[int, asyncio.Task] = {}
         self.camera_urls: Dict[int, str] = {}
+        # Runs every monitored lot's ticks within a global concurrency budget
+        self.scheduler = CameraScheduler(
+            self._monitor_tick,
+            max_concurrent=settings.CAMERA_MAX_CONCURRENT,
+            jitter=settings.CAMERA_SCHEDULE_JITTER
+        )
+        # Each lot's next interval, from its activity, the hour and upcoming bookings
+        self.intervals = IntervalPolicy(
+            BookingCalendar(
+                horizon=settings.CAMERA_BOOKING_HORIZON,
+                window=settings.CAMERA_BOOKING_WINDOW,
+                refresh=settings.CAMERA_BOOKING_REFRESH
+            ),
+            profile=parse_profile(settings.CAMERA_INTERVAL_PROFILE),
+            half_life=settings.CAMERA_ACTIVITY_HALF_LIFE,
+            activity_gain=settings.CAMERA_ACTIVITY_GAIN,
+            booking_interval=settings.CAMERA_BOOKING_INTERVAL
+        )
+        # Per-camera fetch record; failing cameras are backed off by a circuit breaker
+        self.health = CameraHealthTracker(
+            failure_threshold=settings.CAMERA_FAILURE_THRESHOLD,
+            backoff_min=settings.CAMERA_BACKOFF_MIN,
+            backoff_max=settings.CAMERA_BACKOFF_MAX,
+            alpha=settings.CAMERA_HEALTH_ALPHA
+        )
+        # Writes every lot's results to the database, Redis and WebSocket subscribers in batches
+        self.results_sink = ResultsSink(
+            flush_interval=settings.RESULTS_FLUSH_INTERVAL,
+            batch_max_size=settings.RESULTS_BATCH_MAX_SIZE,
+            cache_ttl=settings.RESULTS_CACHE_TTL
+        )
+        self.detector = None
+        # Results of each lot's last tick, reused while its camera shows nothing new
+        self.last_results: Dict[int, Dict] = {}
+        # Shared by all fetches, so connections to a camera are kept alive
+        self.session: Optional[aiohttp.ClientSession] = None
+        # (ETag, Last-Modified) of the last snapshot fetched conditionally, per URL
+        self.validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self.counters = {"requests": 0, "not_modified": 0, "errors": 0, "bytes": 0}
+        # One background reader per RTSP/MJPEG stream, shared by the lots watching it
+        self.stream_readers: Dict[str, StreamReader] = {}
+        # Sequence number of the last stream frame analysed, per lot
+        self.frame_ids: Dict[int, int] = {}
+        # Detection engine chosen for a lot's monitoring, overriding the lot's own
+        self.engines: Dict[int, Optional[str]] = {}
+    
+    def _session(self) -> aiohttp.ClientSession:
+        """The pooled HTTP session, created on first use"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.CAMERA_HTTP_POOL_SIZE,
+                limit_per_host=settings.CAMERA_HTTP_PER_HOST,
+                keepalive_timeout=settings.CAMERA_HTTP_KEEPALIVE
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=settings.CAMERA_FETCH_TIMEOUT)
+            )
+        return self.session
     
-    async def fetch_image(self, camera_url: str) -> Optional[np.ndarray]:
+    async def fetch_bytes(self, camera_url: str, conditional: bool = False) -> Union[bytes, object, None]:
         """
-        Fetch image from camera URL
+        Fetch the encoded image from a camera URL
         
         Args:
             camera_url: URL of the camera feed
+            conditional: Send the validators of the last snapshot from this URL
+                (If-None-Match / If-Modified-Since) and remember the new ones
             
         Returns:
-            Image as numpy array or None if failed
+            Image bytes, NOT_MODIFIED if a conditional fetch found the
+            snapshot unchanged, or None if failed
         """
+        headers = {}
+        if conditional and camera_url in self.validators:
+            etag, last_modified = self.validators[camera_url]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        
+        self.counters["requests"] += 1
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(camera_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        image_bytes = await response.read()
-                        nparr = np.frombuffer(image_bytes, np.uint8)
-                        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                        return img
-                    else:
-                        logger.error(f"Failed to fetch image: HTTP {response.status}")
-                        return None
+            async with self._session().get(camera_url, headers=headers) as response:
+                if response.status == 304 and headers:
+                    self.counters["not_modified"] += 1
+                    return NOT_MODIFIED
+                if response.status == 200:
+                    image_bytes = await response.read()
+                    self.counters["bytes"] += len(image_bytes)
+                    if conditional:
+                        self.validators[camera_url] = (
+                            response.headers.get("ETag"), response.headers.get("Last-Modified")
+                        )
+                    return image_bytes
+                else:
+                    logger.error(f"Failed to fetch image: HTTP {response.status}")
         except asyncio.TimeoutError:
             logger.error(f"Timeout fetching image from {camera_url}")
-            return None
         except Exception as e:
             logger.error(f"Error fetching image: {e}")
+        self.counters["errors"] += 1
+        return None
+    
+    async def fetch_image(self, camera_url: str, reduction: int = 1) -> Optional[np.ndarray]:
+        """
+        Fetch image from camera URL
+        
+        Args:
+            camera_url: URL of the camera feed
+            reduction: Decode at 1/2, 1/4 or 1/8 size (1 for full size)
+        
+        Returns:
+            Image as numpy array or None if failed
+        """
+        if is_stream_url(camera_url):
+            return await self.fetch_stream_frame(camera_url)
+        image_bytes = await self.fetch_bytes(camera_url)
+        if image_bytes is None:
             return None
+        return decode_image(image_bytes, reduction)
+    
+    def stream_reader(self, camera_url: str) -> StreamReader:
+        """The running reader for a stream, started on first use"""
+        reader = self.stream_readers.get(camera_url)
+        if reader is None:
+            reader = StreamReader(
+                camera_url,
+                backoff_min=settings.STREAM_RECONNECT_MIN,
+                backoff_max=settings.STREAM_RECONNECT_MAX
+            )
+            reader.start()
+            self.stream_readers[camera_url] = reader
+        return reader
+    
+    async def fetch_stream_frame(self, camera_url: str) -> Optional[np.ndarray]:
+        """
+        Latest frame of an RTSP/MJPEG stream
+        
+        Taken from the stream's reader if it is monitored; otherwise the
+        stream is opened for one frame.
+        """
+        reader = self.stream_readers.get(camera_url)
+        if reader is None:
+            return await asyncio.to_thread(read_one_frame, camera_url)
+        latest = reader.latest(settings.STREAM_MAX_FRAME_AGE)
+        return latest[1] if latest is not None else None
+    
+    async def _next_frame(
+        self,
+        parking_lot_id: int,
+        camera_url: str,
+        reusable: bool,
+        reduction: Callable[[Optional[Tuple[int, int]]], int]
+    ):
+        """
+        A monitored camera's next frame
+        
+        Args:
+            reusable: Whether the previous results can stand in for an
+                unchanged frame
+            reduction: Decode downscale for a snapshot of a given size
+        
+        Returns:
+            (frame, size of the snapshot if it was decoded smaller),
+            NOT_MODIFIED if the camera has nothing new, or None if failed
+        """
+        if is_stream_url(camera_url):
+            reader = self.stream_reader(camera_url)
+            if reusable and reader.frame_id == self.frame_ids.get(parking_lot_id):
+                return NOT_MODIFIED
+            latest = reader.latest(settings.STREAM_MAX_FRAME_AGE)
+            if latest is None:
+                return None
+            self.frame_ids[parking_lot_id], frame = latest
+            return frame, None
+        
+        if not reusable:
+            # The snapshot is needed even if unchanged
+            self.validators.pop(camera_url, None)
+        image_bytes = await self.fetch_bytes(camera_url, conditional=True)
+        if image_bytes is None or image_bytes is NOT_MODIFIED:
+            return image_bytes
+        # Decode no larger than the model needs
+        size = jpeg_size(image_bytes)
+        frame = decode_image(image_bytes, reduction(size))
+        return (frame, size) if frame is not None else None
+    
+    async def close(self):
+        """Stop all monitoring, write out pending results, close stream readers and the HTTP session"""
+        for parking_lot_id in list(self.camera_urls):
+            await self.stop_monitoring(parking_lot_id)
+        await self.scheduler.stop()
+        await self.results_sink.close()
+        for camera_url in list(self.stream_readers):
+            await asyncio.to_thread(self.stream_readers.pop(camera_url).stop)
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    def stats(self) -> Dict:
+        """Fetch counters and stream reader state"""
+        # By lot rather than URL, as stream URLs often carry credentials
+        streams = {
+            parking_lot_id: self.stream_readers[camera_url].stats()
+            for parking_lot_id, camera_url in self.camera_urls.items()
+            if camera_url in self.stream_readers
+        }
+        return dict(self.counters, monitored=len(self.camera_urls), streams=streams)
     
     async def start_monitoring(
         self,
         parking_lot_id: int,
         camera_url: str,
-        detector
+        detector,
+        interval: Optional[float] = None,
+        priority: int = 0,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        engine: Optional[str] = None,
+        delay: Optional[float] = None
     ):
         """
         Start continuous monitoring of a parking lot
@@ -61,74 +261,144 @@ class CameraManager:
             parking_lot_id: ID of the parking lot
             camera_url: URL of the camera feed
             detector: ParkingSlotDetector instance
+            interval: Base detection interval in seconds (CAMERA_MONITOR_INTERVAL if None)
+            priority: Lots with a higher priority are served first when overloaded
+            min_interval: Shortest interval adapting may choose (CAMERA_MIN_INTERVAL if None)
+            max_interval: Longest interval adapting may choose (CAMERA_MAX_INTERVAL if None)
+            engine: Detection engine to use (the lot's own if None)
+            delay: Seconds until the first tick (random within one interval if None)
         """
-        if parking_lot_id in self.monitoring_tasks:
+        if parking_lot_id in self.camera_urls:
             # Stop existing monitoring
             await self.stop_monitoring(parking_lot_id)
         
+        self.detector = detector
         self.camera_urls[parking_lot_id] = camera_url
-        
-        # Create monitoring task
-        task = asyncio.create_task(
-            self._monitor_loop(parking_lot_id, camera_url, detector)
+        self.engines[parking_lot_id] = engine
+        interval = interval or settings.CAMERA_MONITOR_INTERVAL
+        self.intervals.add(
+            parking_lot_id, interval,
+            min_interval or settings.CAMERA_MIN_INTERVAL, max_interval or settings.CAMERA_MAX_INTERVAL
         )
-        self.monitoring_tasks[parking_lot_id] = task
+        self.scheduler.schedule(parking_lot_id, interval, priority, delay)
         
         logger.info(f"Started monitoring parking lot {parking_lot_id}")
     
+    async def resume_monitoring(self, db, detector, warmup: float = 60.0) -> int:
+        """
+        Restart the monitoring assignments stored in the database
+        
+        First ticks are staggered evenly over `warmup` seconds, highest
+        priority first, so a restart neither leaves every lot blind for a
+        full interval nor fetches every camera at once.
+        
+        Returns:
+            Number of lots resumed
+        """
+        assignments = [
+            (assignment, camera_url) for assignment, camera_url in active_assignments(db) if camera_url
+        ]
+        for position, (assignment, camera_url) in enumerate(assignments):
+            await self.start_monitoring(
+                assignment.parking_lot_id,
+                camera_url,
+                detector,
+                interval=assignment.interval,
+                priority=assignment.priority or 0,
+                min_interval=assignment.min_interval,
+                max_interval=assignment.max_interval,
+                engine=assignment.detection_engine,
+                delay=warmup * position / len(assignments)
+            )
+        return len(assignments)
+    
     async def stop_monitoring(self, parking_lot_id: int):
         """Stop monitoring a parking lot"""
-        if parking_lot_id in self.monitoring_tasks:
-            task = self.monitoring_tasks[parking_lot_id]
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
-            del self.monitoring_tasks[parking_lot_id]
-            del self.camera_urls[parking_lot_id]
+        if parking_lot_id in self.camera_urls:
+            await self.scheduler.remove(parking_lot_id)
+            camera_url = self.camera_urls.pop(parking_lot_id)
+            self.last_results.pop(parking_lot_id, None)
+            self.intervals.remove(parking_lot_id)
+            self.health.remove(parking_lot_id)
+            self.validators.pop(camera_url, None)
+            self.frame_ids.pop(parking_lot_id, None)
+            self.engines.pop(parking_lot_id, None)
+            if self.detector is not None:
+                # Picked up again later, the lot is compared with a fresh frame, and its
+                # first reading resyncs every slot's stored status
+                key = (parking_lot_id, "main")
+                if self.detector.change_gate is not None:
+                    self.detector.change_gate.forget(key)
+                self.detector.occupancy_tracker.forget(key)
+            if camera_url in self.stream_readers and camera_url not in self.camera_urls.values():
+                await asyncio.to_thread(self.stream_readers.pop(camera_url).stop)
             logger.info(f"Stopped monitoring parking lot {parking_lot_id}")
     
-    async def _monitor_loop(
-        self,
-        parking_lot_id: int,
-        camera_url: str,
-        detector,
-        interval: int = 30
-    ):
+    async def _monitor_tick(self, parking_lot_id: int):
         """
-        Monitoring loop that periodically detects parking slots
+        One scheduled detection for a monitored parking lot
         
         Args:
             parking_lot_id: ID of the parking lot
-            camera_url: URL of the camera feed
-            detector: ParkingSlotDetector instance
-            interval: Detection interval in seconds
         """
-        while True:
-            try:
-                # Fetch image
-                img = await self.fetch_image(camera_url)
-                
-                if img is not None:
-                    # Detect slots
-                    results = await detector.detect_slots(img, parking_lot_id)
-                    
-                    # Store results (would update backend/Redis here)
-                    logger.info(
-                        f"Parking lot {parking_lot_id}: "
-                        f"{results.get('available_slots', 0)}/{results.get('total_slots', 0)} slots available"
-                    )
-                else:
-                    logger.warning(f"Failed to fetch image for parking lot {parking_lot_id}")
-                
-                # Wait before next detection
-                await asyncio.sleep(interval)
-                
-            except asyncio.CancelledError:
-                logger.info(f"Monitoring cancelled for parking lot {parking_lot_id}")
-                break
-            except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
-                await asyncio.sleep(interval)
-
+        # A camera whose breaker is open is not fetched until its backoff has passed
+        if not self.health.allow(parking_lot_id):
+            self.scheduler.set_interval(parking_lot_id, self.health.retry_in(parking_lot_id))
+            return
+        
+        camera_url = self.camera_urls[parking_lot_id]
+        detector = self.detector
+        results = self.last_results.pop(parking_lot_id, None)
+        
+        # Detect slots with the lot's engine, per slot if it has a layout
+        db = SessionLocal()
+        try:
+            layout, engine = lot_detection_config(db, parking_lot_id, engine=self.engines.get(parking_lot_id))
+            if settings.CAMERA_ADAPTIVE_INTERVALS and self.intervals.calendar.stale(time.time()):
+                # One query for every monitored lot
+                self.intervals.calendar.load(db, self.camera_urls, time.time())
+        finally:
+            db.close()
+        started = time.monotonic()
+        frame = await self._next_frame(
+            parking_lot_id, camera_url, results is not None,
+            lambda size: detector.decode_reduction(size, layout, engine)
+        )
+        
+        if frame is None:
+            backoff = self.health.record_failure(parking_lot_id)
+            if backoff is not None:
+                # Out of rotation until the backoff has passed; the next tick is a probe
+                logger.warning(f"Camera of parking lot {parking_lot_id} is failing, retrying in {backoff:.0f}s")
+                self.scheduler.set_interval(parking_lot_id, backoff)
+            else:
+                logger.warning(f"Failed to fetch image for parking lot {parking_lot_id}")
+            return
+        if self.health.record_success(parking_lot_id, time.monotonic() - started):
+            logger.info(f"Camera of parking lot {parking_lot_id} recovered")
+            self.scheduler.set_interval(parking_lot_id, self.intervals.lots[parking_lot_id].base)
+        
+        if frame is NOT_MODIFIED:
+            # Same frame as last time: no decode or inference
+            results = dict(results, timestamp=datetime.now().isoformat(), reused=True)
+        else:
+            img, size = frame
+            results = restore_scale(
+                await detector.detect_if_changed(img, parking_lot_id, layout, engine), size
+            )
+        
+        # Only slots whose status held steady count as changed
+        changes = detector.occupancy_tracker.update_results(
+            (parking_lot_id, results.get("camera_id", "main")), results
+        )
+        if changes:
+            logger.info(f"Parking lot {parking_lot_id}: {len(changes)} slot status changes")
+        if settings.CAMERA_ADAPTIVE_INTERVALS:
+            now = time.time()
+            self.intervals.record(parking_lot_id, len(changes), now)
+            self.scheduler.set_interval(parking_lot_id, self.intervals.interval(parking_lot_id, now))
+        
+        if "error" not in results:
+            self.last_results[parking_lot_id] = results
+            # Persisted with other lots' results on the next flush
+            self.results_sink.submit(parking_lot_id, results, changes)
@@ -0,0 +1,157 @@
+"""
+Frame-change gating: skip inference when a camera's view has not changed
+"""
+
+import time
+from typing import Dict, Hashable, Optional
+
+import cv2
+import numpy as np
+
+from app.ai.slot_layout import SlotLayout
+
+
+class GateDecision:
+    """What a new frame needs: nothing, some slots, or full inference"""
+    
+    __slots__ = ("thumbnail", "full", "changed_slots", "global_diff")
+    
+    def __init__(self, thumbnail: np.ndarray, full: bool, changed_slots: Optional[np.ndarray], global_diff: float):
+        self.thumbnail = thumbnail
+        self.full = full
+        self.changed_slots = changed_slots
+        self.global_diff = global_diff
+    
+    @property
+    def skip(self) -> bool:
+        """True if cached results can be reused as they are"""
+        return not self.full and (self.changed_slots is None or not self.changed_slots.any())
+
+
+class GateState:
+    """Reference thumbnail and last results for one camera"""
+    
+    __slots__ = ("reference", "results", "layout", "refreshed_at")
+    
+    def __init__(self, reference: np.ndarray, results: Dict, layout: Optional[SlotLayout]):
+        self.reference = reference
+        self.results = results
+        self.layout = layout
+        self.refreshed_at = time.monotonic()
+
+
+class FrameChangeGate:
+    """
+    Cheap change detector run before inference
+    
+    Frames are downscaled to a small grayscale thumbnail and compared with
+    the thumbnail of the last frame that was analysed. The mean absolute
+    difference over the whole frame catches lighting changes and camera
+    moves; the mean inside each slot's box (from an integral image, for all
+    slots at once) finds the slots where something arrived or left.
+    """
+    
+    def __init__(
+        self,
+        width: int = 160,
+        global_threshold: float = 6.0,
+        slot_threshold: float = 12.0,
+        max_age: float = 300.0
+    ):
+        self.width = width
+        self.global_threshold = global_threshold
+        self.slot_threshold = slot_threshold
+        self.max_age = max_age
+        self.states: Dict[Hashable, GateState] = {}
+        self.frames = 0
+        self.skipped = 0
+        self.partial = 0
+    
+    def thumbnail(self, image: np.ndarray) -> np.ndarray:
+        """Downscaled grayscale copy of a frame"""
+        height, width = image.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    
+    def slot_differences(self, diff: np.ndarray, layout: SlotLayout) -> np.ndarray:
+        """Mean absolute difference inside each slot's bounding box"""
+        height, width = diff.shape
+        integral = cv2.integral(diff, sdepth=cv2.CV_64F)
+        x1 = np.clip(np.floor(layout.polygons[:, :, 0].min(axis=1) * width), 0, width - 1).astype(int)
+        y1 = np.clip(np.floor(layout.polygons[:, :, 1].min(axis=1) * height), 0, height - 1).astype(int)
+        x2 = np.clip(np.ceil(layout.polygons[:, :, 0].max(axis=1) * width), x1 + 1, width).astype(int)
+        y2 = np.clip(np.ceil(layout.polygons[:, :, 1].max(axis=1) * height), y1 + 1, height).astype(int)
+        sums = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+        return sums / ((x2 - x1) * (y2 - y1))
+    
+    def check(self, key: Hashable, image: np.ndarray, layout: Optional[SlotLayout] = None) -> GateDecision:
+        """Compare a frame with the last analysed frame of the same camera"""
+        self.frames += 1
+        thumbnail = self.thumbnail(image)
+        state = self.states.get(key)
+        if (
+            state is None
+            or state.layout is not layout
+            or state.reference.shape != thumbnail.shape
+            or time.monotonic() - state.refreshed_at >= self.max_age
+        ):
+            return GateDecision(thumbnail, True, None, float("inf"))
+        
+        diff = cv2.absdiff(thumbnail, state.reference)
+        global_diff = float(diff.mean())
+        if global_diff >= self.global_threshold:
+            return GateDecision(thumbnail, True, None, global_diff)
+        changed_slots = None
+        if layout is not None and len(layout):
+            changed_slots = self.slot_differences(diff, layout) >= self.slot_threshold
+        decision = GateDecision(thumbnail, False, changed_slots, global_diff)
+        if decision.skip:
+            self.skipped += 1
+        return decision
+    
+    def cached(self, key: Hashable) -> Optional[Dict]:
+        """Results from the last analysed frame"""
+        state = self.states.get(key)
+        return state.results if state else None
+    
+    def commit(
+        self,
+        key: Hashable,
+        thumbnail: np.ndarray,
+        results: Dict,
+        layout: Optional[SlotLayout] = None,
+        refreshed_slots: Optional[np.ndarray] = None
+    ):
+        """
+        Remember what was analysed, so later frames are compared against it
+        
+        Args:
+            refreshed_slots: Mask of the slots that were re-analysed; None
+                means the whole frame was
+        """
+        state = self.states.get(key)
+        if refreshed_slots is None or layout is None or state is None:
+            self.states[key] = GateState(thumbnail, results, layout)
+            return
+        self.partial += 1
+        # Only the re-analysed slots move the reference forward
+        height, width = thumbnail.shape
+        for polygon in layout.polygons[refreshed_slots]:
+            x1, y1 = np.maximum(np.floor(polygon.min(axis=0) * (width, height)), 0).astype(int)
+            x2, y2 = np.ceil(polygon.max(axis=0) * (width, height)).astype(int)
+            state.reference[y1:y2, x1:x2] = thumbnail[y1:y2, x1:x2]
+        state.results = results
+    
+    def forget(self, key: Hashable):
+        """Drop a camera's state (e.g. when monitoring stops)"""
+        self.states.pop(key, None)
+    
+    def stats(self) -> Dict:
+        """How much inference the gate saved"""
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "partial": self.partial,
+            "skipped_fraction": self.skipped / self.frames if self.frames else 0.0
+        }
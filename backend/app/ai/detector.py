@@ -7,8 +7,23 @@ import numpy as np
 from typing import List, Dict, Tuple, Optional
 from pathlib import Path
 import asyncio
+import threading
 from datetime import datetime
 
+from app.core.config import settings
+from app.ai.inference import (
+    InferenceExecutor, InferenceBusyError, InferenceTimeoutError, predict_in_worker
+)
+from app.ai.batching import MicroBatcher
+from app.ai.slot_layout import SlotLayout
+from app.ai.change_gate import FrameChangeGate
+from app.ai.occupancy_tracker import OccupancyTracker
+from app.ai.runtimes import predict_fixed_batch, read_manifest, select_runtime
+from app.ai.postprocess import Detections
+from app.ai.tiling import crop_tiles, layout_tiles, merge_tile_detections
+from app.ai.preprocess import Letterboxer, max_reduction, roi_box
+from app.ai.slot_classifier import ENGINE_CLASSIFIER, ENGINE_YOLO, predict_slots
+
 # Optional imports - AI dependencies
 try:
     from ultralytics import YOLO
@@ -22,11 +37,52 @@ except ImportError:
 class ParkingSlotDetector:
     """AI-powered parking slot detector"""
     
-    def __init__(self):
+    def __init__(self, executor: Optional[InferenceExecutor] = None):
         self.model: Optional[YOLO] = None
         self.model_loaded = False
+        self.weights: Optional[str] = None
+        # Ultralytics predictors are not thread-safe, so every pool thread
+        # runs its own model instance
+        self.thread_models = threading.local()
+        self.thread_models_lock = threading.Lock()
+        self.model_claimed = False
         self.model_path = Path("models/parking_slot_detector.pt")
         self.confidence_threshold = 0.5
+        # Backend the model runs on, and the fixed shapes it was exported with
+        self.runtime = "pytorch"
+        self.imgsz: Optional[int] = None
+        self.fixed_batch: Optional[int] = None
+        # Inference runs in a worker pool so it never blocks the event loop
+        self.executor = executor or InferenceExecutor(
+            mode=settings.INFERENCE_EXECUTOR,
+            workers=settings.INFERENCE_WORKERS,
+            max_queue=settings.INFERENCE_MAX_QUEUE,
+            timeout=settings.INFERENCE_TIMEOUT
+        )
+        # Frames from concurrent callers share one forward pass
+        self.batcher = MicroBatcher(
+            self._run_batch,
+            max_batch_size=settings.INFERENCE_BATCH_SIZE,
+            max_wait_ms=settings.INFERENCE_BATCH_WAIT_MS,
+            concurrency=self.executor.workers,
+            max_pending=settings.INFERENCE_MAX_QUEUE * settings.INFERENCE_BATCH_SIZE
+        )
+        # Model inputs are letterboxed into reused buffers
+        self.letterboxer = Letterboxer(640, pool_size=settings.INFERENCE_MAX_QUEUE * settings.INFERENCE_BATCH_SIZE)
+        # Monitored cameras skip inference while their view stays the same
+        self.change_gate = FrameChangeGate(
+            width=settings.CHANGE_GATE_WIDTH,
+            global_threshold=settings.CHANGE_GATE_GLOBAL_THRESHOLD,
+            slot_threshold=settings.CHANGE_GATE_SLOT_THRESHOLD,
+            max_age=settings.CHANGE_GATE_MAX_AGE
+        ) if settings.CHANGE_GATE_ENABLED else None
+        # Per-slot statuses only change once the readings are stable
+        self.occupancy_tracker = OccupancyTracker(
+            window=settings.SLOT_SMOOTHING_WINDOW,
+            enter_threshold=settings.SLOT_ENTER_THRESHOLD,
+            exit_threshold=settings.SLOT_EXIT_THRESHOLD,
+            min_dwell=settings.SLOT_MIN_DWELL
+        )
         
     async def load_model(self):
         """Load YOLOv8 model for parking slot detection"""
@@ -39,15 +95,30 @@ class ParkingSlotDetector:
         try:
             # Try to load custom trained model
             if self.model_path.exists():
-                self.model = YOLO(str(self.model_path))
-                print(f"✅ Loaded custom model from {self.model_path}")
+                # Prefer an exported ONNX/OpenVINO/TorchScript copy where available
+                self.runtime, weights_path = select_runtime(self.model_path, settings.INFERENCE_RUNTIME)
+                if self.runtime != "pytorch":
+                    manifest = read_manifest(self.model_path)
+                    self.imgsz = manifest.get("imgsz")
+                    self.fixed_batch = manifest.get("batch")
+                    if self.imgsz:
+                        self.letterboxer = Letterboxer(self.imgsz, pool_size=self.letterboxer.pool_size)
+                weights = str(weights_path)
+                print(f"✅ Loaded custom model from {weights_path} ({self.runtime})")
             else:
                 # Use pre-trained YOLOv8 model as fallback
                 # In production, you'd train a custom model for parking slots
-                self.model = YOLO("yolov8n.pt")  # nano version for speed
+                weights = "yolov8n.pt"  # nano version for speed
                 print("⚠️  Using pre-trained YOLOv8 model (custom model not found)")
                 print("💡 Train a custom model for better parking slot detection")
             
+            self.weights = weights
+            if self.executor.mode != "process":
+                # Worker processes load their own copy on their first detection;
+                # here loading takes a while, so keep it off the event loop too
+                self.model = await asyncio.to_thread(YOLO, weights, task="detect")
+                self.model_claimed = False
+            
             self.model_loaded = True
             print("✅ Model loaded successfully")
             
@@ -56,17 +127,29 @@ class ParkingSlotDetector:
             self.model_loaded = False
             raise
     
-    async def detect_slots(self, image: np.ndarray, parking_lot_id: int) -> Dict:
+    async def detect_slots(
+        self,
+        image: np.ndarray,
+        parking_lot_id: int,
+        layout: Optional[SlotLayout] = None,
+        engine: str = ENGINE_YOLO
+    ) -> Dict:
         """
         Detect parking slots in an image
         
         Args:
             image: Input image (BGR format)
             parking_lot_id: ID of the parking lot
+            layout: Slot polygons for this camera; without one, capacity is estimated
+            engine: "yolo" for full-frame detection or "classifier" to classify
+                each slot crop (needs a layout and a trained classifier)
             
         Returns:
             Dictionary with detection results
         """
+        if engine == ENGINE_CLASSIFIER and self.classifier_available(layout):
+            return await self._classify_slots(image, parking_lot_id, layout)
+        
         if not AI_AVAILABLE:
             return {
                 "parking_lot_id": parking_lot_id,
@@ -91,41 +174,36 @@ class ParkingSlotDetector:
             }
         
         try:
-            # Run detection
-            results = self.model(image, conf=self.confidence_threshold)
-            
-            # Process results
-            detections = []
-            available_slots = 0
-            occupied_slots = 0
+            # Run detection, batched with other callers' frames
+            vehicles, tiles = await self._detect(image, layout)
+            detections = vehicles.to_list()
+            occupied_slots = len(vehicles)
             
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    # Get bounding box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = float(box.conf[0].cpu().numpy())
-                    class_id = int(box.cls[0].cpu().numpy())
-                    class_name = self.model.names[class_id]
-                    
-                    # Filter for vehicles (car, truck, bus, motorcycle)
-                    vehicle_classes = ['car', 'truck', 'bus', 'motorcycle', 'van']
-                    if class_name.lower() in vehicle_classes:
-                        occupied_slots += 1
-                        detections.append({
-                            "bbox": [float(x1), float(y1), float(x2), float(y2)],
-                            "confidence": confidence,
-                            "class": class_name,
-                            "status": "occupied"
-                        })
-            
-            # Calculate available slots
-            # In a real implementation, you'd have predefined slot regions
-            # For now, we estimate based on parking lot size
-            total_slots = self._estimate_total_slots(image, occupied_slots)
+            slots = None
+            if layout is not None and len(layout):
+                # Map vehicles onto the camera's slot polygons
+                occupied, coverage = layout.occupancy(
+                    vehicles.boxes, image.shape, settings.SLOT_OCCUPANCY_THRESHOLD
+                )
+                slots = [
+                    {
+                        "slot_id": int(slot_id),
+                        "slot_number": slot_number,
+                        "status": "occupied" if taken else "available",
+                        "coverage": round(float(covered), 3)
+                    }
+                    for slot_id, slot_number, taken, covered in zip(
+                        layout.slot_ids, layout.slot_numbers, occupied, coverage
+                    )
+                ]
+                total_slots = len(layout)
+                occupied_slots = int(occupied.sum())
+            else:
+                # No slot regions for this camera, so estimate based on parking lot size
+                total_slots = self._estimate_total_slots(image, occupied_slots)
             available_slots = max(0, total_slots - occupied_slots)
             
-            return {
+            response = {
                 "parking_lot_id": parking_lot_id,
                 "timestamp": datetime.now().isoformat(),
                 "total_slots": total_slots,
@@ -133,9 +211,19 @@ class ParkingSlotDetector:
                 "occupied_slots": occupied_slots,
                 "occupancy_rate": occupied_slots / total_slots if total_slots > 0 else 0,
                 "detections": detections,
-                "image_shape": list(image.shape)
+                "image_shape": list(image.shape),
+                "engine": ENGINE_YOLO
             }
+            if slots is not None:
+                response["camera_id"] = layout.camera_id
+                response["slots"] = slots
+            if tiles > 1:
+                response["tiles"] = tiles
+            return response
             
+        except (InferenceBusyError, InferenceTimeoutError):
+            # Let callers tell overload apart from a broken image or model
+            raise
         except Exception as e:
             print(f"Detection error: {e}")
             return {
@@ -147,10 +235,233 @@ class ParkingSlotDetector:
                 "occupied_slots": 0
             }
     
+    async def detect_vehicles(self, image: np.ndarray, layout: Optional[SlotLayout] = None) -> Detections:
+        """
+        Detect vehicles in an image, as arrays rather than a JSON dict
+        
+        Raises:
+            RuntimeError: If the model is unavailable
+        """
+        if not self.model_loaded and AI_AVAILABLE:
+            await self.load_model()
+        if not self.model_loaded:
+            raise RuntimeError("Model not loaded")
+        vehicles, _ = await self._detect(image, layout)
+        return vehicles
+    
+    @property
+    def input_size(self) -> int:
+        """Side of the square model input"""
+        return self.imgsz or 640
+    
+    def decode_reduction(
+        self,
+        frame_shape: Optional[Tuple[int, int]],
+        layout: Optional[SlotLayout] = None,
+        engine: str = ENGINE_YOLO
+    ) -> int:
+        """
+        How far a frame of this size may be shrunk while it is decoded
+        
+        Only full-frame detection qualifies: the model sees the slot area at
+        its input size anyway, so decoding more pixels buys nothing. Tiled
+        frames and slot crops for the classifier need every pixel.
+        """
+        if not settings.INFERENCE_REDUCED_DECODE or frame_shape is None:
+            return 1
+        if engine == ENGINE_CLASSIFIER and self.classifier_available(layout):
+            return 1
+        if self.should_tile(frame_shape):
+            return 1
+        x1, y1, x2, y2 = roi_box(frame_shape, layout)
+        return max_reduction(max(x2 - x1, y2 - y1), self.input_size)
+    
+    def should_tile(self, frame_shape: Tuple[int, ...]) -> bool:
+        """Whether a frame is large enough to be detected tile by tile"""
+        longest = max(frame_shape[:2])
+        if settings.INFERENCE_TILING == "always":
+            return longest > settings.INFERENCE_TILE_SIZE
+        if settings.INFERENCE_TILING == "auto":
+            return longest >= settings.INFERENCE_TILE_MIN_SIDE
+        return False
+    
+    async def _detect(self, image: np.ndarray, layout: Optional[SlotLayout] = None) -> Tuple[Detections, int]:
+        """
+        Vehicles in a frame, and how many model inputs it took
+        
+        Other frames are cropped to the slot area and letterboxed here, so
+        the model does no resizing of its own. High-resolution frames are
+        cut into overlapping tiles at the model's input size instead, so
+        distant cars are not shrunk away. Only tiles touching a slot are
+        run; they go through the batcher together and their detections are
+        merged across tile borders.
+        """
+        if not self.should_tile(image.shape):
+            # Only the slot area, letterboxed to the model input in a pooled buffer
+            buffer, transform = self.letterboxer.letterbox(image, roi_box(image.shape, layout))
+            vehicles = await self.batcher.submit(buffer)
+            # On failure the buffer may still be in use by a worker, so it is not reused
+            self.letterboxer.release(buffer)
+            vehicles.boxes = transform.to_frame(vehicles.boxes)
+            return vehicles, 1
+        tiles = layout_tiles(
+            image.shape, layout, settings.INFERENCE_TILE_SIZE, settings.INFERENCE_TILE_OVERLAP
+        )
+        results = await asyncio.gather(*(self.batcher.submit(tile) for tile in crop_tiles(image, tiles)))
+        vehicles = merge_tile_detections(list(results), tiles, image.shape)
+        return vehicles, len(tiles)
+    
+    async def detect_if_changed(
+        self,
+        image: np.ndarray,
+        parking_lot_id: int,
+        layout: Optional[SlotLayout] = None,
+        engine: str = ENGINE_YOLO,
+        camera_id: str = "main"
+    ) -> Dict:
+        """
+        Detect parking slots for a monitored camera, skipping unchanged frames
+        
+        A frame that matches the last analysed one reuses its results. When
+        only some slots changed and the lot uses the classifier engine, just
+        those slots are classified again; otherwise the whole frame is.
+        """
+        if self.change_gate is None:
+            return await self.detect_slots(image, parking_lot_id, layout, engine)
+        
+        key = (parking_lot_id, camera_id)
+        decision = self.change_gate.check(key, image, layout)
+        cached = self.change_gate.cached(key)
+        if decision.skip and cached is not None:
+            return dict(cached, timestamp=datetime.now().isoformat(), reused=True)
+        
+        if (
+            not decision.full
+            and cached is not None
+            and cached.get("engine") == ENGINE_CLASSIFIER
+            and engine == ENGINE_CLASSIFIER
+            and self.classifier_available(layout)
+        ):
+            fresh = await self._classify_slots(
+                image, parking_lot_id, layout.subset(decision.changed_slots)
+            )
+            if "error" in fresh:
+                return fresh
+            results = self._merge_slots(cached, fresh)
+            self.change_gate.commit(key, decision.thumbnail, results, layout, decision.changed_slots)
+            return results
+        
+        results = await self.detect_slots(image, parking_lot_id, layout, engine)
+        if "error" not in results:
+            self.change_gate.commit(key, decision.thumbnail, results, layout)
+        return results
+    
+    def _merge_slots(self, cached: Dict, fresh: Dict) -> Dict:
+        """Update cached per-slot results with freshly classified slots"""
+        updated = {slot["slot_id"]: slot for slot in fresh["slots"]}
+        slots = [updated.get(slot["slot_id"], slot) for slot in cached["slots"]]
+        total_slots = len(slots)
+        occupied_slots = sum(slot["status"] == "occupied" for slot in slots)
+        return dict(
+            cached,
+            timestamp=fresh["timestamp"],
+            slots=slots,
+            occupied_slots=occupied_slots,
+            available_slots=total_slots - occupied_slots,
+            occupancy_rate=occupied_slots / total_slots if total_slots else 0
+        )
+    
+    def classifier_available(self, layout: Optional[SlotLayout]) -> bool:
+        """Whether the crop classifier can handle a frame with this layout"""
+        return layout is not None and len(layout) > 0 and settings.SLOT_CLASSIFIER_PATH.exists()
+    
+    async def _classify_slots(self, image: np.ndarray, parking_lot_id: int, layout: SlotLayout) -> Dict:
+        """Classify every slot crop as empty or occupied in one batched pass"""
+        try:
+            scores = await self.executor.run(
+                predict_slots,
+                str(settings.SLOT_CLASSIFIER_PATH),
+                settings.SLOT_CLASSIFIER_INPUT_SIZE,
+                image,
+                layout
+            )
+        except (InferenceBusyError, InferenceTimeoutError):
+            raise
+        except Exception as e:
+            print(f"Slot classification error: {e}")
+            return {
+                "parking_lot_id": parking_lot_id,
+                "timestamp": datetime.now().isoformat(),
+                "error": str(e),
+                "total_slots": 0,
+                "available_slots": 0,
+                "occupied_slots": 0
+            }
+        
+        occupied = scores >= settings.SLOT_CLASSIFIER_THRESHOLD
+        total_slots = len(layout)
+        occupied_slots = int(occupied.sum())
+        return {
+            "parking_lot_id": parking_lot_id,
+            "timestamp": datetime.now().isoformat(),
+            "total_slots": total_slots,
+            "available_slots": total_slots - occupied_slots,
+            "occupied_slots": occupied_slots,
+            "occupancy_rate": occupied_slots / total_slots,
+            "detections": [],
+            "image_shape": list(image.shape),
+            "engine": ENGINE_CLASSIFIER,
+            "camera_id": layout.camera_id,
+            "slots": [
+                {
+                    "slot_id": int(slot_id),
+                    "slot_number": slot_number,
+                    "status": "occupied" if taken else "available",
+                    "confidence": round(float(score), 3)
+                }
+                for slot_id, slot_number, taken, score in zip(
+                    layout.slot_ids, layout.slot_numbers, occupied, scores
+                )
+            ]
+        }
+    
+    async def _run_batch(self, images: List[np.ndarray]) -> List[Detections]:
+        """Run one batched forward pass in the inference pool"""
+        if self.executor.mode == "process":
+            return await self.executor.run(
+                predict_in_worker, self.weights, images, self.confidence_threshold, self.fixed_batch, self.imgsz
+            )
+        return await self.executor.run(self._predict, images)
+    
+    def _thread_model(self):
+        """This pool thread's model; the loaded one serves the first thread, others load a copy"""
+        model = getattr(self.thread_models, "model", None)
+        if model is None:
+            with self.thread_models_lock:
+                if not self.model_claimed or self.weights is None:
+                    model, self.model_claimed = self.model, True
+                else:
+                    model = YOLO(self.weights, task="detect")
+            self.thread_models.model = model
+        return model
+    
+    def _predict(self, images: List[np.ndarray]) -> List[Detections]:
+        """Run the model synchronously (called from the inference pool)"""
+        options = {"imgsz": self.imgsz} if self.imgsz else {}
+        results = predict_fixed_batch(
+            self._thread_model(), images, self.fixed_batch, conf=self.confidence_threshold, verbose=False, **options
+        )
+        return [Detections.from_result(result) for result in results]
+    
+    async def close(self):
+        """Stop batching and release the inference pool"""
+        await self.batcher.stop()
+        self.executor.shutdown()
+    
     def _estimate_total_slots(self, image: np.ndarray, occupied_count: int) -> int:
         """
         Estimate total parking slots based on image analysis
-        In production, this would use predefined slot regions
+        Only used for cameras without slot regions (see SlotLayout)
         """
         # Simple heuristic: estimate based on image size and occupied vehicles
         height, width = image.shape[:2]
@@ -0,0 +1,147 @@
+"""
+Bounded executor for running model inference off the event loop
+"""
+
+import asyncio
+import time
+from concurrent.futures import BrokenExecutor, Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class InferenceBusyError(Exception):
+    """Raised when the inference queue is full"""
+
+
+class InferenceTimeoutError(Exception):
+    """Raised when an inference job does not finish in time"""
+
+
+# Detection models loaded by this worker process, by weights path (process mode only)
+_worker_models: Dict[str, Any] = {}
+
+
+def predict_in_worker(
+    model_path: str,
+    images,
+    confidence: float,
+    batch: Optional[int] = None,
+    imgsz: Optional[int] = None
+):
+    """
+    Run the detection model in a worker process, loading it on first use
+    
+    Workers that only ever classify slot crops never import ultralytics.
+    Only the vehicle boxes, confidences and class ids go back to the parent;
+    whole results would pickle the input frame along with them.
+    """
+    from app.ai.postprocess import Detections
+    from app.ai.runtimes import predict_fixed_batch
+    model = _worker_models.get(model_path)
+    if model is None:
+        from ultralytics import YOLO
+        model = _worker_models[model_path] = YOLO(model_path, task="detect")
+    options = {"imgsz": imgsz} if imgsz else {}
+    results = predict_fixed_batch(model, images, batch, conf=confidence, verbose=False, **options)
+    return [Detections.from_result(result) for result in results]
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model calls in a thread or process pool
+    
+    At most `workers + max_queue` jobs may be outstanding; further calls
+    fail fast with InferenceBusyError instead of piling up behind a slow
+    model. Each call waits at most `timeout` seconds. A job that times out
+    still holds its worker until the model returns, and keeps counting
+    against the queue until then, so the bound stays honest.
+    """
+    
+    def __init__(
+        self,
+        mode: str = "thread",
+        workers: int = 1,
+        max_queue: int = 8,
+        timeout: float = 10.0
+    ):
+        if mode not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.pool: Optional[Executor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+    
+    def _ensure_pool(self) -> Optional[Executor]:
+        """Create the worker pool on first use"""
+        if self.pool is None and self.mode == "thread":
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        elif self.pool is None and self.mode == "process":
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+    
+    def _job_done(self, started: float):
+        """Release a queue slot when the worker actually finishes"""
+        self.pending -= 1
+        self.completed += 1
+        self.total_seconds += time.perf_counter() - started
+    
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Run `func(*args)` in the pool and wait for the result
+        
+        Raises:
+            InferenceBusyError: too many jobs are already outstanding
+            InferenceTimeoutError: the job took longer than `timeout`
+        """
+        if self.mode == "inline":
+            # Blocks the event loop; only useful as a baseline for comparison
+            started = time.perf_counter()
+            self.pending += 1
+            try:
+                return func(*args)
+            finally:
+                self._job_done(started)
+        
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise InferenceBusyError(f"Inference queue full ({self.pending} jobs pending)")
+        
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.pending += 1
+        future = loop.run_in_executor(self._ensure_pool(), func, *args)
+        future.add_done_callback(lambda _: self._job_done(started))
+        try:
+            # Shield so a timeout doesn't cancel the bookkeeping callback
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise InferenceTimeoutError(f"Inference did not finish within {self.timeout}s")
+        except BrokenExecutor:
+            # A worker process died; later jobs get a fresh pool
+            self.shutdown()
+            raise
+    
+    def stats(self) -> Dict:
+        """Queue and latency counters"""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_inference_ms": (self.total_seconds / self.completed * 1000) if self.completed else 0.0
+        }
+    
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
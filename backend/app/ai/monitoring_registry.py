@@ -0,0 +1,76 @@
+"""
+Durable monitoring assignments, so monitoring survives restarts
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.ai.stream_reader import is_allowed_camera_url
+from app.models.monitored_camera import MonitoredCamera
+from app.models.parking_lot import ParkingLot
+
+logger = logging.getLogger(__name__)
+
+
+def save_assignment(
+    db: Session,
+    parking_lot_id: int,
+    camera_url: Optional[str] = None,
+    interval: Optional[float] = None,
+    priority: int = 0,
+    min_interval: Optional[float] = None,
+    max_interval: Optional[float] = None,
+    engine: Optional[str] = None
+) -> MonitoredCamera:
+    """Record (or replace) a lot's monitoring assignment and mark it active"""
+    assignment = db.query(MonitoredCamera).filter(MonitoredCamera.parking_lot_id == parking_lot_id).first()
+    if assignment is None:
+        assignment = MonitoredCamera(parking_lot_id=parking_lot_id)
+        db.add(assignment)
+    assignment.camera_url = camera_url
+    assignment.interval = interval
+    assignment.priority = priority
+    assignment.min_interval = min_interval
+    assignment.max_interval = max_interval
+    assignment.detection_engine = engine
+    assignment.is_active = True
+    db.commit()
+    db.refresh(assignment)
+    return assignment
+
+
+def deactivate_assignment(db: Session, parking_lot_id: int) -> bool:
+    """Stop a lot's monitoring from being resumed; whether it had an active assignment"""
+    updated = db.query(MonitoredCamera).filter(
+        MonitoredCamera.parking_lot_id == parking_lot_id,
+        MonitoredCamera.is_active == True
+    ).update({MonitoredCamera.is_active: False}, synchronize_session=False)
+    db.commit()
+    return bool(updated)
+
+
+def active_assignments(db: Session) -> List[Tuple[MonitoredCamera, Optional[str]]]:
+    """
+    Assignments to resume, with the camera URL each should use
+    
+    Only lots that are still active; highest priority first. A camera URL
+    that is not allowed (see is_allowed_camera_url) comes back as None like
+    a missing one, so a local path set as a lot's camera is never opened.
+    """
+    rows = (
+        db.query(MonitoredCamera, ParkingLot.camera_url)
+        .join(ParkingLot, ParkingLot.id == MonitoredCamera.parking_lot_id)
+        .filter(MonitoredCamera.is_active == True, ParkingLot.is_active == True)
+        .order_by(MonitoredCamera.priority.desc(), MonitoredCamera.parking_lot_id)
+        .all()
+    )
+    assignments = []
+    for assignment, lot_camera_url in rows:
+        camera_url = assignment.camera_url or lot_camera_url
+        if camera_url and not is_allowed_camera_url(camera_url):
+            logger.warning(f"Not monitoring parking lot {assignment.parking_lot_id}: camera URL not allowed")
+            camera_url = None
+        assignments.append((assignment, camera_url))
+    return assignments
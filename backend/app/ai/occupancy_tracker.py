@@ -0,0 +1,183 @@
+"""
+Temporal smoothing of per-slot occupancy with hysteresis
+"""
+
+import time
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SlotTrack:
+    """Recent readings and stable statuses of the slots one camera sees"""
+    
+    __slots__ = ("slot_ids", "history", "sums", "cursor", "filled", "occupied", "known", "raw", "pending_since")
+    
+    def __init__(self, slot_ids: np.ndarray, window: int):
+        count = len(slot_ids)
+        self.slot_ids = slot_ids
+        # Ring of the last `window` readings per slot, with running sums
+        self.history = np.zeros((count, window), dtype=np.float32)
+        self.sums = np.zeros(count, dtype=np.float64)
+        self.cursor = 0
+        self.filled = 0
+        self.occupied = np.zeros(count, dtype=bool)
+        self.known = np.zeros(count, dtype=bool)
+        # Unsmoothed status of the last reading, to count what smoothing held back
+        self.raw = np.zeros(count, dtype=bool)
+        # When the smoothed reading first crossed towards the other status (NaN: it has not)
+        self.pending_since = np.full(count, np.nan)
+
+
+class OccupancyTracker:
+    """
+    Turns flickering per-frame slot readings into stable status changes
+    
+    Each reading is a score in [0, 1] (1 = occupied). Per slot, the mean of
+    the last `window` readings must rise to `enter_threshold` before an
+    available slot becomes occupied, and fall to `exit_threshold` before an
+    occupied slot becomes available; between the two nothing changes. The
+    smoothed reading must also stay past the threshold for `min_dwell`
+    seconds. All slots of a camera are updated with array operations.
+    """
+    
+    def __init__(
+        self,
+        window: int = 4,
+        enter_threshold: float = 0.6,
+        exit_threshold: float = 0.4,
+        min_dwell: float = 30.0
+    ):
+        if exit_threshold > enter_threshold:
+            raise ValueError("exit_threshold must not exceed enter_threshold")
+        self.window = window
+        self.enter_threshold = enter_threshold
+        self.exit_threshold = exit_threshold
+        self.min_dwell = min_dwell
+        self.tracks: Dict[Hashable, SlotTrack] = {}
+        self.readings = 0
+        self.flips = 0
+        self.changes = 0
+    
+    def _track(self, key: Hashable, slot_ids: np.ndarray) -> SlotTrack:
+        """The camera's track, rebuilt if its slots changed (keeping known statuses)"""
+        track = self.tracks.get(key)
+        if track is not None and np.array_equal(track.slot_ids, slot_ids):
+            return track
+        fresh = SlotTrack(slot_ids, self.window)
+        if track is not None and len(track.slot_ids):
+            order = np.argsort(track.slot_ids)
+            positions = np.searchsorted(track.slot_ids, slot_ids, sorter=order)
+            positions = order[np.minimum(positions, len(order) - 1)]
+            kept = track.slot_ids[positions] == slot_ids
+            fresh.occupied[kept] = track.occupied[positions[kept]]
+            fresh.known[kept] = track.known[positions[kept]]
+            fresh.raw[kept] = track.raw[positions[kept]]
+        self.tracks[key] = fresh
+        return fresh
+    
+    def update(
+        self,
+        key: Hashable,
+        slot_ids: Sequence[int],
+        scores: Sequence[float],
+        now: Optional[float] = None
+    ) -> List[Tuple[int, bool]]:
+        """
+        Record one reading for every slot of a camera
+        
+        Args:
+            key: Camera the readings came from, e.g. (parking_lot_id, camera_id)
+            slot_ids: Slots in the reading
+            scores: Occupied score per slot
+            now: Monotonic time of the reading (defaults to now)
+        
+        Returns:
+            (slot_id, occupied) for every slot whose stable status changed;
+            a slot's first reading sets its status and is reported too
+        """
+        now = time.monotonic() if now is None else now
+        slot_ids = np.asarray(slot_ids, dtype=np.int64)
+        scores = np.clip(np.asarray(scores, dtype=np.float32), 0.0, 1.0)
+        track = self._track(key, slot_ids)
+        
+        # Push the readings into the ring
+        track.sums += scores - track.history[:, track.cursor]
+        track.history[:, track.cursor] = scores
+        track.cursor = (track.cursor + 1) % self.window
+        track.filled = min(track.filled + 1, self.window)
+        smoothed = track.sums / track.filled
+        self.readings += len(slot_ids)
+        
+        # Slots seen for the first time take the side of the midpoint straight away
+        midpoint = (self.enter_threshold + self.exit_threshold) / 2
+        new = ~track.known
+        track.occupied[new] = smoothed[new] >= midpoint
+        track.known[new] = True
+        
+        raw = scores >= midpoint
+        self.flips += int(np.count_nonzero((raw != track.raw) & ~new))
+        track.raw = raw
+        
+        crossing = np.where(track.occupied, smoothed <= self.exit_threshold, smoothed >= self.enter_threshold)
+        crossing &= ~new
+        track.pending_since[~crossing] = np.nan
+        starting = crossing & np.isnan(track.pending_since)
+        track.pending_since[starting] = now
+        settled = crossing & (now - track.pending_since >= self.min_dwell)
+        track.occupied[settled] = ~track.occupied[settled]
+        track.pending_since[settled] = np.nan
+        
+        changed = new | settled
+        self.changes += int(np.count_nonzero(settled))
+        return list(zip(slot_ids[changed].tolist(), track.occupied[changed].tolist()))
+    
+    def update_results(self, key: Hashable, results: Dict, now: Optional[float] = None) -> List[Dict]:
+        """
+        Feed per-slot detection results and return the stable status changes
+        
+        The classifier's confidence is used as the score where present;
+        otherwise each slot's detected status counts as 1 or 0.
+        """
+        slots = results.get("slots")
+        if not slots:
+            return []
+        scores = [
+            slot["confidence"] if "confidence" in slot else float(slot["status"] == "occupied")
+            for slot in slots
+        ]
+        numbers = {slot["slot_id"]: slot["slot_number"] for slot in slots}
+        changes = self.update(key, [slot["slot_id"] for slot in slots], scores, now)
+        return [
+            {
+                "slot_id": slot_id,
+                "slot_number": numbers[slot_id],
+                "status": "occupied" if occupied else "available"
+            }
+            for slot_id, occupied in changes
+        ]
+    
+    def statuses(self, key: Hashable) -> Dict[int, str]:
+        """Current stable status of every known slot of a camera"""
+        track = self.tracks.get(key)
+        if track is None:
+            return {}
+        return {
+            int(slot_id): "occupied" if occupied else "available"
+            for slot_id, occupied, known in zip(track.slot_ids, track.occupied, track.known)
+            if known
+        }
+    
+    def forget(self, key: Hashable):
+        """Drop a camera's track (e.g. when monitoring stops)"""
+        self.tracks.pop(key, None)
+    
+    def stats(self) -> Dict:
+        """How many raw status flips were held back"""
+        return {
+            "cameras": len(self.tracks),
+            "slots": sum(len(track.slot_ids) for track in self.tracks.values()),
+            "readings": self.readings,
+            "raw_flips": self.flips,
+            "changes": self.changes
+        }
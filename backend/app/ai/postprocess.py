@@ -0,0 +1,93 @@
+"""
+Vectorized post-processing of YOLO results
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+# Classes that occupy a parking slot
+VEHICLE_CLASSES = frozenset({"car", "truck", "bus", "motorcycle", "van"})
+
+
+@lru_cache(maxsize=16)
+def _class_mask(names: Tuple[Tuple[int, str], ...]) -> np.ndarray:
+    """Boolean lookup table: class id -> is a vehicle"""
+    mask = np.zeros(max((class_id for class_id, _ in names), default=-1) + 1, dtype=bool)
+    for class_id, name in names:
+        mask[class_id] = name.lower() in VEHICLE_CLASSES
+    return mask
+
+
+def vehicle_class_mask(names: Mapping[int, str]) -> np.ndarray:
+    """Lookup table for a model's class names, built once per model"""
+    return _class_mask(tuple(sorted(names.items())))
+
+
+def _to_numpy(tensor) -> np.ndarray:
+    """A result tensor (torch or numpy) as a numpy array"""
+    if isinstance(tensor, np.ndarray):
+        return tensor
+    return tensor.cpu().numpy()
+
+
+class Detections:
+    """
+    Detections of one frame as parallel arrays
+    
+    The array-native counterpart of the `detections` list in detection
+    responses: callers that only need boxes (slot mapping, counting,
+    tracking) can use it without building a dict per box.
+    """
+    
+    __slots__ = ("boxes", "confidences", "class_ids", "names")
+    
+    def __init__(
+        self,
+        boxes: np.ndarray,
+        confidences: np.ndarray,
+        class_ids: np.ndarray,
+        names: Optional[Mapping[int, str]] = None
+    ):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        self.names = names or {}
+    
+    @classmethod
+    def empty(cls, names: Optional[Mapping[int, str]] = None) -> "Detections":
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), names)
+    
+    @classmethod
+    def from_result(cls, result, vehicles_only: bool = True) -> "Detections":
+        """
+        Pull all boxes out of an ultralytics result at once
+        
+        Each tensor is copied to numpy exactly once; vehicle classes are
+        selected with a precomputed class-id mask.
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty(result.names)
+        xyxy = _to_numpy(boxes.xyxy)
+        confidences = _to_numpy(boxes.conf)
+        class_ids = _to_numpy(boxes.cls).astype(np.int64)
+        if vehicles_only:
+            mask = vehicle_class_mask(result.names)
+            known = class_ids < len(mask)
+            keep = np.zeros(len(class_ids), dtype=bool)
+            keep[known] = mask[class_ids[known]]
+            xyxy, confidences, class_ids = xyxy[keep], confidences[keep], class_ids[keep]
+        return cls(xyxy, confidences, class_ids, result.names)
+    
+    def __len__(self) -> int:
+        return len(self.class_ids)
+    
+    def to_list(self) -> List[Dict]:
+        """JSON-ready detections, as in detection responses"""
+        names = [self.names[class_id] for class_id in self.class_ids.tolist()]
+        return [
+            {"bbox": bbox, "confidence": confidence, "class": name, "status": "occupied"}
+            for bbox, confidence, name in zip(self.boxes.tolist(), self.confidences.tolist(), names)
+        ]
@@ -0,0 +1,183 @@
+"""
+Frame preprocessing: reduced-resolution decode, ROI crop and letterboxing
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.ai.slot_classifier import slot_boxes
+from app.ai.slot_layout import SlotLayout
+
+# Decode flags by downscale factor; libjpeg scales while decoding, skipping most of the work
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Start-of-frame markers carrying the image size (not DHT, JPG or DAC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    (height, width) of a JPEG read from its header, without decoding
+    
+    Returns None for other formats or a malformed header.
+    """
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    position = 2
+    while position + 9 < len(data):
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte
+            position += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            position += 2
+            continue
+        length = int.from_bytes(data[position + 2:position + 4], "big")
+        if marker in _SOF_MARKERS:
+            height = int.from_bytes(data[position + 5:position + 7], "big")
+            width = int.from_bytes(data[position + 7:position + 9], "big")
+            return (height, width) if height and width else None
+        position += 2 + length
+    return None
+
+
+def max_reduction(source_side: int, target_side: int) -> int:
+    """Largest decode downscale (8, 4 or 2) that keeps `source_side` at least `target_side`"""
+    for factor in (8, 4, 2):
+        if source_side // factor >= target_side:
+            return factor
+    return 1
+
+
+def decode_image(data: bytes, reduction: int = 1) -> Optional[np.ndarray]:
+    """Decode an encoded image, shrunk by `reduction` (1, 2, 4 or 8) during decoding"""
+    buffer = np.frombuffer(data, np.uint8)
+    return cv2.imdecode(buffer, REDUCED_DECODE_FLAGS.get(reduction, cv2.IMREAD_COLOR))
+
+
+def roi_box(frame_shape: Tuple[int, ...], layout: Optional[SlotLayout], margin: float = 0.05) -> np.ndarray:
+    """
+    Pixel box (x1, y1, x2, y2) around all of a camera's slots
+    
+    Grown by `margin` of its size on each side so cars overhanging the
+    outer slots are still seen whole. Without a layout, the whole frame.
+    """
+    height, width = frame_shape[:2]
+    if layout is None or len(layout) == 0:
+        return np.array([0, 0, width, height])
+    boxes = slot_boxes(layout, frame_shape)
+    x1, y1 = boxes[:, :2].min(axis=0)
+    x2, y2 = boxes[:, 2:].max(axis=0)
+    pad_x, pad_y = int((x2 - x1) * margin), int((y2 - y1) * margin)
+    return np.array([max(0, x1 - pad_x), max(0, y1 - pad_y), min(width, x2 + pad_x), min(height, y2 + pad_y)])
+
+
+def restore_scale(results: Dict, original_shape: Optional[Tuple[int, int]]) -> Dict:
+    """
+    Report detections in the pixel coordinates of the original image
+    
+    For frames decoded at reduced resolution; `results["image_shape"]` is
+    the decoded size. Returns a copy, as results may be cached.
+    """
+    decoded = results.get("image_shape")
+    if not original_shape or not decoded or tuple(decoded[:2]) == tuple(original_shape[:2]):
+        return results
+    scale = np.array([original_shape[1] / decoded[1], original_shape[0] / decoded[0]] * 2)
+    detections = [
+        dict(detection, bbox=(np.asarray(detection["bbox"]) * scale).tolist())
+        for detection in results.get("detections", [])
+    ]
+    image_shape = [original_shape[0], original_shape[1]] + list(decoded[2:])
+    return dict(results, detections=detections, image_shape=image_shape)
+
+
+class LetterboxTransform:
+    """Maps boxes from a letterboxed model input back to the frame"""
+    
+    __slots__ = ("scale", "pad_x", "pad_y", "offset_x", "offset_y")
+    
+    def __init__(self, scale: float, pad_x: int, pad_y: int, offset_x: int = 0, offset_y: int = 0):
+        self.scale = scale
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+    
+    def to_frame(self, boxes: np.ndarray) -> np.ndarray:
+        """(N, 4) xyxy boxes in input coordinates -> frame coordinates"""
+        pad = np.array([self.pad_x, self.pad_y, self.pad_x, self.pad_y], dtype=np.float32)
+        offset = np.array([self.offset_x, self.offset_y, self.offset_x, self.offset_y], dtype=np.float32)
+        return (np.asarray(boxes, dtype=np.float32) - pad) / self.scale + offset
+
+
+class Letterboxer:
+    """
+    Resizes frames into square model inputs held in a pool of reusable buffers
+    
+    The resize writes straight into a pooled buffer and only the padding
+    bands are refilled, so a frame costs no allocation once the pool is
+    warm. Buffers must be handed back with `release` once the model has
+    run; when all are out, a new one is allocated (and kept, up to
+    `pool_size`).
+    """
+    
+    def __init__(self, size: int = 640, pool_size: int = 16, fill: int = 114):
+        self.size = size
+        self.pool_size = pool_size
+        self.fill = fill
+        self.free: List[np.ndarray] = []
+        self.allocated = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self) -> np.ndarray:
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+            self.allocated += 1
+        return np.full((self.size, self.size, 3), self.fill, dtype=np.uint8)
+    
+    def release(self, buffer: np.ndarray):
+        with self.lock:
+            if len(self.free) < self.pool_size:
+                self.free.append(buffer)
+    
+    def letterbox(self, image: np.ndarray, box: Optional[np.ndarray] = None) -> Tuple[np.ndarray, LetterboxTransform]:
+        """
+        Fit `image` (or its `box` region) into a pooled square buffer
+        
+        Returns:
+            (buffer, transform back to `image` coordinates)
+        """
+        x1, y1, x2, y2 = (int(value) for value in box) if box is not None else (0, 0, image.shape[1], image.shape[0])
+        region = image[y1:y2, x1:x2]
+        height, width = region.shape[:2]
+        scale = min(self.size / height, self.size / width)
+        new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+        left, top = (self.size - new_width) // 2, (self.size - new_height) // 2
+        
+        buffer = self.acquire()
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        cv2.resize(
+            region, (new_width, new_height),
+            dst=buffer[top:top + new_height, left:left + new_width],
+            interpolation=interpolation
+        )
+        buffer[:top] = self.fill
+        buffer[top + new_height:] = self.fill
+        buffer[top:top + new_height, :left] = self.fill
+        buffer[top:top + new_height, left + new_width:] = self.fill
+        return buffer, LetterboxTransform(scale, left, top, x1, y1)
+    
+    def stats(self) -> Dict:
+        return {"size": self.size, "allocated": self.allocated, "free": len(self.free)}
@@ -0,0 +1,219 @@
+"""
+Batched persistence of monitoring results
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, update
+
+from app.core.database import SessionLocal
+from app.events.events import LotAvailabilityChanged, SlotStatusChanged
+from app.events.pipeline import event_pipeline
+from app.models.parking_lot import ParkingLot
+from app.models.parking_slot import ParkingSlot, SlotStatus
+
+logger = logging.getLogger(__name__)
+
+# Statuses cameras decide; reserved and maintenance slots are left alone
+DETECTED_STATUSES = (SlotStatus.AVAILABLE, SlotStatus.OCCUPIED)
+
+
+class ResultsSink:
+    """
+    Collects monitoring results from all lots and writes them out in batches
+    
+    Ticks hand over their stable slot changes and latest results with
+    `submit`, which never waits on the database. Every `flush_interval`
+    seconds, or as soon as `batch_max_size` slot changes are pending, one
+    flush:
+    
+    - reads the current status of the pending slots with one query and
+      applies only real changes, with one bulk UPDATE for the slots and
+      one for the lots' `available_slots`, in a single transaction
+    - writes each reporting lot's results to Redis in one pipelined round trip
+    - publishes the applied changes to WebSocket subscribers through the
+      change event pipeline
+    
+    Pending changes are coalesced per slot, so a slot flipping back and
+    forth between flushes costs at most one write. Changes that fail to
+    write are kept for the next flush unless newer ones arrived.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        redis_client=None,
+        publish: Callable[[Iterable], None] = event_pipeline.publish,
+        flush_interval: float = 1.0,
+        batch_max_size: int = 500,
+        cache_ttl: int = 300
+    ):
+        self.session_factory = session_factory
+        self.redis_client = redis_client
+        self.publish = publish
+        self.flush_interval = flush_interval
+        self.batch_max_size = max(1, batch_max_size)
+        self.cache_ttl = cache_ttl
+        # slot id -> (parking lot id, status), the latest per slot
+        self.pending_slots: Dict[int, Tuple[int, str]] = {}
+        # parking lot id -> latest results
+        self.pending_results: Dict[int, Dict] = {}
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.flush_lock: Optional[asyncio.Lock] = None
+        self.counters = {
+            "flushes": 0,
+            "slot_updates": 0,
+            "unchanged": 0,
+            "lot_updates": 0,
+            "cache_writes": 0,
+            "errors": 0,
+        }
+    
+    def _ensure_started(self):
+        """Start the flush loop on the running loop"""
+        if self.task is None or self.task.done():
+            self.wakeup = asyncio.Event()
+            self.flush_lock = asyncio.Lock()
+            self.task = asyncio.create_task(self._run())
+    
+    def submit(self, parking_lot_id: int, results: Dict, changes: List[Dict] = ()):
+        """
+        Queue a tick's outcome for the next flush
+        
+        Args:
+            results: The lot's latest detection results, cached as its summary
+            changes: Stable slot status changes ({"slot_id", "status"}),
+                as returned by the occupancy tracker
+        """
+        self._ensure_started()
+        for change in changes:
+            self.pending_slots[int(change["slot_id"])] = (parking_lot_id, change["status"])
+        self.pending_results[parking_lot_id] = results
+        if len(self.pending_slots) >= self.batch_max_size:
+            self.wakeup.set()
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Until the interval is up or a full batch is pending
+            timer = loop.call_later(self.flush_interval, self.wakeup.set)
+            try:
+                await self.wakeup.wait()
+            finally:
+                timer.cancel()
+            self.wakeup.clear()
+            await self.flush()
+    
+    async def flush(self):
+        """Write out everything pending"""
+        if self.flush_lock is None:
+            self.flush_lock = asyncio.Lock()
+        async with self.flush_lock:
+            slots, self.pending_slots = self.pending_slots, {}
+            results, self.pending_results = self.pending_results, {}
+            if not slots and not results:
+                return
+            self.counters["flushes"] += 1
+            
+            if slots:
+                try:
+                    events = await asyncio.to_thread(self._write_slots, slots)
+                except Exception as e:
+                    self.counters["errors"] += 1
+                    logger.error(f"Failed to write {len(slots)} slot status changes: {e}")
+                    # Retry with the next flush, unless a newer status came in meanwhile
+                    for slot_id, change in slots.items():
+                        self.pending_slots.setdefault(slot_id, change)
+                else:
+                    if events:
+                        self.publish(events)
+            
+            if results and self.redis_client is not None:
+                try:
+                    await asyncio.to_thread(self._write_cache, results)
+                except Exception as e:
+                    self.counters["errors"] += 1
+                    logger.error(f"Failed to cache results of {len(results)} parking lots: {e}")
+    
+    def _write_slots(self, slots: Dict[int, Tuple[int, str]]) -> List:
+        """Apply slot changes in one transaction; the change events to publish (blocking)"""
+        db = self.session_factory()
+        try:
+            current = {
+                slot_id: (parking_lot_id, status)
+                for slot_id, parking_lot_id, status in db.query(
+                    ParkingSlot.id, ParkingSlot.parking_lot_id, ParkingSlot.status
+                ).filter(ParkingSlot.id.in_(list(slots)))
+            }
+            
+            now = datetime.now(timezone.utc)
+            rows, events = [], []
+            for slot_id, (parking_lot_id, status) in slots.items():
+                lot_id, previous = current.get(slot_id, (None, None))
+                if lot_id != parking_lot_id or previous not in DETECTED_STATUSES or previous.value == status:
+                    self.counters["unchanged"] += 1
+                    continue
+                rows.append({"id": slot_id, "status": SlotStatus(status), "last_detected_at": now})
+                events.append(SlotStatusChanged(
+                    parking_lot_id=parking_lot_id,
+                    slot_id=slot_id,
+                    status=status,
+                    previous_status=previous.value
+                ))
+            if not rows:
+                db.rollback()
+                return []
+            db.execute(update(ParkingSlot), rows)
+            
+            # Recount availability of the lots that changed
+            lot_ids = sorted({change.parking_lot_id for change in events})
+            available = dict(
+                db.query(ParkingSlot.parking_lot_id, func.count(ParkingSlot.id))
+                .filter(ParkingSlot.parking_lot_id.in_(lot_ids), ParkingSlot.status == SlotStatus.AVAILABLE)
+                .group_by(ParkingSlot.parking_lot_id)
+            )
+            db.execute(update(ParkingLot), [
+                {"id": lot_id, "available_slots": available.get(lot_id, 0)} for lot_id in lot_ids
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        
+        self.counters["slot_updates"] += len(rows)
+        self.counters["lot_updates"] += len(lot_ids)
+        return events + [
+            LotAvailabilityChanged(parking_lot_id=lot_id, available_slots=available.get(lot_id, 0))
+            for lot_id in lot_ids
+        ]
+    
+    def _write_cache(self, results: Dict[int, Dict]):
+        """Cache each lot's latest results in one round trip (blocking)"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for parking_lot_id, lot_results in results.items():
+            pipe.setex(f"parking_lot:{parking_lot_id}:slots", self.cache_ttl, json.dumps(lot_results))
+        pipe.execute()
+        self.counters["cache_writes"] += len(results)
+    
+    async def close(self):
+        """Stop the flush loop and write out what is pending"""
+        if self.task is not None:
+            # Not in the middle of a flush, whose batch would be lost
+            async with self.flush_lock:
+                self.task.cancel()
+                try:
+                    await self.task
+                except asyncio.CancelledError:
+                    pass
+            self.task = None
+        await self.flush()
+    
+    def stats(self) -> Dict:
+        return dict(self.counters, pending_slots=len(self.pending_slots), pending_lots=len(self.pending_results))
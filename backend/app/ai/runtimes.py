@@ -0,0 +1,144 @@
+"""
+Inference runtimes: pick the fastest exported copy of the detector
+"""
+
+import importlib.util
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Fastest first on CPU-only servers; the INT8 model exists only if it passed its accuracy gate
+RUNTIMES = ("onnx-int8", "openvino", "onnx", "torchscript", "pytorch")
+
+# Package each runtime needs besides ultralytics
+RUNTIME_PACKAGES = {
+    "onnx-int8": "onnxruntime",
+    "openvino": "openvino",
+    "onnx": "onnxruntime",
+    "torchscript": "torch",
+    "pytorch": "torch",
+}
+
+
+def artifact_path(weights: Path, runtime: str) -> Path:
+    """Where `ai-service/train_model.py --export/--quantize` put a runtime's copy of `weights`"""
+    weights = Path(weights)
+    if runtime == "openvino":
+        return weights.parent / f"{weights.stem}_openvino_model"
+    if runtime == "onnx":
+        return weights.with_suffix(".onnx")
+    if runtime == "onnx-int8":
+        return weights.with_suffix(".int8.onnx")
+    if runtime == "torchscript":
+        return weights.with_suffix(".torchscript")
+    return weights
+
+
+def manifest_path(weights: Path) -> Path:
+    """Export settings written next to the weights"""
+    weights = Path(weights)
+    return weights.with_name(f"{weights.stem}.export.json")
+
+
+def read_manifest(weights: Path) -> Dict:
+    """Input size and batch the artifacts were exported with ({} if none)"""
+    path = manifest_path(weights)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def runtime_installed(runtime: str) -> bool:
+    """Whether the runtime's package can be imported"""
+    return importlib.util.find_spec(RUNTIME_PACKAGES[runtime]) is not None
+
+
+def available_runtimes(weights: Path) -> List[str]:
+    """Runtimes with both an artifact on disk and their package installed, fastest first"""
+    return [
+        runtime for runtime in RUNTIMES
+        if artifact_path(weights, runtime).exists() and runtime_installed(runtime)
+    ]
+
+
+def select_runtime(weights: Path, preference: str = "auto") -> Tuple[str, Path]:
+    """
+    Choose the runtime to load the detector with
+    
+    Args:
+        weights: Path of the PyTorch weights the artifacts were exported from
+        preference: "auto" for the fastest available runtime, or a runtime
+            name; an unavailable runtime falls back to "auto"
+    
+    Returns:
+        (runtime, path to load)
+    """
+    available = available_runtimes(weights)
+    if preference != "auto":
+        if preference in available:
+            return preference, artifact_path(weights, preference)
+        print(f"⚠️  Inference runtime '{preference}' not available, choosing automatically")
+    if available:
+        return available[0], artifact_path(weights, available[0])
+    return "pytorch", Path(weights)
+
+
+def predict_fixed_batch(model, images: Sequence[np.ndarray], batch: Optional[int], **kwargs) -> List:
+    """
+    Run a model exported with a fixed batch size on any number of frames
+    
+    Frames are split into chunks of `batch`; the last chunk is padded by
+    repeating its final frame and the padding's results are dropped.
+    Without a fixed batch, all frames go through in one call.
+    """
+    images = list(images)
+    if not batch:
+        return list(model(images, **kwargs))
+    results = []
+    for start in range(0, len(images), batch):
+        chunk = images[start:start + batch]
+        padded = chunk + [chunk[-1]] * (batch - len(chunk))
+        results.extend(list(model(padded, **kwargs))[:len(chunk)])
+    return results
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of two sets of xyxy boxes"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def detections_match(
+    reference: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    candidate: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    iou_threshold: float = 0.9,
+    confidence_tolerance: float = 0.05
+) -> bool:
+    """
+    Whether two runtimes found the same detections within tolerance
+    
+    Each argument is (boxes xyxy, confidences, classes). Every reference
+    detection must pair with a candidate detection of the same class, with
+    IoU of at least `iou_threshold` and confidence within
+    `confidence_tolerance`, and the counts must agree.
+    """
+    ref_boxes, ref_conf, ref_cls = reference
+    cand_boxes, cand_conf, cand_cls = candidate
+    if len(ref_boxes) != len(cand_boxes):
+        return False
+    if len(ref_boxes) == 0:
+        return True
+    iou = box_iou(np.asarray(ref_boxes, dtype=np.float32), np.asarray(cand_boxes, dtype=np.float32))
+    iou[np.asarray(ref_cls)[:, None] != np.asarray(cand_cls)[None, :]] = 0
+    best = iou.argmax(axis=1)
+    if len(set(best.tolist())) != len(best):
+        return False
+    matched_iou = iou[np.arange(len(best)), best]
+    matched_conf = np.abs(np.asarray(ref_conf) - np.asarray(cand_conf)[best])
+    return bool((matched_iou >= iou_threshold).all() and (matched_conf <= confidence_tolerance).all())
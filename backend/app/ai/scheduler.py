@@ -0,0 +1,206 @@
+"""
+Central scheduler for monitored cameras
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledCamera:
+    """A monitored camera's place in the schedule"""
+    
+    __slots__ = ("key", "interval", "priority", "due", "seq")
+    
+    def __init__(self, key: int, interval: float, priority: int = 0):
+        self.key = key
+        self.interval = interval
+        self.priority = priority
+        self.due = 0.0
+        # Identifies the camera's current queue entry; older entries are stale
+        self.seq = -1
+
+
+class CameraScheduler:
+    """
+    Runs every monitored camera's tick from one dispatcher
+    
+    Cameras wait in a heap ordered by when they are next due. Due cameras
+    move to a ready queue ordered by priority, then by how long they have
+    been due, and at most `max_concurrent` ticks run at once. A fleet of
+    cameras so costs a steady stream of fetches and inferences instead of a
+    burst every interval. First ticks are spread over one interval and
+    every later one is jittered, so cameras added together drift apart.
+    
+    When ticks cannot keep up, cameras run late rather than pile up: the
+    next tick is due one interval after the late one started, not on the
+    original grid, so there are no catch-up bursts, and low-priority
+    cameras are the first to slow down. Lateness is reported as lag.
+    """
+    
+    def __init__(
+        self,
+        run: Callable[[int], Awaitable[None]],
+        max_concurrent: int = 32,
+        jitter: float = 0.1,
+        window: int = 1024
+    ):
+        self.run = run
+        self.max_concurrent = max(1, max_concurrent)
+        self.jitter = jitter
+        self.cameras: Dict[int, ScheduledCamera] = {}
+        self.waiting: List[Tuple[float, int, int]] = []  # (due, seq, key)
+        self.ready: List[Tuple[int, float, int, int]] = []  # (-priority, due, seq, key)
+        self.running: Dict[int, asyncio.Task] = {}
+        self.wakeup: Optional[asyncio.Event] = None
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.counter = itertools.count()
+        self.lags: Deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.dispatched = 0
+        self.late = 0
+        self.failures = 0
+    
+    def _ensure_started(self):
+        """Start the dispatcher on the running loop"""
+        if self.dispatcher is None or self.dispatcher.done():
+            self.wakeup = asyncio.Event()
+            self.dispatcher = asyncio.create_task(self._dispatch())
+    
+    def schedule(self, key: int, interval: float, priority: int = 0, delay: Optional[float] = None):
+        """
+        Add a camera, or change its interval and priority
+        
+        Its first tick is due after `delay` seconds, or at a random point
+        within one interval if None.
+        """
+        self._ensure_started()
+        camera = self.cameras.get(key)
+        if camera is None:
+            camera = self.cameras[key] = ScheduledCamera(key, interval, priority)
+        camera.interval, camera.priority = interval, priority
+        if delay is None:
+            delay = random.uniform(0, interval)
+        camera.due = asyncio.get_running_loop().time() + delay
+        self._push(camera)
+    
+    def set_interval(self, key: int, interval: float):
+        """Change when a camera's next tick is due, counted from the start of its last one"""
+        camera = self.cameras.get(key)
+        if camera is not None:
+            camera.interval = interval
+    
+    async def remove(self, key: int):
+        """Take a camera off the schedule, cancelling a tick in progress"""
+        self.cameras.pop(key, None)
+        task = self.running.pop(key, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    async def stop(self):
+        """Stop dispatching and cancel running ticks"""
+        for key in list(self.cameras):
+            await self.remove(key)
+        self.waiting.clear()
+        self.ready.clear()
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+            try:
+                await self.dispatcher
+            except asyncio.CancelledError:
+                pass
+            self.dispatcher = None
+    
+    def _push(self, camera: ScheduledCamera):
+        camera.seq = next(self.counter)
+        heapq.heappush(self.waiting, (camera.due, camera.seq, camera.key))
+        self.wakeup.set()
+    
+    def _current(self, seq: int, key: int) -> Optional[ScheduledCamera]:
+        """The camera a queue entry belongs to, unless the entry is stale"""
+        camera = self.cameras.get(key)
+        return camera if camera is not None and camera.seq == seq else None
+    
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self.waiting and self.waiting[0][0] <= now:
+                due, seq, key = heapq.heappop(self.waiting)
+                camera = self._current(seq, key)
+                if camera is not None:
+                    heapq.heappush(self.ready, (-camera.priority, due, seq, key))
+            
+            while self.ready and len(self.running) < self.max_concurrent:
+                _, due, seq, key = heapq.heappop(self.ready)
+                camera = self._current(seq, key)
+                # A camera rescheduled mid-tick is queued again when the tick ends
+                if camera is not None and key not in self.running:
+                    self._start(camera, due, now)
+            
+            # Sleep until the next camera is due, a tick ends or the schedule changes
+            self.wakeup.clear()
+            timer = loop.call_at(self.waiting[0][0], self.wakeup.set) if self.waiting else None
+            try:
+                await self.wakeup.wait()
+            finally:
+                if timer is not None:
+                    timer.cancel()
+    
+    def _start(self, camera: ScheduledCamera, due: float, now: float):
+        lag = now - due
+        self.lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag > camera.interval:
+            self.late += 1
+        self.dispatched += 1
+        self.running[camera.key] = asyncio.create_task(self._tick(camera, now))
+    
+    async def _tick(self, camera: ScheduledCamera, started: float):
+        try:
+            await self.run(camera.key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Monitoring tick for parking lot {camera.key} failed: {e}")
+        finally:
+            if self.running.get(camera.key) is asyncio.current_task():
+                del self.running[camera.key]
+            if self.cameras.get(camera.key) is camera:
+                jitter = random.uniform(-self.jitter, self.jitter)
+                camera.due = started + camera.interval * (1 + jitter)
+                self._push(camera)
+            else:
+                self.wakeup.set()
+    
+    def stats(self) -> Dict:
+        """Queue sizes, tick counters and scheduling lag percentiles in milliseconds"""
+        ordered = sorted(self.lags)
+        ready = sum(1 for _, _, seq, key in self.ready if self._current(seq, key) is not None)
+        stats = {
+            "cameras": len(self.cameras),
+            "running": len(self.running),
+            "ready": ready,
+            "dispatched": self.dispatched,
+            "late": self.late,
+            "failures": self.failures,
+        }
+        if not ordered:
+            return dict(stats, lag_p50_ms=0.0, lag_p99_ms=0.0, lag_max_ms=0.0)
+        return dict(
+            stats,
+            lag_p50_ms=ordered[len(ordered) // 2] * 1000,
+            lag_p99_ms=ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+            lag_max_ms=self.max_lag * 1000
+        )
@@ -0,0 +1,352 @@
+"""
+Sharding monitored lots across worker processes with leases
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import or_
+
+from app.ai.monitoring_registry import active_assignments
+from app.core.database import SessionLocal
+from app.models.monitored_camera import MonitoredCamera, MonitoringWorker
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class HashRing:
+    """
+    Consistent hashing of parking lots onto workers
+    
+    Each worker is placed on the ring at `vnodes` points, so lots spread
+    evenly and a worker joining or leaving moves only about 1/n of them.
+    """
+    
+    def __init__(self, workers: Iterable[str], vnodes: int = 64):
+        self.workers = sorted(set(workers))
+        points = sorted(
+            (_hash(f"{worker}#{replica}"), worker) for worker in self.workers for replica in range(vnodes)
+        )
+        self.points = [point for point, _ in points]
+        self.owners = [worker for _, worker in points]
+    
+    def owner(self, key: int) -> Optional[str]:
+        if not self.points:
+            return None
+        index = bisect.bisect(self.points, _hash(f"lot:{key}")) % len(self.points)
+        return self.owners[index]
+
+
+class LocalLeaseStore:
+    """
+    In-memory leases and heartbeats
+    
+    Stands in for the database store when all workers run in one process
+    (development and tests).
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.heartbeats: Dict[str, float] = {}
+        self.leases: Dict[int, Tuple[str, float]] = {}
+    
+    def heartbeat(self, worker_id: str, now: float):
+        with self.lock:
+            self.heartbeats[worker_id] = now
+    
+    def live_workers(self, now: float, ttl: float) -> Set[str]:
+        with self.lock:
+            return {worker for worker, beat in self.heartbeats.items() if now - beat < ttl}
+    
+    def claim(self, worker_id: str, keys: Iterable[int], now: float, ttl: float) -> Set[int]:
+        with self.lock:
+            held = set()
+            for key in keys:
+                owner, expires = self.leases.get(key, (None, 0.0))
+                if owner is None or owner == worker_id or expires <= now:
+                    self.leases[key] = (worker_id, now + ttl)
+                    held.add(key)
+            return held
+    
+    def release(self, worker_id: str, keys: Iterable[int]):
+        with self.lock:
+            for key in keys:
+                if self.leases.get(key, (None, 0.0))[0] == worker_id:
+                    del self.leases[key]
+    
+    def leave(self, worker_id: str):
+        with self.lock:
+            self.heartbeats.pop(worker_id, None)
+            self.leases = {key: lease for key, lease in self.leases.items() if lease[0] != worker_id}
+
+
+class DatabaseLeaseStore:
+    """
+    Leases on the monitored_cameras rows and heartbeats in monitoring_workers
+    
+    Claims are compare-and-set UPDATEs, so two workers can never hold the
+    same lot, even while they disagree about who is alive.
+    """
+    
+    def __init__(self, session_factory: Callable = SessionLocal):
+        self.session_factory = session_factory
+    
+    def heartbeat(self, worker_id: str, now: float):
+        db = self.session_factory()
+        try:
+            worker = db.get(MonitoringWorker, worker_id)
+            if worker is None:
+                db.add(MonitoringWorker(worker_id=worker_id, heartbeat_at=now))
+            else:
+                worker.heartbeat_at = now
+            db.commit()
+        finally:
+            db.close()
+    
+    def live_workers(self, now: float, ttl: float) -> Set[str]:
+        db = self.session_factory()
+        try:
+            rows = db.query(MonitoringWorker.worker_id).filter(MonitoringWorker.heartbeat_at > now - ttl)
+            return {worker_id for worker_id, in rows}
+        finally:
+            db.close()
+    
+    def claim(self, worker_id: str, keys: Iterable[int], now: float, ttl: float) -> Set[int]:
+        keys = list(keys)
+        if not keys:
+            return set()
+        db = self.session_factory()
+        try:
+            # Take free or expired leases and renew our own, in one statement
+            db.query(MonitoredCamera).filter(
+                MonitoredCamera.parking_lot_id.in_(keys),
+                or_(
+                    MonitoredCamera.lease_owner.is_(None),
+                    MonitoredCamera.lease_owner == worker_id,
+                    MonitoredCamera.lease_expires_at <= now
+                )
+            ).update(
+                {MonitoredCamera.lease_owner: worker_id, MonitoredCamera.lease_expires_at: now + ttl},
+                synchronize_session=False
+            )
+            db.commit()
+            rows = db.query(MonitoredCamera.parking_lot_id).filter(
+                MonitoredCamera.parking_lot_id.in_(keys), MonitoredCamera.lease_owner == worker_id
+            )
+            return {parking_lot_id for parking_lot_id, in rows}
+        finally:
+            db.close()
+    
+    def release(self, worker_id: str, keys: Iterable[int]):
+        keys = list(keys)
+        if not keys:
+            return
+        db = self.session_factory()
+        try:
+            db.query(MonitoredCamera).filter(
+                MonitoredCamera.parking_lot_id.in_(keys), MonitoredCamera.lease_owner == worker_id
+            ).update(
+                {MonitoredCamera.lease_owner: None, MonitoredCamera.lease_expires_at: None},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+    
+    def leave(self, worker_id: str):
+        db = self.session_factory()
+        try:
+            db.query(MonitoredCamera).filter(MonitoredCamera.lease_owner == worker_id).update(
+                {MonitoredCamera.lease_owner: None, MonitoredCamera.lease_expires_at: None},
+                synchronize_session=False
+            )
+            db.query(MonitoringWorker).filter(MonitoringWorker.worker_id == worker_id).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+class MonitoringCoordinator:
+    """
+    Runs this worker's share of the monitored lots
+    
+    Every `heartbeat` seconds the coordinator records that this worker is
+    alive, reads the active monitoring assignments and the workers seen
+    within `lease_ttl`, and hashes every lot onto those workers. For the
+    lots that land on this worker it claims or renews a lease for
+    `lease_ttl` seconds and monitors the ones it holds. Lots that now
+    belong elsewhere, or were stopped, are stopped here and their leases
+    released, so the new owner takes them over on its next round.
+    
+    A worker that dies stops heartbeating and renewing. After `lease_ttl`
+    its lots hash onto the remaining workers and their leases have
+    expired, so they are picked up without anyone stepping in. A worker
+    that joins takes over its share as the others hand it over. Lots
+    picked up in one round start staggered over `warmup` seconds.
+    """
+    
+    def __init__(
+        self,
+        camera_manager,
+        detector,
+        store=None,
+        worker_id: Optional[str] = None,
+        session_factory: Callable = SessionLocal,
+        heartbeat: float = 10.0,
+        lease_ttl: float = 30.0,
+        vnodes: int = 64,
+        warmup: float = 10.0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.camera_manager = camera_manager
+        self.detector = detector
+        self.store = store if store is not None else DatabaseLeaseStore(session_factory)
+        self.worker_id = worker_id or default_worker_id()
+        self.session_factory = session_factory
+        self.heartbeat = heartbeat
+        self.lease_ttl = max(lease_ttl, heartbeat)
+        self.vnodes = vnodes
+        self.warmup = warmup
+        self.clock = clock
+        self.ring = HashRing([self.worker_id], vnodes)
+        # Lots monitored here, with the assignment they were started from
+        self.owned: Dict[int, Tuple] = {}
+        self.lock = asyncio.Lock()
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.counters = {"rounds": 0, "acquired": 0, "released": 0, "lost": 0, "errors": 0}
+    
+    async def start(self):
+        """Join the fleet and start rebalancing on the running loop"""
+        if self.task and not self.task.done():
+            return
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop monitoring here and hand every lease back at once"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        async with self.lock:
+            for parking_lot_id in list(self.owned):
+                await self.camera_manager.stop_monitoring(parking_lot_id)
+            self.owned.clear()
+            await asyncio.to_thread(self.store.leave, self.worker_id)
+    
+    def wake(self):
+        """Rebalance now rather than at the next heartbeat (e.g. after an assignment changed)"""
+        if self.wakeup is not None:
+            self.wakeup.set()
+    
+    def owner(self, parking_lot_id: int) -> Optional[str]:
+        """The worker a lot hashes to, as of the last round"""
+        return self.ring.owner(parking_lot_id)
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await self.rebalance()
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.error(f"Monitoring rebalance failed: {e}")
+            timer = loop.call_later(self.heartbeat, self.wakeup.set)
+            try:
+                await self.wakeup.wait()
+            finally:
+                timer.cancel()
+            self.wakeup.clear()
+    
+    def _read(self, now: float) -> Tuple[List[Tuple[int, Tuple]], Set[str]]:
+        """Heartbeat, then the assignments to run and the live workers (blocking)"""
+        self.store.heartbeat(self.worker_id, now)
+        workers = self.store.live_workers(now, self.lease_ttl)
+        db = self.session_factory()
+        try:
+            assignments = [
+                (
+                    assignment.parking_lot_id,
+                    (
+                        camera_url, assignment.interval, assignment.priority or 0, assignment.min_interval,
+                        assignment.max_interval, assignment.detection_engine
+                    )
+                )
+                for assignment, camera_url in active_assignments(db)
+                if camera_url
+            ]
+        finally:
+            db.close()
+        return assignments, workers
+    
+    async def rebalance(self):
+        """One round: heartbeat, hand over lots hashed elsewhere, claim and start our own"""
+        async with self.lock:
+            now = self.clock()
+            assignments, workers = await asyncio.to_thread(self._read, now)
+            self.ring = HashRing(workers | {self.worker_id}, self.vnodes)
+            wanted = {
+                parking_lot_id: config
+                for parking_lot_id, config in assignments
+                if self.ring.owner(parking_lot_id) == self.worker_id
+            }
+            
+            # Hand over lots that moved to another worker or are no longer monitored
+            handed_over = [parking_lot_id for parking_lot_id in self.owned if parking_lot_id not in wanted]
+            for parking_lot_id in handed_over:
+                await self.camera_manager.stop_monitoring(parking_lot_id)
+                del self.owned[parking_lot_id]
+            if handed_over:
+                await asyncio.to_thread(self.store.release, self.worker_id, handed_over)
+                self.counters["released"] += len(handed_over)
+            
+            held = await asyncio.to_thread(self.store.claim, self.worker_id, list(wanted), now, self.lease_ttl)
+            for parking_lot_id in [parking_lot_id for parking_lot_id in self.owned if parking_lot_id not in held]:
+                # Another worker holds it (our lease lapsed while we were unreachable)
+                logger.warning(f"Lost the monitoring lease of parking lot {parking_lot_id}")
+                await self.camera_manager.stop_monitoring(parking_lot_id)
+                del self.owned[parking_lot_id]
+                self.counters["lost"] += 1
+            
+            # Start new lots, highest priority first, and restart ones whose assignment changed
+            starting = [
+                (parking_lot_id, config) for parking_lot_id, config in assignments
+                if parking_lot_id in held and self.owned.get(parking_lot_id) != config
+            ]
+            for position, (parking_lot_id, config) in enumerate(starting):
+                camera_url, interval, priority, min_interval, max_interval, engine = config
+                await self.camera_manager.start_monitoring(
+                    parking_lot_id, camera_url, self.detector, interval, priority,
+                    min_interval, max_interval, engine, delay=self.warmup * position / len(starting)
+                )
+                if parking_lot_id not in self.owned:
+                    self.counters["acquired"] += 1
+                self.owned[parking_lot_id] = config
+            self.counters["rounds"] += 1
+    
+    def stats(self) -> Dict:
+        return dict(
+            self.counters,
+            worker_id=self.worker_id,
+            workers=len(self.ring.workers),
+            owned=len(self.owned)
+        )
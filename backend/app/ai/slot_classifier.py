@@ -0,0 +1,106 @@
+"""
+Per-slot crop classifier: a fast alternative to full-frame detection
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from app.ai.slot_layout import SlotLayout
+
+# Detection engines a parking lot can use
+ENGINE_YOLO = "yolo"
+ENGINE_CLASSIFIER = "classifier"
+DETECTION_ENGINES = (ENGINE_YOLO, ENGINE_CLASSIFIER)
+
+
+def slot_boxes(layout: SlotLayout, frame_shape: Tuple[int, ...]) -> np.ndarray:
+    """Pixel bounding box (x1, y1, x2, y2) of every slot polygon, clipped to the frame"""
+    height, width = frame_shape[:2]
+    scale = np.array([width, height], dtype=np.float32)
+    low = np.floor(layout.polygons.min(axis=1) * scale)
+    high = np.ceil(layout.polygons.max(axis=1) * scale)
+    boxes = np.concatenate([low, high], axis=1).astype(np.int32)
+    boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+    boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+    # Keep at least one pixel so every slot yields a crop
+    boxes[:, 2] = np.maximum(boxes[:, 2], np.minimum(boxes[:, 0] + 1, width))
+    boxes[:, 3] = np.maximum(boxes[:, 3], np.minimum(boxes[:, 1] + 1, height))
+    boxes[:, 0] = np.minimum(boxes[:, 0], boxes[:, 2] - 1)
+    boxes[:, 1] = np.minimum(boxes[:, 1], boxes[:, 3] - 1)
+    return boxes
+
+
+class SlotClassifier:
+    """
+    Classifies every slot crop of a frame as empty or occupied in one pass
+    
+    The model is a small image classifier exported to ONNX by
+    `ai-service/train_model.py --classifier` (classes in folder order:
+    empty, occupied). It runs through OpenCV's DNN module, so it needs
+    neither PyTorch nor ultralytics at runtime.
+    """
+    
+    def __init__(self, model_path: Path, input_size: int = 64):
+        self.model_path = Path(model_path)
+        self.input_size = input_size
+        self.net = None
+        # cv2.dnn networks must not run forward passes concurrently
+        self.lock = threading.Lock()
+    
+    def load(self):
+        """Load the ONNX model (called from the inference pool)"""
+        if self.net is None:
+            self.net = cv2.dnn.readNetFromONNX(str(self.model_path))
+    
+    def crops(self, image: np.ndarray, layout: SlotLayout) -> List[np.ndarray]:
+        """Cut every slot's bounding box out of the frame (views, no copies)"""
+        return [image[y1:y2, x1:x2] for x1, y1, x2, y2 in slot_boxes(layout, image.shape)]
+    
+    def blob(self, image: np.ndarray, layout: SlotLayout) -> np.ndarray:
+        """All slot crops resized into one NCHW float batch (RGB, 0-1)"""
+        return cv2.dnn.blobFromImages(
+            self.crops(image, layout),
+            scalefactor=1 / 255,
+            size=(self.input_size, self.input_size),
+            swapRB=True
+        )
+    
+    def predict(self, image: np.ndarray, layout: SlotLayout) -> np.ndarray:
+        """
+        Probability that each slot is occupied
+        
+        Returns:
+            (S,) array in layout order
+        """
+        if len(layout) == 0:
+            return np.zeros(0, dtype=np.float32)
+        batch = self.blob(image, layout)
+        with self.lock:
+            self.load()
+            self.net.setInput(batch)
+            scores = self.net.forward()
+        scores = scores.reshape(len(layout), -1)
+        if scores.shape[1] == 1:
+            return scores[:, 0]
+        return scores[:, 1]
+
+
+# Loaded classifiers, one per model file in each process
+_classifiers: Dict[str, SlotClassifier] = {}
+
+
+def predict_slots(model_path: str, input_size: int, image: np.ndarray, layout: SlotLayout) -> np.ndarray:
+    """
+    Run the slot classifier stored at `model_path`
+    
+    Module-level so it can run in thread and process pools alike; each
+    process loads the model once.
+    """
+    classifier = _classifiers.get(model_path)
+    if classifier is None:
+        classifier = _classifiers.setdefault(model_path, SlotClassifier(model_path, input_size))
+    return classifier.predict(image, layout)
@@ -0,0 +1,221 @@
+"""
+Slot layouts: per-camera slot polygons and vectorized occupancy
+"""
+
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.parking_lot import ParkingLot
+from app.models.parking_slot import ParkingSlot
+from app.models.slot_region import SlotRegion
+
+# Sample points per polygon side; each slot is measured on a grid of this size
+GRID_SIZE = 12
+
+
+def points_in_polygons(points: np.ndarray, polygons: np.ndarray) -> np.ndarray:
+    """
+    Even-odd point-in-polygon test for many polygons at once
+    
+    Args:
+        points: (S, K, 2) points to test, K per polygon
+        polygons: (S, V, 2) vertices; shorter polygons are padded by
+            repeating their first vertex, which adds only empty edges
+    
+    Returns:
+        (S, K) boolean mask
+    """
+    x = points[:, :, None, 0]
+    y = points[:, :, None, 1]
+    xi = polygons[:, None, :, 0]
+    yi = polygons[:, None, :, 1]
+    xj = np.roll(polygons, 1, axis=1)[:, None, :, 0]
+    yj = np.roll(polygons, 1, axis=1)[:, None, :, 1]
+    straddles = (yi > y) != (yj > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_x = (xj - xi) * (y - yi) / (yj - yi) + xi
+    crossings = straddles & (x < crossing_x)
+    return np.count_nonzero(crossings, axis=2) % 2 == 1
+
+
+class SlotLayout:
+    """
+    The slots one camera sees, compiled for fast occupancy checks
+    
+    Each polygon is covered by a GRID_SIZE x GRID_SIZE grid of sample points
+    spanning its bounding box; the points inside the polygon stand in for
+    its area. Coverage of a slot by a detection box is then the fraction of
+    the slot's points inside the box, computed for all slots and all boxes
+    in one array operation.
+    """
+    
+    def __init__(
+        self,
+        slot_ids: Sequence[int],
+        slot_numbers: Sequence[str],
+        polygons: Sequence[Sequence[Sequence[float]]],
+        camera_id: str = "main"
+    ):
+        self.camera_id = camera_id
+        self.slot_ids = np.asarray(slot_ids, dtype=np.int64)
+        self.slot_numbers = list(slot_numbers)
+        count = len(self.slot_numbers)
+        
+        max_vertices = max((len(polygon) for polygon in polygons), default=3)
+        vertices = np.zeros((count, max_vertices, 2), dtype=np.float32)
+        for index, polygon in enumerate(polygons):
+            points = np.asarray(polygon, dtype=np.float32)
+            vertices[index, :len(points)] = points
+            vertices[index, len(points):] = points[0]
+        self.polygons = vertices
+        
+        # Sample grid spanning each polygon's bounding box, at cell centres
+        low = vertices.min(axis=1)
+        high = vertices.max(axis=1)
+        steps = (np.arange(GRID_SIZE, dtype=np.float32) + 0.5) / GRID_SIZE
+        grid_x, grid_y = np.meshgrid(steps, steps)
+        unit_grid = np.stack([grid_x.ravel(), grid_y.ravel()], axis=1)
+        self.samples = low[:, None, :] + unit_grid[None, :, :] * (high - low)[:, None, :]
+        self.sample_mask = points_in_polygons(self.samples, vertices)
+        # Degenerate polygons with no interior sample fall back to all samples
+        empty = ~self.sample_mask.any(axis=1)
+        self.sample_mask[empty] = True
+        self.sample_counts = self.sample_mask.sum(axis=1)
+    
+    def __len__(self) -> int:
+        return len(self.slot_numbers)
+    
+    def same_as(self, other: Optional["SlotLayout"]) -> bool:
+        """Whether another layout has the same camera, slots and polygons"""
+        return (
+            other is not None
+            and self.camera_id == other.camera_id
+            and self.slot_numbers == other.slot_numbers
+            and np.array_equal(self.slot_ids, other.slot_ids)
+            and np.array_equal(self.polygons, other.polygons)
+        )
+    
+    def subset(self, mask: np.ndarray) -> "SlotLayout":
+        """The slots selected by a boolean mask, without recompiling"""
+        layout = SlotLayout.__new__(SlotLayout)
+        layout.camera_id = self.camera_id
+        layout.slot_ids = self.slot_ids[mask]
+        layout.slot_numbers = [number for number, keep in zip(self.slot_numbers, mask) if keep]
+        layout.polygons = self.polygons[mask]
+        layout.samples = self.samples[mask]
+        layout.sample_mask = self.sample_mask[mask]
+        layout.sample_counts = self.sample_counts[mask]
+        return layout
+    
+    def coverage(self, boxes: np.ndarray, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Fraction of each slot covered by each detection box
+        
+        Args:
+            boxes: (N, 4) xyxy pixel boxes
+            frame_shape: shape of the frame the boxes came from
+        
+        Returns:
+            (S, N) coverage ratios in [0, 1]
+        """
+        if len(self) == 0 or len(boxes) == 0:
+            return np.zeros((len(self), len(boxes)), dtype=np.float32)
+        height, width = frame_shape[:2]
+        normalized = np.asarray(boxes, dtype=np.float32) / np.array(
+            [width, height, width, height], dtype=np.float32
+        )
+        x = self.samples[:, :, None, 0]
+        y = self.samples[:, :, None, 1]
+        inside = (
+            (x >= normalized[:, 0]) & (x <= normalized[:, 2]) &
+            (y >= normalized[:, 1]) & (y <= normalized[:, 3]) &
+            self.sample_mask[:, :, None]
+        )
+        return inside.sum(axis=1) / self.sample_counts[:, None]
+    
+    def occupancy(
+        self,
+        boxes: np.ndarray,
+        frame_shape: Tuple[int, ...],
+        threshold: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decide which slots are occupied
+        
+        A slot is occupied when a single vehicle box covers at least
+        `threshold` of it, so a car overhanging a neighbour's line does not
+        mark the neighbour taken.
+        
+        Returns:
+            (occupied mask (S,), best coverage per slot (S,))
+        """
+        coverage = self.coverage(boxes, frame_shape)
+        best = coverage.max(axis=1) if coverage.shape[1] else np.zeros(len(self), dtype=np.float32)
+        return best >= threshold, best
+
+
+class LayoutCache:
+    """
+    Compiled slot layouts keyed by (parking lot, camera)
+    
+    Entries, including "no layout", are reloaded after `ttl` seconds. The
+    process that saves a layout invalidates it at once; other processes
+    (sharded monitoring workers) pick it up when their entry expires.
+    """
+    
+    def __init__(self, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.ttl = settings.SLOT_LAYOUT_CACHE_TTL if ttl is None else ttl
+        self.clock = clock
+        # (parking lot, camera) -> (layout, monotonic time it was loaded)
+        self.layouts: Dict[Tuple[int, str], Tuple[Optional[SlotLayout], float]] = {}
+    
+    def get(self, db: Session, parking_lot_id: int, camera_id: str = "main") -> Optional[SlotLayout]:
+        """Load (or reuse) a camera's layout; None if no regions are defined"""
+        key = (parking_lot_id, camera_id)
+        now = self.clock()
+        cached = self.layouts.get(key)
+        if cached is None or now - cached[1] >= self.ttl:
+            rows = (
+                db.query(SlotRegion.parking_slot_id, ParkingSlot.slot_number, SlotRegion.polygon)
+                .join(ParkingSlot, ParkingSlot.id == SlotRegion.parking_slot_id)
+                .filter(SlotRegion.parking_lot_id == parking_lot_id, SlotRegion.camera_id == camera_id)
+                .order_by(ParkingSlot.id)
+                .all()
+            )
+            layout = SlotLayout(
+                [row[0] for row in rows],
+                [row[1] for row in rows],
+                [row[2] for row in rows],
+                camera_id=camera_id
+            ) if rows else None
+            if layout is not None and cached is not None and layout.same_as(cached[0]):
+                # Unchanged: keep the object, so the change gate's state stays valid
+                layout = cached[0]
+            cached = self.layouts[key] = (layout, now)
+        return cached[0]
+    
+    def invalidate(self, parking_lot_id: int):
+        """Forget every cached layout of a parking lot"""
+        for key in [key for key in self.layouts if key[0] == parking_lot_id]:
+            del self.layouts[key]
+
+
+layout_cache = LayoutCache()
+
+
+def lot_detection_config(
+    db: Session,
+    parking_lot_id: int,
+    camera_id: str = "main",
+    engine: Optional[str] = None
+) -> Tuple[Optional[SlotLayout], str]:
+    """Slot layout and detection engine to use for a lot's camera"""
+    if engine is None:
+        engine = db.query(ParkingLot.detection_engine).filter(
+            ParkingLot.id == parking_lot_id
+        ).scalar() or settings.DEFAULT_DETECTION_ENGINE
+    return layout_cache.get(db, parking_lot_id, camera_id), engine
@@ -0,0 +1,182 @@
+"""
+Persistent readers for RTSP and MJPEG camera streams
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# URLs read as a continuous stream rather than fetched as one snapshot per tick
+STREAM_SCHEMES = frozenset({"rtsp", "rtsps", "rtmp", "file"})
+MJPEG_SUFFIXES = (".mjpg", ".mjpeg")
+# Schemes of network cameras; file:// (a local video) is only allowed with
+# CAMERA_ALLOW_FILE_URLS, for development and tests
+NETWORK_SCHEMES = frozenset({"http", "https", "rtsp", "rtsps", "rtmp"})
+
+
+def is_stream_url(url: str) -> bool:
+    """Whether a camera URL is a video stream (RTSP, MJPEG over HTTP or a video file)"""
+    parsed = urlparse(url)
+    return parsed.scheme in STREAM_SCHEMES or parsed.path.lower().endswith(MJPEG_SUFFIXES)
+
+
+def is_network_url(url: str) -> bool:
+    """Whether a camera URL points at a host on the network rather than a local path"""
+    parsed = urlparse(url)
+    return parsed.scheme in NETWORK_SCHEMES and bool(parsed.hostname)
+
+
+def is_allowed_camera_url(url: str) -> bool:
+    """Whether a lot may be monitored from a camera URL (local videos only with CAMERA_ALLOW_FILE_URLS)"""
+    if urlparse(url).scheme == "file":
+        return settings.CAMERA_ALLOW_FILE_URLS
+    return is_network_url(url)
+
+
+def _source(url: str) -> str:
+    """What to hand to cv2.VideoCapture; local files without their scheme"""
+    parsed = urlparse(url)
+    return parsed.path if parsed.scheme == "file" else url
+
+
+class StreamReader:
+    """
+    Decodes a camera stream in a background thread, keeping only the latest frame
+    
+    Frames are decoded into a preallocated back buffer that is swapped with
+    the front one under a lock, so readers of `latest` never see a half
+    written frame and no frame is allocated once the stream's size is known.
+    Decoding continuously keeps the stream's own buffer drained, so the
+    latest frame is current rather than the oldest queued one.
+    
+    A stream that fails to open or stops delivering frames is reopened
+    after a delay that doubles up to `backoff_max`. Video files (the
+    stand-in for a camera in tests and benchmarks) play at their recorded
+    frame rate and start over at the end.
+    """
+    
+    def __init__(
+        self,
+        url: str,
+        backoff_min: float = 1.0,
+        backoff_max: float = 30.0,
+        open_capture: Callable[[str], "cv2.VideoCapture"] = cv2.VideoCapture
+    ):
+        self.url = url
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.open_capture = open_capture
+        self.is_file = urlparse(url).scheme == "file"
+        
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.front: Optional[np.ndarray] = None
+        self.back: Optional[np.ndarray] = None
+        self.frame_id = 0
+        self.frame_time = 0.0
+        self.connected = False
+        self.reconnects = 0
+    
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name=f"stream-reader {self.url}", daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop reading and wait for the thread to release the stream"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+        self.connected = False
+    
+    def latest(self, max_age: Optional[float] = None) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        The newest frame, copied out, with its sequence number
+        
+        Returns None before the first frame, or if the newest one is older
+        than `max_age` seconds (the stream has stalled).
+        """
+        with self.lock:
+            if self.front is None:
+                return None
+            if max_age is not None and time.monotonic() - self.frame_time > max_age:
+                return None
+            return self.frame_id, self.front.copy()
+    
+    def _run(self):
+        backoff = self.backoff_min
+        while not self.stopping.is_set():
+            capture = self.open_capture(_source(self.url))
+            delivered = capture.isOpened() and self._read(capture)
+            capture.release()
+            self.connected = False
+            if self.stopping.is_set():
+                break
+            
+            if delivered:
+                backoff = self.backoff_min
+            # Files start over at once; live streams back off
+            delay = 0.0 if self.is_file and delivered else backoff
+            if not self.is_file:
+                logger.warning(f"Stream {self.url} unavailable, reconnecting in {delay:.0f}s")
+            self.reconnects += 1
+            if self.stopping.wait(delay):
+                break
+            if not delivered:
+                backoff = min(backoff * 2, self.backoff_max)
+    
+    def _read(self, capture) -> bool:
+        """Decode frames until the stream ends or fails; whether any arrived"""
+        self.connected = True
+        # Pace files at their recorded rate; live streams pace themselves
+        fps = capture.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        period = 1.0 / fps if fps and fps > 0 else 0.0
+        delivered = False
+        while not self.stopping.is_set():
+            started = time.monotonic()
+            ok, frame = capture.read(self.back)
+            if not ok or frame is None:
+                return delivered
+            with self.lock:
+                self.back, self.front = self.front, frame
+                self.frame_id += 1
+                self.frame_time = time.monotonic()
+            if self.back is not None and self.back.shape != frame.shape:
+                # The stream changed size: allocate afresh on the next read
+                self.back = None
+            delivered = True
+            if period:
+                self.stopping.wait(max(0.0, period - (time.monotonic() - started)))
+        return delivered
+    
+    def stats(self) -> Dict:
+        age = time.monotonic() - self.frame_time if self.frame_id else None
+        return {
+            "connected": self.connected,
+            "frames": self.frame_id,
+            "reconnects": self.reconnects,
+            "frame_age": round(age, 3) if age is not None else None,
+        }
+
+
+def read_one_frame(url: str) -> Optional[np.ndarray]:
+    """Open a stream, decode one frame and close it (blocking)"""
+    capture = cv2.VideoCapture(_source(url))
+    try:
+        ok, frame = capture.read() if capture.isOpened() else (False, None)
+        return frame if ok else None
+    finally:
+        capture.release()
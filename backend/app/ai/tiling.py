@@ -0,0 +1,157 @@
+"""
+Tiled inference for high-resolution cameras
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.ai.postprocess import Detections
+from app.ai.slot_classifier import slot_boxes
+from app.ai.slot_layout import SlotLayout
+
+
+def _starts(length: int, tile: int, stride: int) -> np.ndarray:
+    """Tile offsets along one axis; the last tile is shifted to end at the edge"""
+    if length <= tile:
+        return np.zeros(1, dtype=np.int64)
+    starts = np.arange(0, length - tile, stride, dtype=np.int64)
+    return np.append(starts, length - tile)
+
+
+def tile_grid(frame_shape: Tuple[int, ...], tile_size: int = 640, overlap: float = 0.2) -> np.ndarray:
+    """
+    Overlapping tiles covering a frame
+    
+    Returns:
+        (T, 4) xyxy pixel boxes, row by row
+    """
+    height, width = frame_shape[:2]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    xs = _starts(width, tile_size, stride)
+    ys = _starts(height, tile_size, stride)
+    x1, y1 = np.meshgrid(xs, ys)
+    x1, y1 = x1.ravel(), y1.ravel()
+    return np.stack([x1, y1, np.minimum(x1 + tile_size, width), np.minimum(y1 + tile_size, height)], axis=1)
+
+
+def layout_tiles(
+    frame_shape: Tuple[int, ...],
+    layout: Optional[SlotLayout],
+    tile_size: int = 640,
+    overlap: float = 0.2
+) -> np.ndarray:
+    """
+    The tiles of the grid that intersect at least one slot
+    
+    Without a layout every tile is kept. Tiles that see only sky, roads or
+    buildings are skipped, so a camera costs as much as its parking area.
+    """
+    tiles = tile_grid(frame_shape, tile_size, overlap)
+    if layout is None or len(layout) == 0:
+        return tiles
+    slots = slot_boxes(layout, frame_shape)
+    overlaps = (
+        (tiles[:, None, 0] < slots[None, :, 2]) & (slots[None, :, 0] < tiles[:, None, 2])
+        & (tiles[:, None, 1] < slots[None, :, 3]) & (slots[None, :, 1] < tiles[:, None, 3])
+    )
+    return tiles[overlaps.any(axis=1)]
+
+
+def crop_tiles(image: np.ndarray, tiles: np.ndarray) -> List[np.ndarray]:
+    """Tile views of a frame (no copies)"""
+    return [image[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles.tolist()]
+
+
+def suppress_duplicates(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    classes: np.ndarray,
+    tile_ids: np.ndarray,
+    truncated: Optional[np.ndarray] = None,
+    iou_threshold: float = 0.5,
+    containment_threshold: float = 0.8
+) -> np.ndarray:
+    """
+    Greedy NMS across tiles, with the pairwise overlaps computed at once
+    
+    Boxes are ranked (complete boxes before ones cut by a tile edge, then
+    by score) and a box is dropped if any higher-ranked box of the same
+    class overlaps it with IoU of at least `iou_threshold`. A car cut by a
+    tile edge leaves a truncated box inside the full one from the
+    neighbouring tile; their IoU can be low, so boxes from different tiles
+    are also merged when the smaller one lies mostly
+    (`containment_threshold`) inside the other.
+    
+    Only kept boxes suppress others: when A suppresses B and B overlaps C
+    but A does not, C is kept, as in greedy NMS. The overlap matrix is
+    vectorized; the pass over it takes one row operation per box.
+    
+    Returns:
+        Indices of the kept boxes, best ranked first
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if truncated is None:
+        truncated = np.zeros(len(boxes), dtype=bool)
+    order = np.lexsort((-scores, truncated))
+    boxes, classes, tile_ids = boxes[order], classes[order], tile_ids[order]
+    
+    top_left = np.maximum(boxes[:, None, :2], boxes[None, :, :2])
+    bottom_right = np.minimum(boxes[:, None, 2:], boxes[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    iou = intersection / np.maximum(areas[:, None] + areas[None, :] - intersection, 1e-9)
+    containment = intersection / np.maximum(np.minimum(areas[:, None], areas[None, :]), 1e-9)
+    
+    duplicate = (iou >= iou_threshold) | (
+        (containment >= containment_threshold) & (tile_ids[:, None] != tile_ids[None, :])
+    )
+    duplicate &= classes[:, None] == classes[None, :]
+    # Only higher-ranked boxes (earlier rows) can suppress later ones
+    duplicate = np.triu(duplicate, k=1)
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    for i in range(len(boxes)):
+        if not suppressed[i]:
+            suppressed |= duplicate[i]
+    return order[~suppressed]
+
+
+def merge_tile_detections(
+    tile_detections: Sequence[Detections],
+    tiles: np.ndarray,
+    frame_shape: Tuple[int, ...],
+    iou_threshold: float = 0.5,
+    containment_threshold: float = 0.8,
+    edge_margin: float = 2.0
+) -> Detections:
+    """
+    Shift each tile's detections into frame coordinates and merge the duplicates
+    
+    Tile edges are compared with `frame_shape` rather than with the
+    outermost tiles, which stop short of the frame edge when tiles
+    without slots were left out.
+    """
+    names = tile_detections[0].names if tile_detections else {}
+    if not tile_detections:
+        return Detections.empty(names)
+    counts = [len(detections) for detections in tile_detections]
+    local = np.concatenate([d.boxes for d in tile_detections])
+    owners = np.repeat(tiles, counts, axis=0).astype(np.float32)
+    scores = np.concatenate([d.confidences for d in tile_detections])
+    classes = np.concatenate([d.class_ids for d in tile_detections])
+    tile_ids = np.repeat(np.arange(len(tile_detections)), counts)
+    
+    # Boxes touching a tile edge that is not a frame edge are probably cut off
+    sizes = owners[:, 2:] - owners[:, :2]
+    frame_end = np.array([frame_shape[1], frame_shape[0]], dtype=np.float32)
+    truncated = (
+        ((local[:, :2] <= edge_margin) & (owners[:, :2] > 0))
+        | ((local[:, 2:] >= sizes - edge_margin) & (owners[:, 2:] < frame_end))
+    ).any(axis=1)
+    
+    boxes = local + np.tile(owners[:, :2], 2)
+    keep = suppress_duplicates(
+        boxes, scores, classes, tile_ids, truncated, iou_threshold, containment_threshold
+    )
+    return Detections(boxes[keep], scores[keep], classes[keep], names)
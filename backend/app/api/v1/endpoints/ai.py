@@ -2,18 +2,26 @@
 AI endpoints for parking slot detection
 """
 
-from fastapi import APIRouter, HTTPException, File, UploadFile, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, BackgroundTasks, Query
+from sqlalchemy.orm import Session
 from fastapi.responses import JSONResponse
-import cv2
-import numpy as np
-from typing import Dict
+from typing import Dict, Optional, Literal
 from datetime import datetime
 import json
 import redis
 
 from app.ai.detector import ParkingSlotDetector
 from app.ai.camera_manager import CameraManager
+from app.ai.inference import InferenceBusyError, InferenceTimeoutError
+from app.ai.monitoring_registry import deactivate_assignment, save_assignment
+from app.ai.preprocess import decode_image, jpeg_size, restore_scale
+from app.ai.sharding import MonitoringCoordinator
+from app.ai.slot_layout import lot_detection_config
+from app.ai.stream_reader import is_allowed_camera_url, is_stream_url
 from app.core.config import settings
+from app.core.database import get_db
+from app.core.loop_monitor import loop_monitor
+from app.models.parking_lot import ParkingLot
 
 router = APIRouter()
 
@@ -21,6 +29,8 @@ router = APIRouter()
 detector: ParkingSlotDetector = None
 camera_manager: CameraManager = None
 redis_client = None
+# Set when monitored lots are sharded across workers
+coordinator: Optional[MonitoringCoordinator] = None
 
 
 def init_ai_components(det: ParkingSlotDetector, cam_mgr: CameraManager, redis_cli=None):
@@ -29,13 +39,49 @@ def init_ai_components(det: ParkingSlotDetector, cam_mgr: CameraManager, redis_c
     detector = det
     camera_manager = cam_mgr
     redis_client = redis_cli
+    if cam_mgr:
+        cam_mgr.results_sink.redis_client = redis_cli
+
+
+def set_monitoring_coordinator(coord: Optional[MonitoringCoordinator]):
+    """Hand monitoring over to the sharding coordinator"""
+    global coordinator
+    coordinator = coord
+
+
+def _check_camera_url(camera_url: str):
+    """Reject camera URLs that would open something other than a network camera (e.g. a local file)"""
+    if not is_allowed_camera_url(camera_url):
+        raise HTTPException(
+            status_code=400, detail="Camera URL must be an http(s), rtsp(s) or rtmp URL with a host"
+        )
+
+
+async def _detect_encoded(image_bytes: bytes, parking_lot_id: int, layout, engine: str) -> Dict:
+    """
+    Decode an uploaded or fetched image and detect its slots
+    
+    JPEGs are decoded at reduced size when the model input allows;
+    detections are reported in the coordinates of the full image.
+    """
+    size = jpeg_size(image_bytes)
+    img = decode_image(image_bytes, detector.decode_reduction(size, layout, engine))
+    
+    if img is None:
+        raise HTTPException(status_code=400, detail="Invalid image format")
+    
+    results = await detector.detect_slots(img, parking_lot_id, layout, engine)
+    return restore_scale(results, size)
 
 
 @router.post("/detect-slots")
 async def detect_slots(
     parking_lot_id: int,
     image: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None
+    camera_id: str = "main",
+    engine: Optional[Literal["yolo", "classifier"]] = None,
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db)
 ):
     """
     Detect parking slots from an uploaded image
@@ -46,14 +92,10 @@ async def detect_slots(
     try:
         # Read image
         image_bytes = await image.read()
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            raise HTTPException(status_code=400, detail="Invalid image format")
         
-        # Detect parking slots
-        results = await detector.detect_slots(img, parking_lot_id)
+        # Detect parking slots, per slot if this camera has a layout
+        layout, engine = lot_detection_config(db, parking_lot_id, camera_id, engine)
+        results = await _detect_encoded(image_bytes, parking_lot_id, layout, engine)
         
         # Store results in Redis for real-time updates
         if redis_client:
@@ -66,6 +108,10 @@ async def detect_slots(
         
         return JSONResponse(content=results)
     
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except InferenceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection error: {str(e)}")
 
@@ -74,23 +120,34 @@ async def detect_slots(
 async def detect_from_url(
     parking_lot_id: int,
     camera_url: str,
-    background_tasks: BackgroundTasks = None
+    camera_id: str = "main",
+    engine: Optional[Literal["yolo", "classifier"]] = None,
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db)
 ):
     """
     Detect parking slots from a camera URL
     """
     if not detector or not camera_manager:
         raise HTTPException(status_code=503, detail="AI components not initialized")
+    _check_camera_url(camera_url)
     
     try:
-        # Fetch image from camera URL
-        img = await camera_manager.fetch_image(camera_url)
+        # Detect parking slots, per slot if this camera has a layout
+        layout, engine = lot_detection_config(db, parking_lot_id, camera_id, engine)
         
-        if img is None:
-            raise HTTPException(status_code=400, detail="Failed to fetch image from camera")
-        
-        # Detect parking slots
-        results = await detector.detect_slots(img, parking_lot_id)
+        if is_stream_url(camera_url):
+            # Latest frame of an RTSP/MJPEG stream
+            img = await camera_manager.fetch_stream_frame(camera_url)
+            if img is None:
+                raise HTTPException(status_code=400, detail="Failed to read frame from camera stream")
+            results = await detector.detect_slots(img, parking_lot_id, layout, engine)
+        else:
+            # Fetch image from camera URL
+            image_bytes = await camera_manager.fetch_bytes(camera_url)
+            if image_bytes is None:
+                raise HTTPException(status_code=400, detail="Failed to fetch image from camera")
+            results = await _detect_encoded(image_bytes, parking_lot_id, layout, engine)
         
         # Store results in Redis
         if redis_client:
@@ -103,6 +160,10 @@ async def detect_from_url(
         
         return JSONResponse(content=results)
     
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except InferenceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection error: {str(e)}")
 
@@ -135,34 +196,79 @@ async def get_slot_status(parking_lot_id: int):
 
 
 @router.post("/parking-lot/{parking_lot_id}/start-monitoring")
-async def start_monitoring(parking_lot_id: int, camera_url: str):
+async def start_monitoring(
+    parking_lot_id: int,
+    camera_url: Optional[str] = None,
+    interval: Optional[float] = Query(None, gt=0),
+    priority: int = 0,
+    min_interval: Optional[float] = Query(None, gt=0),
+    max_interval: Optional[float] = Query(None, gt=0),
+    engine: Optional[Literal["yolo", "classifier"]] = None,
+    db: Session = Depends(get_db)
+):
     """
     Start continuous monitoring of a parking lot
+    
+    Without a `camera_url` the lot's own camera is used.
+    Lots with a higher priority are served first when the scheduler is overloaded.
+    The interval adapts to activity, time of day and bookings within
+    `min_interval` and `max_interval`.
+    The assignment is stored and resumed when the server restarts. When lots are
+    sharded across workers, the worker the lot hashes to picks it up.
     """
     if not detector or not camera_manager:
         raise HTTPException(status_code=503, detail="AI components not initialized")
     
+    parking_lot = db.query(ParkingLot).filter(ParkingLot.id == parking_lot_id).first()
+    if not parking_lot:
+        raise HTTPException(status_code=404, detail="Parking lot not found")
+    if not (camera_url or parking_lot.camera_url):
+        raise HTTPException(status_code=400, detail="No camera URL given and the parking lot has none")
+    _check_camera_url(camera_url or parking_lot.camera_url)
+    
     try:
-        await camera_manager.start_monitoring(parking_lot_id, camera_url, detector)
+        save_assignment(
+            db, parking_lot_id, camera_url, interval, priority, min_interval, max_interval, engine
+        )
+        if coordinator:
+            await coordinator.rebalance()
+            started = parking_lot_id in coordinator.owned
+        else:
+            await camera_manager.start_monitoring(
+                parking_lot_id, camera_url or parking_lot.camera_url, detector,
+                interval, priority, min_interval, max_interval, engine
+            )
+            started = True
         return {
-            "status": "monitoring_started",
+            "status": "monitoring_started" if started else "monitoring_assigned",
             "parking_lot_id": parking_lot_id,
-            "camera_url": camera_url
+            "worker": coordinator.owner(parking_lot_id) if coordinator else None,
+            "camera_url": camera_url or parking_lot.camera_url,
+            "interval": interval or settings.CAMERA_MONITOR_INTERVAL,
+            "priority": priority,
+            "engine": engine or parking_lot.detection_engine
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
 @router.post("/parking-lot/{parking_lot_id}/stop-monitoring")
-async def stop_monitoring(parking_lot_id: int):
+async def stop_monitoring(parking_lot_id: int, db: Session = Depends(get_db)):
     """
     Stop monitoring a parking lot
+    
+    It is no longer resumed when the server restarts.
     """
     if not camera_manager:
         raise HTTPException(status_code=503, detail="AI components not initialized")
     
     try:
-        await camera_manager.stop_monitoring(parking_lot_id)
+        deactivate_assignment(db, parking_lot_id)
+        if coordinator:
+            # Its owner stops it on its next round; this one may be it
+            await coordinator.rebalance()
+        else:
+            await camera_manager.stop_monitoring(parking_lot_id)
         return {
             "status": "monitoring_stopped",
             "parking_lot_id": parking_lot_id
@@ -189,3 +295,43 @@ async def get_safety_score(parking_lot_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+
+@router.get("/cameras/health")
+async def get_camera_health():
+    """
+    Get the health of monitored cameras
+    
+    Lists each camera's circuit breaker state (closed, open or half_open),
+    recent success rate and fetch latency, and when an open breaker will
+    probe the camera again. Unhealthy cameras come first.
+    """
+    if not camera_manager:
+        raise HTTPException(status_code=503, detail="AI components not initialized")
+    
+    return {
+        "cameras": camera_manager.health.snapshot(),
+        "summary": camera_manager.health.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/metrics")
+async def get_ai_metrics():
+    """
+    Get inference queue and event loop lag metrics
+    """
+    return {
+        "inference": dict(detector.executor.stats(), runtime=detector.runtime) if detector else None,
+        "batching": detector.batcher.stats() if detector else None,
+        "letterbox": detector.letterboxer.stats() if detector else None,
+        "camera_fetch": camera_manager.stats() if camera_manager else None,
+        "camera_health": camera_manager.health.stats() if camera_manager else None,
+        "scheduler": camera_manager.scheduler.stats() if camera_manager else None,
+        "sharding": coordinator.stats() if coordinator else None,
+        "intervals": camera_manager.intervals.stats() if camera_manager else None,
+        "results": camera_manager.results_sink.stats() if camera_manager else None,
+        "change_gate": detector.change_gate.stats() if detector and detector.change_gate else None,
+        "occupancy": detector.occupancy_tracker.stats() if detector else None,
+        "event_loop": loop_monitor.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
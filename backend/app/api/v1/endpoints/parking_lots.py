@@ -13,10 +13,12 @@ from app.core.security import get_current_user
 from app.models.user import User
 from app.models.parking_lot import ParkingLot
 from app.models.parking_slot import ParkingSlot, SlotStatus
+from app.models.slot_region import SlotRegion
 from app.schemas.parking import (
     ParkingLotCreate, ParkingLotUpdate, ParkingLotResponse,
-    NearbyParkingRequest
+    NearbyParkingRequest, SlotLayoutUpdate, SlotLayoutResponse
 )
+from app.ai.slot_layout import layout_cache
 
 router = APIRouter()
 
@@ -205,6 +207,7 @@ async def delete_parking_lot(
     
     db.delete(parking_lot)
     db.commit()
+    layout_cache.invalidate(lot_id)
     
     return None
 
@@ -237,3 +240,115 @@ async def update_slot_status(
     
     return {"status": "updated", "parking_lot_id": lot_id}
 
+
+def _layout_response(db: Session, lot_id: int, camera_id: str) -> dict:
+    """Serialize a camera's slot regions"""
+    rows = (
+        db.query(SlotRegion, ParkingSlot.slot_number)
+        .join(ParkingSlot, ParkingSlot.id == SlotRegion.parking_slot_id)
+        .filter(SlotRegion.parking_lot_id == lot_id, SlotRegion.camera_id == camera_id)
+        .order_by(ParkingSlot.id)
+        .all()
+    )
+    return {
+        "parking_lot_id": lot_id,
+        "camera_id": camera_id,
+        "regions": [
+            {"slot_id": region.parking_slot_id, "slot_number": slot_number, "polygon": region.polygon}
+            for region, slot_number in rows
+        ]
+    }
+
+
+@router.get("/{lot_id}/layouts/{camera_id}", response_model=SlotLayoutResponse)
+async def get_slot_layout(
+    lot_id: int,
+    camera_id: str,
+    db: Session = Depends(get_db)
+):
+    """Get the slot polygons of one camera"""
+    parking_lot = db.query(ParkingLot).filter(ParkingLot.id == lot_id).first()
+    
+    if not parking_lot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Parking lot not found"
+        )
+    
+    return _layout_response(db, lot_id, camera_id)
+
+
+@router.put("/{lot_id}/layouts/{camera_id}", response_model=SlotLayoutResponse)
+async def update_slot_layout(
+    lot_id: int,
+    camera_id: str,
+    layout: SlotLayoutUpdate,
+    create_missing: bool = Query(False, description="Create slots that do not exist yet"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Replace the slot polygons of one camera (admin or owner only)"""
+    parking_lot = db.query(ParkingLot).filter(ParkingLot.id == lot_id).first()
+    
+    if not parking_lot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Parking lot not found"
+        )
+    
+    # Check permissions
+    if current_user.role != "admin" and parking_lot.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    slot_numbers = [region.slot_number for region in layout.regions]
+    if len(set(slot_numbers)) != len(slot_numbers):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each slot may appear only once per camera"
+        )
+    
+    slots = {
+        slot.slot_number: slot
+        for slot in db.query(ParkingSlot).filter(
+            ParkingSlot.parking_lot_id == lot_id,
+            ParkingSlot.slot_number.in_(slot_numbers)
+        )
+    }
+    missing = [number for number in slot_numbers if number not in slots]
+    if missing and not create_missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown slots: {', '.join(missing)}"
+        )
+    for number in missing:
+        slot = ParkingSlot(parking_lot_id=lot_id, slot_number=number)
+        db.add(slot)
+        slots[number] = slot
+    db.flush()
+    
+    # Replace this camera's regions
+    db.query(SlotRegion).filter(
+        SlotRegion.parking_lot_id == lot_id,
+        SlotRegion.camera_id == camera_id
+    ).delete(synchronize_session=False)
+    for region in layout.regions:
+        slot = slots[region.slot_number]
+        slot.camera_detection_id = camera_id
+        db.add(SlotRegion(
+            parking_lot_id=lot_id,
+            parking_slot_id=slot.id,
+            camera_id=camera_id,
+            polygon=[list(point) for point in region.polygon]
+        ))
+    
+    if missing:
+        parking_lot.total_slots = db.query(ParkingSlot).filter(
+            ParkingSlot.parking_lot_id == lot_id
+        ).count()
+    db.commit()
+    layout_cache.invalidate(lot_id)
+    
+    return _layout_response(db, lot_id, camera_id)
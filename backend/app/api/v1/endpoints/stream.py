@@ -0,0 +1,94 @@
+"""
+Server-Sent Events endpoints for availability streaming
+"""
+
+from fastapi import APIRouter, HTTPException, status, Query, Header, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, AsyncIterator
+import asyncio
+
+from app.core.config import settings
+from app.websocket.manager import client_address, websocket_manager
+from app.websocket.sse import StreamConnection, parse_last_event_id, RETRY_MS
+
+router = APIRouter()
+
+
+async def event_stream(
+    request: Request,
+    connection: StreamConnection,
+    lot_ids: List[int],
+    epoch: Optional[str]
+) -> AsyncIterator[str]:
+    """Subscribe a stream connection to its lots and yield SSE events"""
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        for lot_id in lot_ids:
+            await websocket_manager.subscribe(
+                connection,
+                lot_id,
+                last_seq=connection.cursor.get(lot_id),
+                epoch=epoch
+            )
+        
+        while True:
+            if connection.overflowed and connection.queue.empty():
+                # Client fell too far behind; it resumes via Last-Event-ID
+                break
+            try:
+                encoded = await asyncio.wait_for(
+                    connection.queue.get(),
+                    timeout=settings.WS_PING_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle stream
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield connection.format_event(encoded)
+    finally:
+        websocket_manager.release(connection)
+
+
+@router.get("/availability")
+async def stream_availability(
+    request: Request,
+    lot_ids: List[int] = Query(..., description="Parking lot IDs to watch"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Stream availability updates for a set of parking lots as Server-Sent Events
+    
+    Events mirror the WebSocket messages (`snapshot`, `parking_update`). Each
+    update's id encodes the position in every watched lot, so an EventSource
+    reconnecting with Last-Event-ID receives only what it missed.
+    """
+    lot_ids = list(dict.fromkeys(lot_ids))
+    if len(lot_ids) > settings.SSE_MAX_LOTS_PER_STREAM:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.SSE_MAX_LOTS_PER_STREAM} parking lots per stream"
+        )
+    
+    epoch, cursor = parse_last_event_id(last_event_id)
+    connection = StreamConnection(
+        client_ip=client_address(request, websocket_manager.trust_forwarded_for),
+        epoch=websocket_manager.epoch,
+        cursor={lot_id: seq for lot_id, seq in cursor.items() if lot_id in lot_ids},
+        queue_size=settings.SSE_QUEUE_SIZE
+    )
+    if not websocket_manager.register_stream(connection):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open streams"
+        )
+    
+    return StreamingResponse(
+        event_stream(request, connection, lot_ids, epoch),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering (nginx)
+        }
+    )
@@ -12,7 +12,8 @@ from app.api.v1.endpoints import (
     payments,
     analytics,
     safety,
-    ai
+    ai,
+    stream
 )
 
 api_router = APIRouter()
@@ -27,5 +28,6 @@ api_router.include_router(payments.router, prefix="/payments", tags=["Payments"]
 api_router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
 api_router.include_router(safety.router, prefix="/safety", tags=["Safety Ratings"])
 api_router.include_router(ai.router, prefix="/ai", tags=["AI Detection"])
+api_router.include_router(stream.router, prefix="/stream", tags=["Streaming"])
 
 
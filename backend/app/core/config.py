@@ -40,6 +40,86 @@ class Settings(BaseSettings):
     # AI Service
     AI_SERVICE_URL: str = "http://localhost:8001"
     
+    # Inference
+    INFERENCE_RUNTIME: str = "auto"  # auto, onnx-int8, openvino, onnx, torchscript or pytorch
+    INFERENCE_EXECUTOR: str = "thread"  # thread, process or inline (blocks the loop)
+    INFERENCE_WORKERS: int = 1
+    INFERENCE_MAX_QUEUE: int = 8  # Jobs waiting for a worker before new ones are rejected
+    INFERENCE_TIMEOUT: float = 10.0  # seconds
+    INFERENCE_BATCH_SIZE: int = 8  # Frames per forward pass
+    INFERENCE_BATCH_WAIT_MS: float = 10.0  # Longest a frame waits for a batch to fill
+    INFERENCE_REDUCED_DECODE: bool = True  # Decode JPEGs at 1/2, 1/4 or 1/8 size when the model input allows
+    SLOT_OCCUPANCY_THRESHOLD: float = 0.4  # Share of a slot a vehicle box must cover
+    SLOT_LAYOUT_CACHE_TTL: float = 30.0  # Seconds a compiled layout (or its absence) is reused
+    DEFAULT_DETECTION_ENGINE: str = "yolo"  # For lots without their own setting
+    SLOT_CLASSIFIER_PATH: Path = Path("models/slot_classifier.onnx")
+    SLOT_CLASSIFIER_INPUT_SIZE: int = 64  # Crop size the classifier was trained on
+    SLOT_CLASSIFIER_THRESHOLD: float = 0.5  # Occupied probability that marks a slot taken
+    LOOP_MONITOR_INTERVAL: float = 0.25  # seconds
+    
+    # Adaptive monitoring intervals
+    CAMERA_ADAPTIVE_INTERVALS: bool = True
+    CAMERA_MIN_INTERVAL: float = 5.0  # seconds; per-lot bounds can be given to start-monitoring
+    CAMERA_MAX_INTERVAL: float = 300.0  # seconds
+    CAMERA_INTERVAL_PROFILE: str = "0-6:4,6-7:2,20-22:2,22-24:4"  # Interval multipliers by local hour
+    CAMERA_ACTIVITY_HALF_LIFE: float = 600.0  # seconds over which recent slot transitions count
+    CAMERA_ACTIVITY_GAIN: float = 0.1  # Interval divided by sqrt(1 + gain x recent transitions)
+    CAMERA_BOOKING_WINDOW: float = 120.0  # seconds around a booking start or end polled closely
+    CAMERA_BOOKING_INTERVAL: float = 15.0  # seconds between ticks within that window
+    CAMERA_BOOKING_HORIZON: float = 3600.0  # seconds ahead bookings are loaded for
+    CAMERA_BOOKING_REFRESH: float = 60.0  # seconds between booking reloads
+    
+    # Camera fetching
+    CAMERA_MONITOR_INTERVAL: float = 30.0  # seconds between detections of a monitored lot
+    CAMERA_RESUME_ON_STARTUP: bool = True  # Restart stored monitoring assignments when the app starts
+    CAMERA_RESUME_WARMUP: float = 60.0  # seconds over which resumed lots' first ticks are spread
+    CAMERA_MAX_CONCURRENT: int = 32  # Monitoring ticks (fetch and inference) running at once
+    CAMERA_SCHEDULE_JITTER: float = 0.1  # Share of the interval each tick is moved by at random
+    CAMERA_FETCH_TIMEOUT: float = 10.0  # seconds
+    CAMERA_HTTP_POOL_SIZE: int = 100  # Open connections across all cameras
+    CAMERA_HTTP_PER_HOST: int = 4  # Open connections to one camera or NVR
+    CAMERA_HTTP_KEEPALIVE: float = 60.0  # seconds an idle connection is kept
+    CAMERA_FAILURE_THRESHOLD: int = 3  # Failed fetches in a row that take a camera out of rotation
+    CAMERA_BACKOFF_MIN: float = 60.0  # seconds before a failing camera is probed again, doubling
+    CAMERA_BACKOFF_MAX: float = 1800.0  # Longest wait between probes
+    CAMERA_HEALTH_ALPHA: float = 0.2  # Weight of the newest fetch in success rate and latency averages
+    STREAM_RECONNECT_MIN: float = 1.0  # seconds before reopening a failed RTSP/MJPEG stream, doubling
+    STREAM_RECONNECT_MAX: float = 30.0  # Longest wait between reconnects
+    STREAM_MAX_FRAME_AGE: float = 10.0  # seconds after which a stalled stream's last frame is not used
+    CAMERA_ALLOW_FILE_URLS: bool = False  # Accept file:// camera URLs (local videos); development only
+    
+    # Monitoring results
+    RESULTS_FLUSH_INTERVAL: float = 1.0  # seconds between batched writes of monitoring results
+    RESULTS_BATCH_MAX_SIZE: int = 500  # Pending slot changes that trigger an early write
+    RESULTS_CACHE_TTL: int = 300  # seconds a lot's results stay in Redis
+    
+    # Sharded monitoring across worker processes
+    MONITORING_SHARDING: bool = False  # Share monitored lots between workers by lease instead of resuming them all here
+    MONITORING_LEASE_STORE: str = "database"  # database, or local for workers in one process (development)
+    MONITORING_WORKER_ID: str = ""  # Defaults to host name and process id
+    MONITORING_HEARTBEAT: float = 10.0  # seconds between rebalancing rounds, which renew leases
+    MONITORING_LEASE_TTL: float = 30.0  # seconds before a silent worker's lots are taken over
+    MONITORING_VNODES: int = 64  # Points per worker on the hash ring
+    
+    # Tiled inference for high-resolution cameras
+    INFERENCE_TILING: str = "auto"  # auto (frames with a side of INFERENCE_TILE_MIN_SIDE or more), always or never
+    INFERENCE_TILE_SIZE: int = 640  # Tile side in pixels, matching the model input
+    INFERENCE_TILE_OVERLAP: float = 0.2  # Share of a tile overlapping its neighbours
+    INFERENCE_TILE_MIN_SIDE: int = 2560
+    
+    # Frame-change gating for monitored cameras
+    CHANGE_GATE_ENABLED: bool = True
+    CHANGE_GATE_WIDTH: int = 160  # Thumbnail width frames are compared at
+    CHANGE_GATE_GLOBAL_THRESHOLD: float = 6.0  # Mean gray-level change that re-runs the whole frame
+    CHANGE_GATE_SLOT_THRESHOLD: float = 12.0  # Mean gray-level change that re-checks a slot
+    CHANGE_GATE_MAX_AGE: float = 300.0  # seconds before results are refreshed regardless
+    
+    # Occupancy smoothing for monitored cameras
+    SLOT_SMOOTHING_WINDOW: int = 4  # Readings averaged per slot
+    SLOT_ENTER_THRESHOLD: float = 0.6  # Smoothed score that marks an available slot occupied
+    SLOT_EXIT_THRESHOLD: float = 0.4  # Smoothed score that marks an occupied slot available
+    SLOT_MIN_DWELL: float = 30.0  # seconds a new status must hold before it is reported
+    
     # File Upload
     UPLOAD_DIR: Path = Path("uploads")
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
@@ -48,6 +128,22 @@ class Settings(BaseSettings):
     STRIPE_SECRET_KEY: str = ""
     STRIPE_PUBLISHABLE_KEY: str = ""
     
+    # WebSocket
+    WS_REPLAY_BUFFER_SIZE: int = 256  # Buffered updates per parking lot for resume
+    WS_PING_INTERVAL: int = 20  # Seconds of silence before the server pings a client
+    WS_IDLE_TIMEOUT: int = 60  # Seconds of silence before a client is disconnected
+    WS_MAX_CONNECTIONS: int = 20000
+    WS_MAX_CONNECTIONS_PER_USER: int = 5
+    WS_MAX_CONNECTIONS_PER_IP: int = 0  # 0: no per-address limit
+    WS_TRUST_FORWARDED_FOR: bool = False  # Behind a reverse proxy: client address from X-Forwarded-For
+    SSE_MAX_LOTS_PER_STREAM: int = 50
+    SSE_QUEUE_SIZE: int = 256  # Pending events per stream before it is dropped
+    
+    # Change events
+    EVENT_BATCH_WINDOW_MS: int = 50  # How long to collect events before publishing
+    EVENT_BATCH_MAX_SIZE: int = 500
+    EVENT_QUEUE_MAX_SIZE: int = 10000
+    
     # Parking
     BOOKING_EXPIRY_MINUTES: int = 15
     MIN_BOOKING_DURATION_MINUTES: int = 30
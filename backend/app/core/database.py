@@ -2,7 +2,7 @@
 Database configuration and session management
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -29,6 +29,33 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Columns added to tables that existing databases already have. create_all
+# only creates missing tables, so these are added by upgrade_schema.
+ADDED_COLUMNS = [
+    ("parking_lots", "detection_engine", "VARCHAR DEFAULT 'yolo'"),
+    ("monitored_cameras", "lease_owner", "VARCHAR"),
+    ("monitored_cameras", "lease_expires_at", "FLOAT"),
+]
+# Indexes on ADDED_COLUMNS, as (name, table, column)
+ADDED_INDEXES = [
+    ("ix_monitored_cameras_lease_owner", "monitored_cameras", "lease_owner"),
+]
+
+
+def upgrade_schema(bind=engine):
+    """Add any of ADDED_COLUMNS and ADDED_INDEXES an existing database lacks (safe to run repeatedly)"""
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    with bind.begin() as connection:
+        for table, column, definition in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            if column not in {existing["name"] for existing in inspector.get_columns(table)}:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+        for name, table, column in ADDED_INDEXES:
+            if table in tables:
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})"))
+
 
 def get_db():
     """Dependency for getting database session"""
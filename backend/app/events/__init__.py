@@ -0,0 +1,3 @@
+# Events package
+
+
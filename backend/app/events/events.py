@@ -0,0 +1,23 @@
+"""
+Typed change events for parking availability
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class SlotStatusChanged:
+    """A parking slot moved to a new status"""
+    parking_lot_id: int
+    slot_id: int
+    status: str
+    previous_status: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class LotAvailabilityChanged:
+    """A parking lot's slot counters changed"""
+    parking_lot_id: int
+    total_slots: Optional[int] = None
+    available_slots: Optional[int] = None
@@ -0,0 +1,59 @@
+"""
+SQLAlchemy session hooks that turn committed changes into events
+"""
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.parking_lot import ParkingLot
+from app.models.parking_slot import ParkingSlot
+from app.events.events import SlotStatusChanged, LotAvailabilityChanged
+from app.events.pipeline import event_pipeline
+
+PENDING_EVENTS_KEY = "pending_change_events"
+
+
+def _status_value(status):
+    """Get the plain string value of a status enum"""
+    return getattr(status, "value", status)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_change_events(session, flush_context):
+    """Record slot and lot availability changes made by this flush"""
+    pending = session.info.setdefault(PENDING_EVENTS_KEY, [])
+    
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, ParkingSlot):
+            history = inspect(obj).attrs.status.history
+            if not history.added:
+                continue
+            previous = history.deleted[0] if history.deleted else None
+            pending.append(SlotStatusChanged(
+                parking_lot_id=obj.parking_lot_id,
+                slot_id=obj.id,
+                status=_status_value(obj.status),
+                previous_status=_status_value(previous)
+            ))
+        elif isinstance(obj, ParkingLot) and obj not in session.new:
+            state = inspect(obj).attrs
+            if state.total_slots.history.added or state.available_slots.history.added:
+                pending.append(LotAvailabilityChanged(
+                    parking_lot_id=obj.id,
+                    total_slots=obj.total_slots,
+                    available_slots=obj.available_slots
+                ))
+
+
+@event.listens_for(Session, "after_commit")
+def publish_change_events(session):
+    """Hand changes to the event pipeline once they are durable"""
+    pending = session.info.pop(PENDING_EVENTS_KEY, None)
+    if pending:
+        event_pipeline.publish(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_change_events(session):
+    """Drop changes that never made it to the database"""
+    session.info.pop(PENDING_EVENTS_KEY, None)
@@ -0,0 +1,131 @@
+"""
+In-process change event pipeline feeding the WebSocket layer
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Iterable
+
+from app.core.config import settings
+from app.events.events import SlotStatusChanged, LotAvailabilityChanged
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeEventPipeline:
+    """
+    Batches committed change events and publishes them per parking lot
+    
+    Producers (database hooks, AI monitoring) call `publish` from any
+    thread. A single consumer task collects events for up to
+    `batch_window_ms` or `batch_max_size` events, coalesces them per lot
+    (the last status of a slot wins) and hands one update per lot to the
+    WebSocket manager.
+    """
+    
+    def __init__(
+        self,
+        batch_window_ms: int = None,
+        batch_max_size: int = None,
+        queue_max_size: int = None
+    ):
+        self.batch_window = (batch_window_ms or settings.EVENT_BATCH_WINDOW_MS) / 1000
+        self.batch_max_size = batch_max_size or settings.EVENT_BATCH_MAX_SIZE
+        self.queue_max_size = queue_max_size or settings.EVENT_QUEUE_MAX_SIZE
+        self.queue: Optional[asyncio.Queue] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.task: Optional[asyncio.Task] = None
+        self.dropped_events = 0
+        self.published_batches = 0
+    
+    async def start(self, websocket_manager):
+        """Start the consumer task on the running event loop"""
+        if self.task and not self.task.done():
+            return
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.queue_max_size)
+        self.task = asyncio.create_task(self._run(websocket_manager))
+    
+    async def stop(self):
+        """Stop the consumer task, dropping anything still queued"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+        self.queue = None
+        self.loop = None
+    
+    def publish(self, events: Iterable):
+        """Queue events for publishing (safe to call from any thread)"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            # Pipeline not running (scripts, migrations): nobody to notify
+            return
+        try:
+            loop.call_soon_threadsafe(self._enqueue, list(events))
+        except RuntimeError:
+            # Loop shut down between the check and the call
+            pass
+    
+    def _enqueue(self, events: List):
+        """Put events on the queue from inside the event loop"""
+        if self.queue is None:
+            return
+        for change in events:
+            try:
+                self.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                self.dropped_events += 1
+                logger.warning(f"Change event queue full, dropping {change}")
+    
+    async def _run(self, websocket_manager):
+        """Consume the queue in batches"""
+        while True:
+            batch = [await self.queue.get()]
+            deadline = self.loop.time() + self.batch_window
+            while len(batch) < self.batch_max_size:
+                # Take whatever is already queued before waiting for more
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self._dispatch(batch, websocket_manager)
+            except Exception as e:
+                logger.error(f"Error publishing change events: {e}")
+    
+    async def _dispatch(self, batch: List, websocket_manager):
+        """Coalesce a batch per lot and publish one update for each"""
+        slot_updates: Dict[int, Dict[str, str]] = {}
+        summaries: Dict[int, Dict[str, int]] = {}
+        
+        for change in batch:
+            if isinstance(change, SlotStatusChanged):
+                slot_updates.setdefault(change.parking_lot_id, {})[str(change.slot_id)] = change.status
+            elif isinstance(change, LotAvailabilityChanged):
+                summary = summaries.setdefault(change.parking_lot_id, {})
+                if change.total_slots is not None:
+                    summary["total_slots"] = change.total_slots
+                if change.available_slots is not None:
+                    summary["available_slots"] = change.available_slots
+        
+        for parking_lot_id in sorted(set(slot_updates) | set(summaries)):
+            await websocket_manager.broadcast_parking_update(
+                parking_lot_id,
+                slot_updates.get(parking_lot_id, {}),
+                summary=summaries.get(parking_lot_id)
+            )
+        self.published_batches += 1
+
+
+event_pipeline = ChangeEventPipeline()
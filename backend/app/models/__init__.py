@@ -2,6 +2,8 @@
 from app.models.user import User, UserRole
 from app.models.parking_lot import ParkingLot
 from app.models.parking_slot import ParkingSlot, SlotStatus
+from app.models.slot_region import SlotRegion
+from app.models.monitored_camera import MonitoredCamera, MonitoringWorker
 from app.models.booking import Booking, BookingStatus
 from app.models.safety_review import SafetyReview
 
@@ -11,6 +13,9 @@ __all__ = [
     "ParkingLot",
     "ParkingSlot",
     "SlotStatus",
+    "SlotRegion",
+    "MonitoredCamera",
+    "MonitoringWorker",
     "Booking",
     "BookingStatus",
     "SafetyReview",
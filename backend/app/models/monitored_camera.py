@@ -0,0 +1,39 @@
+"""
+Monitored Camera and Monitoring Worker models
+"""
+
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class MonitoredCamera(Base):
+    """A parking lot's continuous monitoring assignment, resumed on startup"""
+    __tablename__ = "monitored_cameras"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    parking_lot_id = Column(Integer, ForeignKey("parking_lots.id"), nullable=False, unique=True, index=True)
+    camera_url = Column(String, nullable=True)  # None: the lot's own camera_url
+    interval = Column(Float, nullable=True)  # Base seconds between detections; None: CAMERA_MONITOR_INTERVAL
+    priority = Column(Integer, default=0)
+    min_interval = Column(Float, nullable=True)
+    max_interval = Column(Float, nullable=True)
+    detection_engine = Column(String, nullable=True)  # None: the lot's detection_engine
+    is_active = Column(Boolean, default=True)
+    lease_owner = Column(String, nullable=True, index=True)  # Worker currently monitoring the lot
+    lease_expires_at = Column(Float, nullable=True)  # Epoch seconds; renewed by the owner's heartbeat
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    parking_lot = relationship("ParkingLot", back_populates="monitored_camera")
+
+
+class MonitoringWorker(Base):
+    """A process taking part in sharded monitoring, kept alive by its heartbeat"""
+    __tablename__ = "monitoring_workers"
+    
+    worker_id = Column(String, primary_key=True)
+    heartbeat_at = Column(Float, nullable=False)  # Epoch seconds
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -25,6 +25,7 @@ class ParkingLot(Base):
     description = Column(Text, nullable=True)
     image_url = Column(String, nullable=True)
     camera_url = Column(String, nullable=True)  # URL for parking lot camera feed
+    detection_engine = Column(String, default="yolo")  # "yolo" or "classifier" (per-slot crops)
     is_active = Column(Boolean, default=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     safety_rating = Column(Float, default=0.0)  # Average safety rating
@@ -37,5 +38,8 @@ class ParkingLot(Base):
     slots = relationship("ParkingSlot", back_populates="parking_lot", cascade="all, delete-orphan")
     bookings = relationship("Booking", back_populates="parking_lot")
     reviews = relationship("SafetyReview", back_populates="parking_lot")
+    monitored_camera = relationship(
+        "MonitoredCamera", back_populates="parking_lot", uselist=False, cascade="all, delete-orphan"
+    )
 
 
@@ -33,5 +33,6 @@ class ParkingSlot(Base):
     # Relationships
     parking_lot = relationship("ParkingLot", back_populates="slots")
     bookings = relationship("Booking", back_populates="slot")
+    regions = relationship("SlotRegion", back_populates="slot", cascade="all, delete-orphan")
 
 
@@ -0,0 +1,27 @@
+"""
+Slot Region model
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class SlotRegion(Base):
+    """Where a parking slot appears in one camera's view"""
+    __tablename__ = "slot_regions"
+    __table_args__ = (
+        UniqueConstraint("parking_slot_id", "camera_id", name="uq_slot_region_camera"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    parking_lot_id = Column(Integer, ForeignKey("parking_lots.id"), nullable=False, index=True)
+    parking_slot_id = Column(Integer, ForeignKey("parking_slots.id"), nullable=False)
+    camera_id = Column(String, nullable=False, default="main")  # Camera watching this slot
+    polygon = Column(JSON, nullable=False)  # [[x, y], ...] normalized to 0-1 of the frame
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    slot = relationship("ParkingSlot", back_populates="regions")
@@ -2,11 +2,23 @@
 Parking-related schemas
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import AfterValidator, BaseModel, Field
+from typing import Optional, List, Tuple, Annotated, Literal
 from datetime import datetime
 from decimal import Decimal
 
+from app.ai.stream_reader import is_allowed_camera_url
+
+
+def _check_camera_url(url: Optional[str]) -> Optional[str]:
+    if url and not is_allowed_camera_url(url):
+        raise ValueError("must be an http(s), rtsp(s) or rtmp URL with a host")
+    return url
+
+
+# A lot's camera as sent by clients: never a local path on the server
+CameraUrl = Annotated[Optional[str], AfterValidator(_check_camera_url)]
+
 
 class ParkingLotBase(BaseModel):
     name: str
@@ -23,7 +35,7 @@ class ParkingLotBase(BaseModel):
 
 
 class ParkingLotCreate(ParkingLotBase):
-    pass
+    camera_url: CameraUrl = None
 
 
 class ParkingLotUpdate(BaseModel):
@@ -37,7 +49,8 @@ class ParkingLotUpdate(BaseModel):
     price_per_hour: Optional[float] = None
     description: Optional[str] = None
     image_url: Optional[str] = None
-    camera_url: Optional[str] = None
+    camera_url: CameraUrl = None
+    detection_engine: Optional[Literal["yolo", "classifier"]] = None
     is_active: Optional[bool] = None
 
 
@@ -47,6 +60,7 @@ class ParkingLotResponse(ParkingLotBase):
     available_slots: int
     safety_rating: float
     total_reviews: int
+    detection_engine: Optional[str] = "yolo"
     is_active: bool
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -77,6 +91,29 @@ class ParkingSlotResponse(ParkingSlotBase):
         from_attributes = True
 
 
+# Polygon vertex as (x, y), normalized to 0-1 of the camera frame
+NormalizedPoint = Tuple[Annotated[float, Field(ge=0.0, le=1.0)], Annotated[float, Field(ge=0.0, le=1.0)]]
+
+
+class SlotRegionBase(BaseModel):
+    slot_number: str
+    polygon: List[NormalizedPoint] = Field(..., min_length=3, max_length=32)
+
+
+class SlotLayoutUpdate(BaseModel):
+    regions: List[SlotRegionBase]
+
+
+class SlotRegionResponse(SlotRegionBase):
+    slot_id: int
+
+
+class SlotLayoutResponse(BaseModel):
+    parking_lot_id: int
+    camera_id: str
+    regions: List[SlotRegionResponse]
+
+
 class BookingBase(BaseModel):
     parking_lot_id: int
     slot_id: Optional[int] = None
@@ -0,0 +1,119 @@
+"""
+Wire encodings for WebSocket messages (JSON and MessagePack)
+"""
+
+import json
+from typing import Dict, Optional, Union, Any
+
+from app.models.parking_slot import SlotStatus
+
+# Optional imports - binary encoding
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    msgpack = None
+
+# Subprotocols a client can request in Sec-WebSocket-Protocol
+PROTOCOL_JSON = "parking.json.v1"
+PROTOCOL_MSGPACK = "parking.msgpack.v1"
+
+# Small integer codes used by the compact MessagePack schema
+STATUS_CODES: Dict[str, int] = {status.value: code for code, status in enumerate(SlotStatus)}
+MESSAGE_TYPE_CODES: Dict[str, int] = {
+    "parking_update": 1,
+    "snapshot": 2,
+}
+
+
+def negotiate_protocol(requested: list) -> Optional[str]:
+    """
+    Pick the wire protocol from the subprotocols a client offered
+    
+    Returns:
+        The subprotocol to accept, or None for plain JSON without one
+    """
+    if PROTOCOL_MSGPACK in requested and MSGPACK_AVAILABLE:
+        return PROTOCOL_MSGPACK
+    if PROTOCOL_JSON in requested:
+        return PROTOCOL_JSON
+    return None
+
+
+def compact_message(message: dict) -> Any:
+    """
+    Convert a parking update or snapshot to the compact binary schema
+    
+    Keys are shortened and slots become a flat [slot_id, status_code, ...]
+    list, e.g. {"t": 1, "l": 3, "s": 42, "e": "...", "ts": 1.5,
+    "u": [7, 1, 8, 0], "m": [120, 37]}. Other messages are sent as-is.
+    """
+    type_code = MESSAGE_TYPE_CODES.get(message.get("type"))
+    if type_code is None:
+        return message
+    
+    updates = []
+    for slot_id, status in message.get("slots", {}).items():
+        updates.append(int(slot_id))
+        updates.append(STATUS_CODES.get(status, -1))
+    
+    compact = {
+        "t": type_code,
+        "l": message["parking_lot_id"],
+        "s": message.get("seq", 0),
+        "e": message.get("epoch"),
+        "ts": message.get("timestamp"),
+        "u": updates,
+    }
+    summary = message.get("summary")
+    if summary:
+        compact["m"] = [summary.get("total_slots"), summary.get("available_slots")]
+    return compact
+
+
+def encode(message: dict, protocol: Optional[str]) -> Union[str, bytes]:
+    """Encode a message for a connection using the given protocol"""
+    if protocol == PROTOCOL_MSGPACK:
+        return msgpack.packb(compact_message(message), use_bin_type=True)
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def decode(data: Union[str, bytes]) -> dict:
+    """Decode a client message from a text (JSON) or binary (MessagePack) frame"""
+    if isinstance(data, bytes):
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("Binary messages require msgpack")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+class EncodedMessage:
+    """
+    A message together with its encoded frames
+    
+    Each protocol's frame is produced on first use and then reused, so a
+    broadcast to thousands of connections serializes once per protocol.
+    """
+    
+    __slots__ = ("message", "_frames")
+    
+    def __init__(self, message: dict):
+        self.message = message
+        self._frames: Dict[Optional[str], Union[str, bytes]] = {}
+    
+    def __getitem__(self, key):
+        return self.message[key]
+    
+    def get(self, key, default=None):
+        return self.message.get(key, default)
+    
+    def frame(self, protocol: Optional[str]) -> Union[str, bytes]:
+        """Get the encoded frame for a protocol"""
+        if protocol == PROTOCOL_JSON:
+            protocol = None
+        frame = self._frames.get(protocol)
+        if frame is None:
+            frame = encode(self.message, protocol)
+            self._frames[protocol] = frame
+        return frame
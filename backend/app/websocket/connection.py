@@ -0,0 +1,53 @@
+"""
+Per-connection state for WebSocket clients
+"""
+
+from fastapi import WebSocket
+from typing import Optional, Set
+import time
+
+from app.websocket.codec import EncodedMessage
+
+
+class Connection:
+    """A connected WebSocket client"""
+    
+    # Thousands of these live at once, so skip the per-instance __dict__
+    __slots__ = ("websocket", "user_id", "client_ip", "protocol", "subscriptions", "last_seen")
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: Optional[int] = None,
+        client_ip: Optional[str] = None,
+        protocol: Optional[str] = None
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.client_ip = client_ip
+        self.protocol = protocol
+        self.subscriptions: Set[int] = set()
+        self.last_seen = time.monotonic()
+    
+    def touch(self):
+        """Record activity from the client"""
+        self.last_seen = time.monotonic()
+    
+    def idle_for(self) -> float:
+        """Seconds since the client was last heard from"""
+        return time.monotonic() - self.last_seen
+    
+    async def send(self, encoded: EncodedMessage):
+        """Send a message using this connection's negotiated protocol"""
+        frame = encoded.frame(self.protocol)
+        if isinstance(frame, bytes):
+            await self.websocket.send_bytes(frame)
+        else:
+            await self.websocket.send_text(frame)
+    
+    async def close(self, code: int = 1000):
+        """Close the underlying socket, ignoring already-closed sockets"""
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
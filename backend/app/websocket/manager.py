@@ -3,50 +3,247 @@ WebSocket connection manager for real-time updates
 """
 
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List, Dict
+from typing import Any, Callable, Dict, Set, Optional, Tuple, Union
 import json
 import asyncio
+import uuid
+import logging
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.parking_lot import ParkingLot
+from app.models.parking_slot import ParkingSlot
+from app.websocket.codec import EncodedMessage, negotiate_protocol, decode
+from app.websocket.connection import Connection
+from app.websocket.topics import LotTopic
+
+logger = logging.getLogger(__name__)
+
+# Close codes for connections rejected by limits or reaped as idle
+POLICY_VIOLATION = 1008
+GOING_AWAY = 1001
+
+
+def client_address(connection, trust_forwarded_for: bool = False) -> Optional[str]:
+    """
+    Address of the client behind a WebSocket or HTTP request
+    
+    Behind a reverse proxy every peer address is the proxy's, so when the
+    proxy is trusted the address it appended to X-Forwarded-For is used.
+    """
+    if trust_forwarded_for:
+        forwarded = connection.headers.get("x-forwarded-for", "")
+        addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+        if addresses:
+            return addresses[-1]
+    return connection.client.host if connection.client else None
+
+
+def load_lot_state(session_factory: Callable, parking_lot_id: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Read a lot's slot statuses and availability counters (blocking)"""
+    db = session_factory()
+    try:
+        slots = {
+            str(slot_id): getattr(status, "value", status)
+            for slot_id, status in db.query(ParkingSlot.id, ParkingSlot.status).filter(
+                ParkingSlot.parking_lot_id == parking_lot_id
+            )
+        }
+        summary = {}
+        counters = db.query(ParkingLot.total_slots, ParkingLot.available_slots).filter(
+            ParkingLot.id == parking_lot_id
+        ).first()
+        if counters is not None:
+            summary = {"total_slots": counters.total_slots, "available_slots": counters.available_slots}
+        return slots, summary
+    finally:
+        db.close()
 
 
 class WebSocketManager:
     """Manages WebSocket connections for real-time parking updates"""
     
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.user_connections: Dict[int, WebSocket] = {}
+    def __init__(self, replay_buffer_size: int = None, session_factory: Optional[Callable] = SessionLocal):
+        self.active_connections: Dict[WebSocket, Connection] = {}
+        self.user_connections: Dict[int, Set[Connection]] = {}
+        self.ip_connections: Dict[str, int] = {}
+        self.stream_connections: Set[Connection] = set()
+        self.replay_buffer_size = replay_buffer_size or settings.WS_REPLAY_BUFFER_SIZE
+        # Changes on every process start so clients can detect a sequence reset
+        self.epoch = uuid.uuid4().hex[:12]
+        self.topics: Dict[int, LotTopic] = {}
+        self.lot_subscribers: Dict[int, Set[Connection]] = {}
+        # Where topics read their initial state; None leaves them empty
+        self.session_factory = session_factory
+        self.seed_locks: Dict[int, asyncio.Lock] = {}
+        self.ping_interval = settings.WS_PING_INTERVAL
+        self.idle_timeout = settings.WS_IDLE_TIMEOUT
+        self.max_connections = settings.WS_MAX_CONNECTIONS
+        self.max_connections_per_user = settings.WS_MAX_CONNECTIONS_PER_USER
+        self.max_connections_per_ip = settings.WS_MAX_CONNECTIONS_PER_IP
+        self.trust_forwarded_for = settings.WS_TRUST_FORWARDED_FOR
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        self.reaped_connections = 0
+        self.rejected_connections = 0
     
-    async def connect(self, websocket: WebSocket, user_id: int = None):
-        """Accept a new WebSocket connection"""
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        if user_id:
-            self.user_connections[user_id] = websocket
+    def _rejection_reason(self, user_id: Optional[int], client_ip: Optional[str]) -> Optional[str]:
+        """Check connection limits for a new client"""
+        if len(self.active_connections) + len(self.stream_connections) >= self.max_connections:
+            return "Server connection limit reached"
+        if user_id and len(self.user_connections.get(user_id, ())) >= self.max_connections_per_user:
+            return "Too many connections for this user"
+        if (
+            client_ip and self.max_connections_per_ip
+            and self.ip_connections.get(client_ip, 0) >= self.max_connections_per_ip
+        ):
+            return "Too many connections from this address"
+        return None
+    
+    async def connect(self, websocket: WebSocket, user_id: int = None) -> Optional[Connection]:
+        """
+        Accept a new WebSocket connection, negotiating JSON or MessagePack
+        
+        Returns:
+            The registered connection, or None if it was rejected by a limit
+        """
+        client_ip = client_address(websocket, self.trust_forwarded_for)
+        reason = self._rejection_reason(user_id, client_ip)
+        if reason:
+            # Closing before accept answers the handshake with HTTP 403
+            self.rejected_connections += 1
+            logger.warning(f"Rejected WebSocket connection (user={user_id}, ip={client_ip}): {reason}")
+            await websocket.close(code=POLICY_VIOLATION)
+            return None
+        
+        protocol = negotiate_protocol(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=protocol)
+        connection = Connection(websocket, user_id, client_ip, protocol)
+        self.active_connections[websocket] = connection
+        self._register(connection)
+        return connection
+    
+    def register_stream(self, connection: Connection) -> bool:
+        """
+        Register a non-WebSocket subscriber (e.g. Server-Sent Events)
+        
+        Returns:
+            False if a connection limit rejects it
+        """
+        reason = self._rejection_reason(connection.user_id, connection.client_ip)
+        if reason:
+            self.rejected_connections += 1
+            logger.warning(f"Rejected stream connection (ip={connection.client_ip}): {reason}")
+            return False
+        self.stream_connections.add(connection)
+        self._register(connection)
+        return True
+    
+    def _register(self, connection: Connection):
+        """Add a connection to the user and address indexes"""
+        if connection.user_id:
+            self.user_connections.setdefault(connection.user_id, set()).add(connection)
+        if connection.client_ip:
+            self.ip_connections[connection.client_ip] = self.ip_connections.get(connection.client_ip, 0) + 1
     
     def disconnect(self, websocket: WebSocket, user_id: int = None):
         """Remove a WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if user_id and user_id in self.user_connections:
-            del self.user_connections[user_id]
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            self.release(connection)
+    
+    def release(self, connection: Connection):
+        """Remove a connection of any kind from every index"""
+        if connection.websocket is not None:
+            if self.active_connections.pop(connection.websocket, None) is None:
+                return
+        elif connection in self.stream_connections:
+            self.stream_connections.discard(connection)
+        else:
+            return
+        for parking_lot_id in list(connection.subscriptions):
+            self.unsubscribe(connection, parking_lot_id)
+        if connection.user_id:
+            connections = self.user_connections.get(connection.user_id)
+            if connections is not None:
+                connections.discard(connection)
+                if not connections:
+                    del self.user_connections[connection.user_id]
+        if connection.client_ip:
+            remaining = self.ip_connections.get(connection.client_ip, 1) - 1
+            if remaining > 0:
+                self.ip_connections[connection.client_ip] = remaining
+            else:
+                self.ip_connections.pop(connection.client_ip, None)
+    
+    def get_topic(self, parking_lot_id: int) -> LotTopic:
+        """Get (or create) the update topic for a parking lot"""
+        topic = self.topics.get(parking_lot_id)
+        if topic is None:
+            topic = LotTopic(parking_lot_id, self.replay_buffer_size)
+            self.topics[parking_lot_id] = topic
+        return topic
+    
+    async def seed_topic(self, topic: LotTopic):
+        """Load a topic's snapshot state from the database, once"""
+        if topic.seeded or self.session_factory is None:
+            return
+        lock = self.seed_locks.setdefault(topic.parking_lot_id, asyncio.Lock())
+        async with lock:
+            if topic.seeded:
+                return
+            try:
+                slots, summary = await asyncio.to_thread(load_lot_state, self.session_factory, topic.parking_lot_id)
+            except Exception as e:
+                # Serve what has been published; the next subscriber tries again
+                logger.warning(f"Could not load state of parking lot {topic.parking_lot_id}: {e}")
+                return
+            finally:
+                self.seed_locks.pop(topic.parking_lot_id, None)
+            topic.seed(slots, summary)
+    
+    async def _send(self, connection: Connection, encoded: EncodedMessage) -> bool:
+        """Send to one connection, dropping it if the socket is dead"""
+        try:
+            await connection.send(encoded)
+            return True
+        except Exception as e:
+            logger.info(f"Dropping connection after failed send: {e}")
+            self.release(connection)
+            return False
     
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
+    async def send_personal_message(self, message: Union[dict, EncodedMessage], websocket: WebSocket):
         """Send message to a specific connection"""
-        await websocket.send_json(message)
+        if not isinstance(message, EncodedMessage):
+            message = EncodedMessage(message)
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            await connection.send(message)
     
     async def send_to_user(self, user_id: int, message: dict):
-        """Send message to a specific user"""
-        if user_id in self.user_connections:
-            await self.user_connections[user_id].send_json(message)
+        """Send message to every connection (device) of a user"""
+        encoded = EncodedMessage(message)
+        for connection in list(self.user_connections.get(user_id, ())):
+            await self._send(connection, encoded)
     
     async def broadcast(self, message: dict):
         """Broadcast message to all connected clients"""
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting message: {e}")
+        encoded = EncodedMessage(message)
+        for connection in list(self.active_connections.values()):
+            await self._send(connection, encoded)
     
-    async def broadcast_parking_update(self, parking_lot_id: int, slot_updates: dict):
+    async def publish(self, parking_lot_id: int, message: dict):
+        """Sequence a message on a lot topic and send it to the lot's subscribers"""
+        message["epoch"] = self.epoch
+        encoded = self.get_topic(parking_lot_id).publish(message)
+        for connection in list(self.lot_subscribers.get(parking_lot_id, ())):
+            await self._send(connection, encoded)
+    
+    async def broadcast_parking_update(
+        self,
+        parking_lot_id: int,
+        slot_updates: dict,
+        summary: Optional[dict] = None
+    ):
         """Broadcast parking slot availability updates"""
         message = {
             "type": "parking_update",
@@ -54,28 +251,139 @@ class WebSocketManager:
             "slots": slot_updates,
             "timestamp": asyncio.get_event_loop().time()
         }
-        await self.broadcast(message)
+        if summary:
+            message["summary"] = summary
+        await self.publish(parking_lot_id, message)
+    
+    async def subscribe(
+        self,
+        connection: Connection,
+        parking_lot_id: int,
+        last_seq: Optional[int] = None,
+        epoch: Optional[str] = None
+    ):
+        """
+        Subscribe a connection to a parking lot topic
+        
+        Args:
+            connection: Subscribing connection
+            parking_lot_id: ID of the parking lot
+            last_seq: Last sequence number the client received, if resuming
+            epoch: Server epoch the client's `last_seq` belongs to
+        """
+        topic = self.get_topic(parking_lot_id)
+        await self.seed_topic(topic)
+        
+        # Compute the backlog and register without awaiting in between, so
+        # nothing published meanwhile is lost or sent twice
+        backlog = None
+        if last_seq is not None and epoch == self.epoch:
+            backlog = topic.since(last_seq)
+        if backlog is None:
+            snapshot = topic.snapshot()
+            snapshot["epoch"] = self.epoch
+            backlog = [EncodedMessage(snapshot)]
+        
+        self.lot_subscribers.setdefault(parking_lot_id, set()).add(connection)
+        connection.subscriptions.add(parking_lot_id)
+        
+        await connection.send(EncodedMessage({
+            "type": "subscribed",
+            "parking_lot_id": parking_lot_id,
+            "seq": topic.seq,
+            "epoch": self.epoch
+        }))
+        for message in backlog:
+            await connection.send(message)
+    
+    def unsubscribe(self, connection: Connection, parking_lot_id: int):
+        """Unsubscribe a connection from a parking lot topic"""
+        subscribers = self.lot_subscribers.get(parking_lot_id)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.lot_subscribers[parking_lot_id]
+        connection.subscriptions.discard(parking_lot_id)
+    
+    async def reap_idle_connections(self):
+        """Ping quiet connections and close the ones that stopped answering"""
+        ping = EncodedMessage({"type": "ping"})
+        for connection in list(self.active_connections.values()):
+            idle = connection.idle_for()
+            if idle >= self.idle_timeout:
+                self.reaped_connections += 1
+                self.release(connection)
+                await connection.close(code=GOING_AWAY)
+            elif idle >= self.ping_interval:
+                await self._send(connection, ping)
+    
+    async def _heartbeat_loop(self):
+        """Periodically ping and reap connections"""
+        while True:
+            await asyncio.sleep(self.ping_interval / 2)
+            try:
+                await self.reap_idle_connections()
+            except Exception as e:
+                logger.error(f"Error in WebSocket heartbeat: {e}")
+    
+    async def start(self):
+        """Start the heartbeat task"""
+        if self.heartbeat_task is None or self.heartbeat_task.done():
+            self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+    
+    async def stop(self):
+        """Stop the heartbeat task"""
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            try:
+                await self.heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self.heartbeat_task = None
     
-    async def handle_websocket(self, websocket: WebSocket):
+    async def handle_websocket(self, websocket: WebSocket, user_id: int = None):
         """Handle WebSocket connection lifecycle"""
-        await self.connect(websocket)
+        connection = await self.connect(websocket, user_id)
+        if connection is None:
+            return
         try:
             while True:
-                data = await websocket.receive_text()
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
+                connection.touch()
+                data = frame.get("text")
+                if data is None:
+                    data = frame.get("bytes")
                 # Handle incoming messages if needed
                 try:
-                    message = json.loads(data)
+                    message = decode(data)
                     # Process message based on type
                     if message.get("type") == "subscribe":
-                        # Handle subscription to parking lot updates
-                        pass
+                        # Subscribe to parking lot updates, resuming from last_seq if given
+                        await self.subscribe(
+                            connection,
+                            int(message["parking_lot_id"]),
+                            last_seq=message.get("last_seq"),
+                            epoch=message.get("epoch")
+                        )
+                    elif message.get("type") == "unsubscribe":
+                        self.unsubscribe(connection, int(message["parking_lot_id"]))
+                    elif message.get("type") == "ping":
+                        await self.send_personal_message({"type": "pong"}, websocket)
                 except json.JSONDecodeError:
                     await self.send_personal_message(
                         {"error": "Invalid JSON"}, websocket
                     )
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    await self.send_personal_message(
+                        {"error": "Invalid subscription request"}, websocket
+                    )
         except WebSocketDisconnect:
             self.disconnect(websocket)
+        except RuntimeError:
+            # Socket was closed by the heartbeat while we were receiving
+            self.disconnect(websocket)
 
 
 websocket_manager = WebSocketManager()
-
@@ -0,0 +1,81 @@
+"""
+Server-Sent Events subscribers sharing the WebSocket fan-out
+"""
+
+from typing import Dict, Optional, Tuple
+import asyncio
+
+from app.websocket.codec import EncodedMessage
+from app.websocket.connection import Connection
+
+# Tell EventSource clients how long to wait before reconnecting (ms)
+RETRY_MS = 3000
+
+
+def format_cursor(epoch: str, cursor: Dict[int, int]) -> str:
+    """Encode per-lot sequence numbers as an SSE event id, e.g. "3f2a9c/1:42,2:17" """
+    positions = ",".join(f"{lot_id}:{seq}" for lot_id, seq in sorted(cursor.items()))
+    return f"{epoch}/{positions}"
+
+
+def parse_last_event_id(last_event_id: Optional[str]) -> Tuple[Optional[str], Dict[int, int]]:
+    """
+    Decode a Last-Event-ID header produced by `format_cursor`
+    
+    Returns:
+        (epoch, {parking_lot_id: seq}); malformed ids give (None, {})
+    """
+    if not last_event_id or "/" not in last_event_id:
+        return None, {}
+    epoch, _, positions = last_event_id.partition("/")
+    cursor = {}
+    try:
+        for position in filter(None, positions.split(",")):
+            lot_id, _, seq = position.partition(":")
+            cursor[int(lot_id)] = int(seq)
+    except ValueError:
+        return None, {}
+    return epoch, cursor
+
+
+class StreamConnection(Connection):
+    """
+    A Server-Sent Events client
+    
+    The fan-out sends into a bounded queue that the HTTP response drains.
+    A client too slow to keep up overflows the queue and its stream is
+    ended; it reconnects with Last-Event-ID and catches up from the replay
+    buffer.
+    """
+    
+    __slots__ = ("queue", "cursor", "epoch", "overflowed")
+    
+    def __init__(self, client_ip: Optional[str], epoch: str, cursor: Dict[int, int], queue_size: int):
+        super().__init__(None, client_ip=client_ip)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.cursor = dict(cursor)
+        self.epoch = epoch
+        self.overflowed = False
+    
+    async def send(self, encoded: EncodedMessage):
+        """Queue a message for the stream (never blocks the fan-out)"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(encoded)
+        except asyncio.QueueFull:
+            # Drop this and everything after it; the stream ends once the
+            # queued events are delivered, so the client's cursor stays exact
+            self.overflowed = True
+    
+    def format_event(self, encoded: EncodedMessage) -> str:
+        """Render a message as an SSE event, advancing the cursor"""
+        lines = []
+        seq = encoded.get("seq")
+        parking_lot_id = encoded.get("parking_lot_id")
+        if encoded.get("type") in ("parking_update", "snapshot") and seq is not None:
+            self.cursor[parking_lot_id] = seq
+            lines.append(f"id: {format_cursor(self.epoch, self.cursor)}")
+        lines.append(f"event: {encoded.get('type', 'message')}")
+        lines.append(f"data: {encoded.frame(None)}")
+        return "\n".join(lines) + "\n\n"
@@ -0,0 +1,82 @@
+"""
+Per-parking-lot update topics with sequence numbers and replay buffers
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any
+import time
+
+from app.websocket.codec import EncodedMessage
+
+
+class LotTopic:
+    """
+    Sequenced stream of updates for a single parking lot
+    
+    Every published message gets the next sequence number and is kept in a
+    bounded replay buffer, so a reconnecting client can ask for everything
+    after the last sequence number it saw. The latest known status of every
+    slot is folded into a snapshot that is served when the gap is too large
+    to replay. The snapshot is seeded from the database when the topic is
+    first subscribed, so it also covers slots that have not changed since
+    the process started.
+    """
+    
+    def __init__(self, parking_lot_id: int, buffer_size: int = 256):
+        self.parking_lot_id = parking_lot_id
+        self.seq = 0
+        self.buffer: Deque[EncodedMessage] = deque(maxlen=buffer_size)
+        self.slots: Dict[str, Any] = {}
+        self.summary: Dict[str, Any] = {}
+        self.seeded = False
+    
+    def seed(self, slots: Dict[str, Any], summary: Dict[str, Any]):
+        """Fill in the stored lot state, keeping anything published since it was read"""
+        for slot_id, status in slots.items():
+            self.slots.setdefault(str(slot_id), status)
+        for key, value in summary.items():
+            self.summary.setdefault(key, value)
+        self.seeded = True
+    
+    def publish(self, message: dict) -> EncodedMessage:
+        """Stamp a message with the next sequence number and buffer it"""
+        self.seq += 1
+        message["seq"] = self.seq
+        encoded = EncodedMessage(message)
+        self.buffer.append(encoded)
+        
+        # Keep the snapshot current so late joiners get the full picture
+        slots = message.get("slots")
+        if slots:
+            self.slots.update({str(slot_id): status for slot_id, status in slots.items()})
+        summary = message.get("summary")
+        if summary:
+            self.summary.update(summary)
+        return encoded
+    
+    def since(self, last_seq: int) -> Optional[List[EncodedMessage]]:
+        """
+        Get the messages published after `last_seq`
+        
+        Returns:
+            List of missed messages (possibly empty), or None when the
+            client is too far behind (or ahead) and needs a snapshot
+        """
+        if last_seq == self.seq:
+            return []
+        if last_seq > self.seq or not self.buffer:
+            return None
+        if last_seq < self.buffer[0]["seq"] - 1:
+            return None
+        return [message for message in self.buffer if message["seq"] > last_seq]
+    
+    def snapshot(self) -> dict:
+        """Build a snapshot message of the latest known lot state"""
+        return {
+            "type": "snapshot",
+            "parking_lot_id": self.parking_lot_id,
+            "seq": self.seq,
+            "slots": dict(self.slots),
+            "summary": dict(self.summary),
+            "timestamp": time.monotonic()
+        }
@@ -0,0 +1,120 @@
+"""
+Benchmark micro-batched inference throughput and latency
+
+Concurrent callers each submit frames in a closed loop through the
+MicroBatcher and thread-pool executor used by the detector. For every batch
+window the benchmark reports frames per second, per-frame latency
+percentiles and the average batch that formed.
+
+With `--weights` (and ultralytics installed) a real YOLO model runs on
+random 640x640 frames. Otherwise a stand-in model is used whose cost, like
+a CNN on CPU, is a fixed per-call overhead plus a smaller per-frame cost
+computed as one matrix product over the whole batch.
+
+Usage:
+    python -m benchmarks.bench_batching --callers 2 16 --windows 0 2 5 10 20
+    python -m benchmarks.bench_batching --weights yolov8n.pt --frames 64
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import numpy as np
+
+from app.ai.batching import MicroBatcher
+from app.ai.inference import InferenceExecutor
+
+
+class StandInModel:
+    """Matrix-product "network" with a per-call overhead"""
+    
+    def __init__(self, overhead_ms: float, features: int = 512):
+        self.overhead = overhead_ms / 1000
+        self.weights = np.random.rand(features, features).astype(np.float32)
+        self.features = features
+    
+    def __call__(self, frames: List[np.ndarray]) -> List[float]:
+        time.sleep(self.overhead)
+        batch = np.stack([frame.reshape(-1)[:self.features] for frame in frames]).astype(np.float32)
+        for _ in range(20):
+            batch = np.tanh(batch @ self.weights)
+        return [float(row.sum()) for row in batch]
+
+
+def load_model(weights: str):
+    """Real YOLO model, called on a list of frames"""
+    from ultralytics import YOLO
+    model = YOLO(weights)
+    return lambda frames: model(frames, verbose=False)
+
+
+async def run_window(model, window_ms: float, batch_size: int, callers: int, frames: int) -> dict:
+    """Drive `callers` closed-loop clients through one batching configuration"""
+    executor = InferenceExecutor(mode="thread", workers=1, max_queue=callers, timeout=120)
+    
+    async def run_batch(batch):
+        return await executor.run(model, batch)
+    
+    batcher = MicroBatcher(
+        run_batch, max_batch_size=batch_size, max_wait_ms=window_ms, max_pending=callers * 2
+    )
+    frame = np.random.randint(0, 255, (640, 640, 3), dtype=np.uint8)
+    latencies: List[float] = []
+    
+    async def caller():
+        for _ in range(frames):
+            started = time.perf_counter()
+            await batcher.submit(frame)
+            latencies.append(time.perf_counter() - started)
+    
+    # Warm up the pool and the model
+    await batcher.submit(frame)
+    batcher.batches = batcher.items = 0
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(callers)))
+    elapsed = time.perf_counter() - started
+    stats = batcher.stats()
+    await batcher.stop()
+    executor.shutdown()
+    
+    latencies.sort()
+    return {
+        "fps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "avg_batch": stats["avg_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched inference")
+    parser.add_argument("--callers", type=int, nargs="+", default=[2, 16],
+                        help="Concurrent callers (one table per value)")
+    parser.add_argument("--frames", type=int, default=32, help="Frames per caller")
+    parser.add_argument("--batch-size", type=int, default=8, help="Largest batch")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5, 10, 20],
+                        help="Batch windows in milliseconds")
+    parser.add_argument("--overhead-ms", type=float, default=15,
+                        help="Per-call overhead of the stand-in model")
+    parser.add_argument("--weights", help="YOLO weights to benchmark instead of the stand-in")
+    args = parser.parse_args()
+    
+    model = load_model(args.weights) if args.weights else StandInModel(args.overhead_ms)
+    label = args.weights or f"stand-in ({args.overhead_ms:.0f} ms overhead)"
+    configurations = [(1, 0)] + [(args.batch_size, window) for window in args.windows]
+    for callers in args.callers:
+        print(f"{label}: {callers} callers x {args.frames} frames")
+        print(f"{'batch':>5} {'window':>8} {'frames/s':>9} {'p50':>9} {'p99':>9} {'avg batch':>10}")
+        for batch_size, window in configurations:
+            result = asyncio.run(run_window(model, window, batch_size, callers, args.frames))
+            print(
+                f"{batch_size:>5} {window:>6.0f}ms {result['fps']:>9.1f} {result['p50_ms']:>7.1f}ms "
+                f"{result['p99_ms']:>7.1f}ms {result['avg_batch']:>10.2f}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
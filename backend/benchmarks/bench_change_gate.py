@@ -0,0 +1,130 @@
+"""
+Measure how much inference frame-change gating skips
+
+Plays recorded footage (any file OpenCV can open) through the
+FrameChangeGate at the monitoring interval and reports the share of frames
+that would skip inference, re-check only some slots, or need a full pass,
+plus the gate's own cost per frame. Without `--video`, synthetic footage of
+a mostly static lot with sensor noise and occasional arrivals is used.
+
+Usage:
+    python -m benchmarks.bench_change_gate --video lot.mp4 --every 2.0 --layout layout.json
+    python -m benchmarks.bench_change_gate --frames 500 --slots 60
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.ai.change_gate import FrameChangeGate
+from app.ai.slot_layout import SlotLayout
+
+
+def load_layout(path: Path) -> SlotLayout:
+    """Layout from a JSON file in the upload format ({"regions": [...]})"""
+    regions = json.loads(path.read_text())["regions"]
+    return SlotLayout(
+        range(len(regions)),
+        [region["slot_number"] for region in regions],
+        [region["polygon"] for region in regions]
+    )
+
+
+def grid_layout(slots: int, columns: int = 10) -> SlotLayout:
+    """Slots in a regular grid"""
+    rows = -(-slots // columns)
+    polygons = []
+    for index in range(slots):
+        row, column = divmod(index, columns)
+        x1, y1, x2, y2 = column / columns, row / rows, (column + 1) / columns, (row + 1) / rows
+        polygons.append([[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+    return SlotLayout(range(slots), [f"S{i}" for i in range(slots)], polygons)
+
+
+def video_frames(path: Path, every: float):
+    """One frame every `every` seconds of the recording"""
+    capture = cv2.VideoCapture(str(path))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    step = max(1, round(fps * every))
+    index = 0
+    while True:
+        ok = capture.grab()
+        if not ok:
+            break
+        if index % step == 0:
+            ok, frame = capture.retrieve()
+            if ok:
+                yield frame
+        index += 1
+    capture.release()
+
+
+def synthetic_frames(count: int, layout: SlotLayout, width: int, height: int, change_rate: float, seed: int = 3):
+    """Static lot with per-frame noise; each frame a few slots may flip"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(80, 140, (height, width, 3), dtype=np.uint8)
+    occupied = rng.random(len(layout)) < 0.5
+    for _ in range(count):
+        flips = rng.random(len(layout)) < change_rate
+        occupied ^= flips
+        frame = background.copy()
+        for polygon, taken in zip(layout.polygons, occupied):
+            if taken:
+                x1, y1 = (polygon.min(axis=0) * (width, height) * 1.02).astype(int)
+                x2, y2 = (polygon.max(axis=0) * (width, height) * 0.98).astype(int)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (30, 30, 30), -1)
+        noise = rng.integers(-4, 5, frame.shape, dtype=np.int16)
+        yield np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure frame-change gating")
+    parser.add_argument("--video", type=Path, help="Recorded footage")
+    parser.add_argument("--every", type=float, default=2.0, help="Seconds between analysed frames")
+    parser.add_argument("--layout", type=Path, help="Slot layout JSON (upload format)")
+    parser.add_argument("--frames", type=int, default=300, help="Synthetic frames")
+    parser.add_argument("--slots", type=int, default=60, help="Synthetic slots")
+    parser.add_argument("--change-rate", type=float, default=0.003, help="Synthetic per-slot flip chance")
+    parser.add_argument("--global-threshold", type=float, default=6.0)
+    parser.add_argument("--slot-threshold", type=float, default=12.0)
+    args = parser.parse_args()
+    
+    layout = load_layout(args.layout) if args.layout else grid_layout(args.slots)
+    if args.video:
+        frames = video_frames(args.video, args.every)
+    else:
+        frames = synthetic_frames(args.frames, layout, 1920, 1080, args.change_rate)
+    
+    gate = FrameChangeGate(
+        global_threshold=args.global_threshold,
+        slot_threshold=args.slot_threshold,
+        max_age=float("inf")
+    )
+    full = slots_rechecked = 0
+    seconds = 0.0
+    for frame in frames:
+        started = time.perf_counter()
+        decision = gate.check("camera", frame, layout)
+        if decision.full:
+            full += 1
+            gate.commit("camera", decision.thumbnail, {}, layout)
+        elif not decision.skip:
+            slots_rechecked += int(decision.changed_slots.sum())
+            gate.commit("camera", decision.thumbnail, {}, layout, decision.changed_slots)
+        seconds += time.perf_counter() - started
+    
+    stats = gate.stats()
+    frames_seen = max(stats["frames"], 1)
+    print(f"frames analysed:   {stats['frames']}")
+    print(f"skipped:           {stats['skipped'] / frames_seen:6.1%}")
+    print(f"partial (slots):   {stats['partial'] / frames_seen:6.1%}  ({slots_rechecked} slot re-checks)")
+    print(f"full inference:    {full / frames_seen:6.1%}")
+    print(f"gate cost:         {seconds / frames_seen * 1000:.2f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
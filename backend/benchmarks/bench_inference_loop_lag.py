@@ -0,0 +1,83 @@
+"""
+Benchmark event loop lag while model inference is running
+
+Runs a stand-in CPU-bound "model" (default 200 ms per call) from several
+concurrent requests and measures how late the event loop wakes a ticking
+task. Inline execution stalls the loop for the whole inference; the thread
+pool keeps it responsive.
+
+Usage:
+    python -m benchmarks.bench_inference_loop_lag --requests 20 --model-ms 200
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.ai.inference import InferenceExecutor, InferenceBusyError
+from app.core.loop_monitor import LoopLagMonitor
+
+
+def fake_model(model_ms: float) -> int:
+    """
+    Burn CPU for roughly `model_ms` milliseconds
+    
+    Uses NumPy matrix products, which like real model kernels release the GIL.
+    """
+    matrix = np.random.rand(128, 128)
+    deadline = time.perf_counter() + model_ms / 1000
+    count = 0
+    while time.perf_counter() < deadline:
+        matrix.dot(matrix)
+        count += 1
+    return count
+
+
+async def run_mode(mode: str, requests: int, model_ms: float, workers: int, max_queue: int) -> dict:
+    """Fire `requests` concurrent inferences and report loop lag"""
+    executor = InferenceExecutor(mode=mode, workers=workers, max_queue=max_queue, timeout=60)
+    monitor = LoopLagMonitor(interval=0.005, window=100000)
+    await monitor.start()
+    started = time.perf_counter()
+    
+    async def one(index: int):
+        # Requests arrive spread out, as they would from cameras and clients
+        await asyncio.sleep(index * 0.01)
+        try:
+            await executor.run(fake_model, model_ms)
+        except InferenceBusyError:
+            pass
+    
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+    executor.shutdown()
+    
+    stats = monitor.stats()
+    stats.update(executor.stats())
+    stats["elapsed_s"] = elapsed
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event loop lag during inference")
+    parser.add_argument("--requests", type=int, default=20, help="Concurrent inference requests")
+    parser.add_argument("--model-ms", type=float, default=200, help="Simulated inference time")
+    parser.add_argument("--workers", type=int, default=1, help="Inference workers")
+    parser.add_argument("--max-queue", type=int, default=8, help="Queued jobs beyond the workers")
+    args = parser.parse_args()
+    
+    print(f"{args.requests} requests x {args.model_ms:.0f} ms model, {args.workers} worker(s)\n")
+    print(f"{'mode':<8} {'lag p50':>9} {'lag p99':>9} {'lag max':>9} {'done':>6} {'rejected':>9} {'elapsed':>9}")
+    for mode in ("inline", "thread"):
+        stats = asyncio.run(run_mode(mode, args.requests, args.model_ms, args.workers, args.max_queue))
+        print(
+            f"{mode:<8} {stats['p50_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms {stats['max_ms']:>7.1f}ms "
+            f"{stats['completed']:>6} {stats['rejected']:>9} {stats['elapsed_s']:>8.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Compare per-box and vectorized post-processing of YOLO results
+
+Builds ultralytics-like results for crowded frames and times the former
+per-box loop (three tensor copies and a class-list rebuild per box)
+against Detections.from_result. With torch installed the boxes are real
+CPU tensors, so per-call `.cpu().numpy()` overhead is included; otherwise
+numpy stand-ins are used and the gap is understated.
+
+Usage:
+    python -m benchmarks.bench_postprocess --boxes 50 200 500
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.ai.postprocess import Detections
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# COCO-style names: the vehicle classes among others
+NAMES = {0: "person", 1: "bicycle", 2: "car", 3: "motorcycle", 5: "bus", 7: "truck", 9: "traffic light"}
+
+
+class Tensor:
+    """numpy stand-in for a torch tensor"""
+    
+    def __init__(self, array):
+        self.array = array
+    
+    def __getitem__(self, index):
+        return Tensor(self.array[index])
+    
+    def __len__(self):
+        return len(self.array)
+    
+    def cpu(self):
+        return self
+    
+    def numpy(self):
+        return self.array
+
+
+def as_tensor(array):
+    return torch.from_numpy(array) if torch is not None else Tensor(array)
+
+
+class Box:
+    """One box, as yielded when iterating ultralytics Boxes"""
+    
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = as_tensor(xyxy[None])
+        self.conf = as_tensor(conf[None])
+        self.cls = as_tensor(cls[None])
+
+
+class Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = as_tensor(xyxy)
+        self.conf = as_tensor(conf)
+        self.cls = as_tensor(cls)
+        self.rows = [Box(xyxy[i], conf[i], cls[i]) for i in range(len(cls))]
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class Result:
+    def __init__(self, count: int, rng):
+        xy = rng.uniform(0, 1800, (count, 2)).astype(np.float32)
+        xyxy = np.concatenate([xy, xy + rng.uniform(40, 120, (count, 2)).astype(np.float32)], axis=1)
+        conf = rng.uniform(0.5, 1.0, count).astype(np.float32)
+        cls = rng.choice(list(NAMES), count).astype(np.float32)
+        self.boxes = Boxes(xyxy, conf, cls)
+        self.names = NAMES
+
+
+def per_box(result):
+    """The former loop in ParkingSlotDetector.detect_slots"""
+    detections = []
+    for box in result.boxes:
+        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+        confidence = float(box.conf[0].cpu().numpy())
+        class_id = int(box.cls[0].cpu().numpy())
+        class_name = result.names[class_id]
+        vehicle_classes = ['car', 'truck', 'bus', 'motorcycle', 'van']
+        if class_name.lower() in vehicle_classes:
+            detections.append({
+                "bbox": [float(x1), float(y1), float(x2), float(y2)],
+                "confidence": confidence,
+                "class": class_name,
+                "status": "occupied"
+            })
+    boxes = np.array([d["bbox"] for d in detections], dtype=np.float32).reshape(-1, 4)
+    return detections, boxes
+
+
+def vectorized(result):
+    vehicles = Detections.from_result(result)
+    return vehicles.to_list(), vehicles.boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO post-processing")
+    parser.add_argument("--boxes", type=int, nargs="+", default=[20, 200, 500])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(2)
+    print(f"tensors: {'torch' if torch is not None else 'numpy stand-in'}")
+    print(f"{'boxes':>6} {'per-box ms':>11} {'vectorized ms':>14} {'speedup':>8}")
+    for count in args.boxes:
+        result = Result(count, rng)
+        assert per_box(result)[0] == vectorized(result)[0]
+        timings = []
+        for process in (per_box, vectorized):
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                process(result)
+            timings.append((time.perf_counter() - started) / args.repeat * 1000)
+        print(f"{count:>6} {timings[0]:>11.3f} {timings[1]:>14.3f} {timings[0] / timings[1]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compare full-size and reduced-resolution frame preprocessing
+
+Times, per frame, two ways of turning a camera JPEG into a model input:
+
+- baseline: full decode, resize of the whole frame and copyMakeBorder
+            padding (as ultralytics letterboxes), new arrays every frame
+- reduced:  decode at 1/2, 1/4 or 1/8 size as the slot area allows, crop
+            to the slot area and letterbox into a pooled buffer
+
+and reports the peak memory allocated for a frame (tracemalloc, numpy
+included).
+Frames are synthetic unless `--images` points at a directory of JPEGs.
+
+Usage:
+    python -m benchmarks.bench_preprocess --sizes 1920x1080 3840x2160
+    python -m benchmarks.bench_preprocess --images samples/ --roi 0.1 0.3 0.9 1.0
+"""
+
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.ai.preprocess import Letterboxer, decode_image, jpeg_size, max_reduction
+
+
+def synthetic_frame(width: int, height: int, seed: int = 1) -> bytes:
+    """A smooth, noisy frame encoded like a camera snapshot"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (height // 16, width // 16, 3), dtype=np.uint8)
+    frame = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    frame = cv2.add(frame, rng.integers(0, 20, frame.shape, dtype=np.uint8))
+    return cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+
+
+def baseline(data: bytes, size: int) -> np.ndarray:
+    image = decode_image(data)
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    left, top = (size - new_width) // 2, (size - new_height) // 2
+    return cv2.copyMakeBorder(
+        resized, top, size - new_height - top, left, size - new_width - left,
+        cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+
+
+def reduced(letterboxer: Letterboxer, roi):
+    def run(data: bytes, size: int) -> np.ndarray:
+        height, width = jpeg_size(data)
+        x1, y1, x2, y2 = roi
+        side = max((x2 - x1) * width, (y2 - y1) * height)
+        image = decode_image(data, max_reduction(int(side), size))
+        height, width = image.shape[:2]
+        box = np.array([x1 * width, y1 * height, x2 * width, y2 * height])
+        buffer, _ = letterboxer.letterbox(image, box)
+        letterboxer.release(buffer)
+        return buffer
+    return run
+
+
+def measure(process, frames, size: int, repeat: int):
+    """(ms per frame, peak KiB allocated for a frame)"""
+    for data in frames:
+        process(data, size)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for data in frames:
+            process(data, size)
+    milliseconds = (time.perf_counter() - started) / (repeat * len(frames)) * 1000
+    
+    tracemalloc.start()
+    for data in frames:
+        process(data, size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return milliseconds, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark frame preprocessing")
+    parser.add_argument("--sizes", nargs="+", default=["1280x720", "1920x1080", "3840x2160"])
+    parser.add_argument("--images", help="Directory of JPEG frames instead of synthetic ones")
+    parser.add_argument(
+        "--roi", type=float, nargs=4, default=[0.0, 0.2, 1.0, 1.0],
+        metavar=("X1", "Y1", "X2", "Y2"), help="Slot area as fractions of the frame"
+    )
+    parser.add_argument("--input-size", type=int, default=640)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    
+    if args.images:
+        paths = sorted(Path(args.images).glob("*.jp*g"))
+        groups = [(f"{len(paths)} images", [path.read_bytes() for path in paths])]
+    else:
+        groups = []
+        for size in args.sizes:
+            width, height = (int(value) for value in size.split("x"))
+            groups.append((size, [synthetic_frame(width, height)]))
+    
+    letterboxer = Letterboxer(args.input_size)
+    pipelines = [("baseline", baseline), ("reduced", reduced(letterboxer, args.roi))]
+    
+    print(f"input {args.input_size}, slot area {args.roi}")
+    print(f"{'frames':<12} {'pipeline':<9} {'ms/frame':>9} {'peak KiB':>10} {'speedup':>8}")
+    for name, frames in groups:
+        timings = []
+        for pipeline, process in pipelines:
+            milliseconds, kib = measure(process, frames, args.input_size, args.repeat)
+            timings.append(milliseconds)
+            speedup = f"{timings[0] / milliseconds:.1f}x"
+            print(f"{name:<12} {pipeline:<9} {milliseconds:>9.2f} {kib:>10.0f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
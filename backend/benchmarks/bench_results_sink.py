@@ -0,0 +1,126 @@
+"""
+Compare per-tick writes of monitoring results with the batched results sink
+
+Simulates `--lots` monitored lots of `--slots` slots against a SQLite
+file database. Every round each lot ticks once and a share `--changes` of
+its slots change status. Reports, per strategy, database time per round
+and transactions committed:
+
+- per-tick:  each tick loads its changed slots as ORM objects, updates
+  them and the lot's availability and commits, as an endpoint would
+- sink:      ticks submit to the ResultsSink, which writes all lots'
+  changes with one flush per round
+
+Usage:
+    python -m benchmarks.bench_results_sink --lots 200 --slots 100 --changes 0.05 --rounds 10
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.ai.results_sink import ResultsSink
+from app.core.database import Base
+# From the package, so every model (and every relationship target) is mapped
+from app.models import ParkingLot, ParkingSlot, SlotStatus
+
+
+def create_database(path: str, lots: int, slots: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    commits = {"count": 0}
+    event.listen(engine, "commit", lambda connection: commits.__setitem__("count", commits["count"] + 1))
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    for lot_id in range(1, lots + 1):
+        db.add(ParkingLot(
+            id=lot_id, name=f"Lot {lot_id}", address="-", city="-", state="-", zip_code="-",
+            latitude=0.0, longitude=0.0, total_slots=slots, available_slots=slots
+        ))
+    db.flush()
+    db.bulk_insert_mappings(ParkingSlot, [
+        {"parking_lot_id": lot_id, "slot_number": str(number), "status": SlotStatus.AVAILABLE}
+        for lot_id in range(1, lots + 1) for number in range(slots)
+    ])
+    db.commit()
+    db.close()
+    commits["count"] = 0
+    return engine, Session, commits
+
+
+def round_changes(rng, state: np.ndarray, share: float):
+    """Flip a random share of every lot's slots; {lot: [change]}"""
+    lots, slots = state.shape
+    flips = rng.random(state.shape) < share
+    state ^= flips
+    return {
+        lot + 1: [
+            {"slot_id": lot * slots + index + 1, "status": "occupied" if state[lot, index] else "available"}
+            for index in np.flatnonzero(flips[lot])
+        ]
+        for lot in range(lots)
+    }
+
+
+def write_per_tick(Session, parking_lot_id: int, changes):
+    db = Session()
+    try:
+        by_id = {change["slot_id"]: change["status"] for change in changes}
+        for slot in db.query(ParkingSlot).filter(ParkingSlot.id.in_(list(by_id))):
+            slot.status = SlotStatus(by_id[slot.id])
+        lot = db.get(ParkingLot, parking_lot_id)
+        lot.available_slots = db.query(ParkingSlot).filter(
+            ParkingSlot.parking_lot_id == parking_lot_id, ParkingSlot.status == SlotStatus.AVAILABLE
+        ).count()
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(args, strategy: str):
+    with tempfile.TemporaryDirectory() as directory:
+        engine, Session, commits = create_database(os.path.join(directory, "bench.db"), args.lots, args.slots)
+        rng = np.random.default_rng(7)
+        state = np.zeros((args.lots, args.slots), dtype=bool)
+        sink = ResultsSink(session_factory=Session, publish=lambda events: None, flush_interval=3600)
+        elapsed = 0.0
+        for _ in range(args.rounds):
+            changes = round_changes(rng, state, args.changes)
+            started = time.perf_counter()
+            if strategy == "per-tick":
+                for parking_lot_id, lot_changes in changes.items():
+                    write_per_tick(Session, parking_lot_id, lot_changes)
+            else:
+                for parking_lot_id, lot_changes in changes.items():
+                    sink.submit(parking_lot_id, {}, lot_changes)
+                await sink.flush()
+            elapsed += time.perf_counter() - started
+        await sink.close()
+        engine.dispose()
+    
+    per_round = elapsed / args.rounds * 1000
+    print(f"{strategy:<10} {per_round:>12.1f} {commits['count'] / args.rounds:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched monitoring result writes")
+    parser.add_argument("--lots", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=100, help="Slots per lot")
+    parser.add_argument("--changes", type=float, default=0.05, help="Share of slots changing per tick")
+    parser.add_argument("--rounds", type=int, default=10, help="Ticks per lot")
+    args = parser.parse_args()
+    
+    print(f"{args.lots} lots x {args.slots} slots, {args.changes:.0%} of slots changing per tick")
+    print(f"{'strategy':<10} {'ms per round':>12} {'commits/round':>14}")
+    for strategy in ("per-tick", "sink"):
+        asyncio.run(run(args, strategy))
+
+
+if __name__ == "__main__":
+    main()
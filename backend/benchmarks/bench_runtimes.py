@@ -0,0 +1,102 @@
+"""
+Compare detector latency and output across inference runtimes
+
+Loads every runtime available for the weights (the PyTorch model plus the
+ONNX / OpenVINO / TorchScript copies from `ai-service/train_model.py
+--export` and the INT8 model from `--quantize`), checks each one finds the
+same detections as PyTorch within tolerance, and reports per-frame CPU
+latency. INT8 differences are reported but not treated as failures.
+
+Needs ultralytics and the runtime packages (onnxruntime, openvino).
+
+Usage:
+    python -m benchmarks.bench_runtimes --weights models/parking_slot_detector.pt --images samples/
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.ai.runtimes import (
+    available_runtimes, artifact_path, detections_match, predict_fixed_batch, read_manifest
+)
+
+
+def load_frames(images: Path, count: int):
+    """Frames from a folder, or random noise frames"""
+    if images:
+        paths = sorted(path for path in images.iterdir() if path.suffix.lower() in {".jpg", ".jpeg", ".png"})
+        frames = [cv2.imread(str(path)) for path in paths[:count]]
+        return [frame for frame in frames if frame is not None]
+    rng = np.random.default_rng(5)
+    return [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def detections(result):
+    """(boxes, confidences, classes) of one ultralytics result"""
+    boxes = result.boxes
+    return (
+        boxes.xyxy.cpu().numpy(),
+        boxes.conf.cpu().numpy(),
+        boxes.cls.cpu().numpy().astype(int)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inference runtimes")
+    parser.add_argument("--weights", type=Path, default=Path("models/parking_slot_detector.pt"))
+    parser.add_argument("--images", type=Path, help="Folder of sample frames")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--conf", type=float, default=0.5)
+    args = parser.parse_args()
+    
+    from ultralytics import YOLO
+    
+    frames = load_frames(args.images, args.frames)
+    manifest = read_manifest(args.weights)
+    options = {"conf": args.conf, "verbose": False}
+    if manifest.get("imgsz"):
+        options["imgsz"] = manifest["imgsz"]
+    
+    reference = None
+    mismatched = False
+    print(f"{'runtime':<12} {'p50 ms':>8} {'mean ms':>8} {'parity':>7}")
+    for runtime in reversed(available_runtimes(args.weights)):
+        model = YOLO(str(artifact_path(args.weights, runtime)), task="detect")
+        batch = manifest.get("batch") if runtime != "pytorch" else None
+        for frame in frames[:args.warmup]:
+            predict_fixed_batch(model, [frame], batch, **options)
+        
+        timings, outputs = [], []
+        for frame in frames:
+            started = time.perf_counter()
+            result = predict_fixed_batch(model, [frame], batch, **options)[0]
+            timings.append((time.perf_counter() - started) * 1000)
+            outputs.append(detections(result))
+        
+        # Runtimes run slowest first, so PyTorch (when installed) is the reference
+        if reference is None:
+            reference = outputs
+            parity = "ref"
+        else:
+            same = all(detections_match(ref, out) for ref, out in zip(reference, outputs))
+            if runtime == "onnx-int8":
+                # Quantization shifts outputs; its accuracy is gated at export instead
+                parity = "ok" if same else "drift"
+            else:
+                mismatched |= not same
+                parity = "ok" if same else "FAIL"
+        print(f"{runtime:<12} {statistics.median(timings):>8.1f} {statistics.mean(timings):>8.1f} {parity:>7}")
+    
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Compare one monitoring task per lot with the central camera scheduler
+
+Simulates a fleet of cameras whose ticks fetch a frame (`--fetch-ms` of
+I/O) and then wait for one of `--workers` inference workers
+(`--infer-ms` each). Reports, per strategy:
+
+- peak:   most ticks in flight at once
+- burst:  most ticks started in any 100 ms, against the average
+- p99:    99th percentile tick duration, fetch plus inference queueing
+- ticks:  ticks completed per camera and interval
+
+With one task per lot, all cameras fire together every interval and the
+inference queue absorbs the burst; the scheduler keeps a steady flow.
+
+Usage:
+    python -m benchmarks.bench_scheduler --cameras 2000 --interval 2 --duration 6
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.ai.scheduler import CameraScheduler
+
+
+class Fleet:
+    """Simulated cameras sharing a pool of inference workers"""
+    
+    def __init__(self, workers: int, fetch_ms: float, infer_ms: float):
+        self.workers = asyncio.Semaphore(workers)
+        self.fetch = fetch_ms / 1000
+        self.infer = infer_ms / 1000
+        self.in_flight = 0
+        self.peak = 0
+        self.starts = []
+        self.durations = []
+    
+    async def tick(self, key: int):
+        started = time.perf_counter()
+        self.starts.append(started)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.fetch)
+            async with self.workers:
+                await asyncio.sleep(self.infer)
+        finally:
+            self.in_flight -= 1
+        self.durations.append(time.perf_counter() - started)
+    
+    def report(self, name: str, cameras: int, interval: float, duration: float):
+        starts = np.array(self.starts) - self.starts[0]
+        per_window = np.bincount((starts / 0.1).astype(int))
+        p99 = np.percentile(self.durations, 99) * 1000 if self.durations else 0.0
+        ticks = len(self.durations) / cameras / (duration / interval)
+        print(
+            f"{name:<10} {self.peak:>6} {per_window.max():>6} {per_window.mean():>8.1f} "
+            f"{p99:>9.0f} {ticks:>6.2f}"
+        )
+
+
+async def task_per_lot(fleet: Fleet, cameras: int, interval: float, duration: float):
+    """The former pattern: a forever-running loop per lot, all started together"""
+    async def loop(key):
+        while True:
+            await fleet.tick(key)
+            await asyncio.sleep(interval)
+    
+    tasks = [asyncio.create_task(loop(key)) for key in range(cameras)]
+    await asyncio.sleep(duration)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def scheduled(fleet: Fleet, cameras: int, interval: float, duration: float, budget: int):
+    scheduler = CameraScheduler(fleet.tick, max_concurrent=budget)
+    for key in range(cameras):
+        scheduler.schedule(key, interval)
+    await asyncio.sleep(duration)
+    stats = scheduler.stats()
+    await scheduler.stop()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark camera scheduling")
+    parser.add_argument("--cameras", type=int, default=2000)
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between ticks of a camera")
+    parser.add_argument("--duration", type=float, default=6.0)
+    parser.add_argument("--workers", type=int, default=8, help="Inference workers")
+    parser.add_argument("--fetch-ms", type=float, default=20.0)
+    parser.add_argument("--infer-ms", type=float, default=4.0)
+    parser.add_argument("--budget", type=int, default=32, help="Scheduler concurrency budget")
+    args = parser.parse_args()
+    
+    capacity = args.workers / (args.infer_ms / 1000) * args.interval
+    print(f"{args.cameras} cameras every {args.interval}s; inference capacity {capacity:.0f} ticks per interval")
+    print(f"{'strategy':<10} {'peak':>6} {'burst':>6} {'avg/100ms':>8} {'p99 ms':>9} {'ticks':>6}")
+    
+    fleet = Fleet(args.workers, args.fetch_ms, args.infer_ms)
+    asyncio.run(task_per_lot(fleet, args.cameras, args.interval, args.duration))
+    fleet.report("per-lot", args.cameras, args.interval, args.duration)
+    
+    fleet = Fleet(args.workers, args.fetch_ms, args.infer_ms)
+    stats = asyncio.run(scheduled(fleet, args.cameras, args.interval, args.duration, args.budget))
+    fleet.report("scheduler", args.cameras, args.interval, args.duration)
+    print(f"scheduling lag p50 {stats['lag_p50_ms']:.0f} ms, p99 {stats['lag_p99_ms']:.0f} ms, late ticks {stats['late']}")
+
+
+if __name__ == "__main__":
+    main()
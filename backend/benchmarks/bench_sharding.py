@@ -0,0 +1,54 @@
+"""
+Measure how evenly the hash ring shards lots and how many move on changes
+
+For each number of points per worker (`--vnodes`), places `--lots` lots
+on `--workers` workers and reports:
+
+- max/mean:  the busiest worker's lots against the average (1.0 is even)
+- join:      share of lots that move when one worker joins (ideal 1/(n+1))
+- leave:     share that move when one worker leaves (ideal 1/n)
+
+Usage:
+    python -m benchmarks.bench_sharding --lots 5000 --workers 8 --vnodes 1 16 64 256
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.ai.sharding import HashRing
+
+
+def owners(ring: HashRing, lots: int) -> np.ndarray:
+    return np.array([ring.owner(key) for key in range(lots)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark consistent hashing of monitored lots")
+    parser.add_argument("--lots", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--vnodes", type=int, nargs="+", default=[1, 16, 64, 256])
+    args = parser.parse_args()
+    
+    workers = [f"worker-{index}" for index in range(args.workers)]
+    print(f"{args.lots} lots on {args.workers} workers; ideal join {1 / (args.workers + 1):.1%}, "
+          f"leave {1 / args.workers:.1%}")
+    print(f"{'vnodes':>6} {'max/mean':>9} {'join':>7} {'leave':>7} {'lookup us':>10}")
+    for vnodes in args.vnodes:
+        ring = HashRing(workers, vnodes)
+        started = time.perf_counter()
+        placed = owners(ring, args.lots)
+        lookup = (time.perf_counter() - started) / args.lots * 1e6
+        
+        _, counts = np.unique(placed, return_counts=True)
+        joined = owners(HashRing(workers + ["worker-new"], vnodes), args.lots)
+        left = owners(HashRing(workers[1:], vnodes), args.lots)
+        print(
+            f"{vnodes:>6} {counts.max() / counts.mean():>9.2f} {np.mean(joined != placed):>7.1%} "
+            f"{np.mean(left != placed):>7.1%} {lookup:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Compare the YOLO and per-slot classifier detection engines
+
+Reports CPU time per frame and per-slot accuracy for:
+
+- yolo:       full-frame vehicle detection mapped onto slot polygons
+- classifier: every slot crop classified in one batched pass
+
+Frames come from a labelled YOLO dataset split (`--dataset`, where the
+empty_slot/occupied_slot boxes serve as both layout and ground truth) or,
+by default, from synthetic lots with dark "cars" on grey asphalt.
+
+The YOLO engine needs ultralytics and `--weights`. The classifier engine
+uses `--classifier` (an ONNX model from `ai-service/train_model.py
+--classifier`); without one, a stand-in head (crop contrast) runs on the
+real crop-and-batch pipeline so its cost can still be measured.
+
+Usage:
+    python -m benchmarks.bench_slot_engines --frames 50 --slots 120
+    python -m benchmarks.bench_slot_engines --dataset ../ai-service/dataset --split val \\
+        --weights yolov8n.pt --classifier models/slot_classifier.onnx
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from app.ai.postprocess import Detections
+from app.ai.slot_layout import SlotLayout
+from app.ai.slot_classifier import SlotClassifier, predict_slots
+
+
+def box_polygon(x1: float, y1: float, x2: float, y2: float) -> List[List[float]]:
+    """Normalized rectangle as a polygon"""
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+
+def synthetic_frames(count: int, slots: int, width: int, height: int, seed: int = 7):
+    """Lots with a grid of slots, some holding a dark car-sized rectangle"""
+    rng = np.random.default_rng(seed)
+    columns = int(np.ceil(np.sqrt(slots * width / height)))
+    rows = int(np.ceil(slots / columns))
+    polygons = []
+    for index in range(slots):
+        row, column = divmod(index, columns)
+        x1, y1 = column / columns, row / rows
+        polygons.append(box_polygon(x1, y1, x1 + 1 / columns, y1 + 1 / rows))
+    layout = SlotLayout(range(slots), [f"S{i}" for i in range(slots)], polygons)
+    
+    for _ in range(count):
+        frame = rng.integers(90, 130, (height, width, 3), dtype=np.uint8)
+        truth = rng.random(slots) < 0.5
+        for polygon, occupied in zip(polygons, truth):
+            if occupied:
+                (x1, y1), (x2, y2) = polygon[0], polygon[2]
+                pad_x, pad_y = (x2 - x1) * 0.15, (y2 - y1) * 0.1
+                color = tuple(int(c) for c in rng.integers(0, 60, 3))
+                cv2.rectangle(
+                    frame,
+                    (int((x1 + pad_x) * width), int((y1 + pad_y) * height)),
+                    (int((x2 - pad_x) * width), int((y2 - pad_y) * height)),
+                    color, -1
+                )
+        yield frame, layout, truth
+
+
+def dataset_frames(dataset: Path, split: str, limit: int):
+    """Frames, layouts and ground truth from YOLO slot labels"""
+    images = sorted((dataset / "images" / split).glob("*"))[:limit]
+    for image_path in images:
+        label_path = dataset / "labels" / split / f"{image_path.stem}.txt"
+        frame = cv2.imread(str(image_path))
+        if frame is None or not label_path.exists():
+            continue
+        polygons, truth = [], []
+        for line in label_path.read_text().splitlines():
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            cx, cy, w, h = (float(value) for value in parts[1:5])
+            polygons.append(box_polygon(
+                max(0.0, cx - w / 2), max(0.0, cy - h / 2), min(1.0, cx + w / 2), min(1.0, cy + h / 2)
+            ))
+            truth.append(int(parts[0]) == 1)
+        if polygons:
+            numbers = [str(i) for i in range(len(polygons))]
+            yield frame, SlotLayout(range(len(polygons)), numbers, polygons), np.array(truth)
+
+
+def stand_in_scores(image: np.ndarray, layout: SlotLayout, input_size: int) -> np.ndarray:
+    """Crop contrast through the real crop-and-batch pipeline"""
+    batch = SlotClassifier("unused", input_size).blob(image, layout)
+    gray = batch.mean(axis=1)
+    darkness = 1.0 - gray.reshape(len(layout), -1).mean(axis=1)
+    return np.clip((darkness - 0.45) * 4, 0, 1)
+
+
+def run_engine(frames, classify) -> Tuple[float, float, int]:
+    """
+    Time an engine over all frames and score it against the ground truth
+    
+    Returns:
+        (CPU ms per frame, accuracy, slots evaluated)
+    """
+    seconds = 0.0
+    correct = total = count = 0
+    for frame, layout, truth in frames:
+        count += 1
+        started = time.process_time()
+        occupied = classify(frame, layout)
+        seconds += time.process_time() - started
+        correct += int((occupied == truth).sum())
+        total += len(truth)
+    return seconds / max(count, 1) * 1000, correct / total if total else 0.0, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare slot detection engines")
+    parser.add_argument("--frames", type=int, default=30, help="Frames to evaluate")
+    parser.add_argument("--slots", type=int, default=120, help="Slots per synthetic frame")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--dataset", type=Path, help="YOLO dataset with slot labels")
+    parser.add_argument("--split", default="val")
+    parser.add_argument("--weights", help="YOLO vehicle detector weights")
+    parser.add_argument("--classifier", help="Slot classifier ONNX model")
+    parser.add_argument("--input-size", type=int, default=64)
+    parser.add_argument("--coverage", type=float, default=0.4, help="Occupancy threshold for YOLO")
+    args = parser.parse_args()
+    
+    def frames():
+        if args.dataset:
+            return dataset_frames(args.dataset, args.split, args.frames)
+        return synthetic_frames(args.frames, args.slots, args.width, args.height)
+    
+    engines = []
+    if args.classifier:
+        engines.append(("classifier", lambda frame, layout: predict_slots(
+            args.classifier, args.input_size, frame, layout) >= 0.5))
+    else:
+        engines.append(("classifier (stand-in head)", lambda frame, layout: stand_in_scores(
+            frame, layout, args.input_size) >= 0.5))
+    
+    if args.weights:
+        from ultralytics import YOLO
+        model = YOLO(args.weights)
+        
+        def yolo(frame, layout):
+            vehicles = Detections.from_result(model(frame, verbose=False)[0])
+            return layout.occupancy(vehicles.boxes, frame.shape, args.coverage)[0]
+        
+        engines.append(("yolo", yolo))
+    else:
+        print("(pass --weights to include the YOLO engine)")
+    
+    print(f"{'engine':<28} {'cpu ms/frame':>13} {'accuracy':>9} {'slots':>7}")
+    for name, classify in engines:
+        milliseconds, accuracy, total = run_engine(frames(), classify)
+        print(f"{name:<28} {milliseconds:>13.2f} {accuracy:>9.3f} {total:>7}")
+
+
+if __name__ == "__main__":
+    main()
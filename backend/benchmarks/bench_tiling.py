@@ -0,0 +1,155 @@
+"""
+Compare full-frame and tiled detection on high-resolution lot frames
+
+Reports cars found (recall against the synthetic ground truth), model
+inputs per frame and time per frame for:
+
+- full:       the whole frame shrunk to the model input size
+- tiles:      every tile of the overlapping grid
+- slot tiles: only tiles that intersect a slot
+
+The stand-in model finds dark blobs after resizing its input to
+`--input-size`, dropping blobs smaller than `--min-pixels` there, which is
+how distant cars vanish from a downscaled 4K frame. Pass `--weights` to use
+a YOLO model on `--image` instead (recall is then not reported).
+
+Usage:
+    python -m benchmarks.bench_tiling --width 3840 --height 2160 --rows 12
+    python -m benchmarks.bench_tiling --weights yolov8n.pt --image rooftop.jpg
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from app.ai.postprocess import Detections
+from app.ai.slot_layout import SlotLayout
+from app.ai.tiling import crop_tiles, layout_tiles, merge_tile_detections, tile_grid
+
+
+def synthetic_lot(width: int, height: int, rows: int, seed: int = 4):
+    """
+    Rows of slots in the lower part of the frame, shrinking with distance
+    
+    Returns:
+        (frame, layout, ground-truth car boxes)
+    """
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(150, 190, (height, width, 3), dtype=np.uint8)
+    polygons, cars = [], []
+    top = height * 0.35
+    for row in range(rows):
+        # Rows near the top are far away, so smaller
+        scale = 0.25 + 0.75 * row / max(rows - 1, 1)
+        slot_w, slot_h = 90 * scale, 60 * scale
+        y = top + (height - top) * row / rows
+        for x in np.arange(width * 0.05, width * 0.95 - slot_w, slot_w):
+            polygons.append([
+                [x / width, y / height], [(x + slot_w) / width, y / height],
+                [(x + slot_w) / width, (y + slot_h) / height], [x / width, (y + slot_h) / height]
+            ])
+            if rng.random() < 0.6:
+                car = [x + slot_w * 0.15, y + slot_h * 0.15, x + slot_w * 0.85, y + slot_h * 0.85]
+                cv2.rectangle(frame, (int(car[0]), int(car[1])), (int(car[2]), int(car[3])), (20, 20, 20), -1)
+                cars.append(car)
+    layout = SlotLayout(range(len(polygons)), [str(i) for i in range(len(polygons))], polygons)
+    return frame, layout, np.array(cars, dtype=np.float32)
+
+
+class Boxes(SimpleNamespace):
+    """ultralytics Boxes with numpy arrays in place of tensors"""
+    
+    def __len__(self):
+        return len(self.cls)
+
+
+def blob_model(input_size: int, min_pixels: int):
+    """Stand-in detector that sees the frame at the model's input size"""
+    def model(images, **kwargs):
+        results = []
+        for image in images:
+            scale = input_size / max(image.shape[:2])
+            small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            count, _, stats, _ = cv2.connectedComponentsWithStats((small[:, :, 0] < 80).astype(np.uint8))
+            stats = stats[1:][stats[1:, 4] >= min_pixels]
+            x, y, w, h = (stats[:, i].astype(np.float32) / scale for i in range(4))
+            boxes = Boxes(
+                xyxy=np.stack([x, y, x + w, y + h], axis=1).reshape(-1, 4),
+                conf=np.full(len(stats), 0.9, dtype=np.float32),
+                cls=np.full(len(stats), 2, dtype=np.float32)
+            )
+            results.append(SimpleNamespace(boxes=boxes, names={2: "car"}))
+        return results
+    return model
+
+
+def recall(found: Detections, cars: np.ndarray) -> float:
+    """Share of cars overlapped (IoU >= 0.5) by a detection"""
+    if len(cars) == 0 or len(found) == 0:
+        return 0.0
+    top_left = np.maximum(cars[:, None, :2], found.boxes[None, :, :2])
+    bottom_right = np.minimum(cars[:, None, 2:], found.boxes[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    areas = np.prod(cars[:, 2:] - cars[:, :2], axis=1)[:, None] + np.prod(
+        found.boxes[:, 2:] - found.boxes[:, :2], axis=1)[None, :]
+    iou = intersection / (areas - intersection)
+    return float((iou.max(axis=1) >= 0.5).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tiled inference")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--rows", type=int, default=12, help="Rows of slots in the synthetic lot")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument("--input-size", type=int, default=640)
+    parser.add_argument("--min-pixels", type=int, default=12, help="Smallest blob the stand-in sees")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--weights", help="YOLO weights instead of the stand-in model")
+    parser.add_argument("--image", help="Frame to run --weights on")
+    args = parser.parse_args()
+    
+    if args.weights:
+        from ultralytics import YOLO
+        yolo = YOLO(args.weights)
+        
+        def model(images, **kwargs):
+            return yolo(images, imgsz=args.input_size, verbose=False)
+        
+        frame = cv2.imread(args.image)
+        layout, cars = None, None
+    else:
+        model = blob_model(args.input_size, args.min_pixels)
+        frame, layout, cars = synthetic_lot(args.width, args.height, args.rows)
+    
+    def full():
+        return Detections.from_result(model([frame])[0]), 1
+    
+    def tiled(tiles):
+        def run():
+            results = model(crop_tiles(frame, tiles))
+            return merge_tile_detections([Detections.from_result(r) for r in results], tiles, frame.shape), len(tiles)
+        return run
+    
+    modes = [
+        ("full", full),
+        ("tiles", tiled(tile_grid(frame.shape, args.tile_size, args.overlap))),
+        ("slot tiles", tiled(layout_tiles(frame.shape, layout, args.tile_size, args.overlap))),
+    ]
+    print(f"frame {frame.shape[1]}x{frame.shape[0]}" + (f", {len(cars)} cars" if cars is not None else ""))
+    print(f"{'mode':<12} {'inputs':>7} {'found':>6} {'recall':>7} {'ms/frame':>9}")
+    for name, run in modes:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            found, inputs = run()
+        milliseconds = (time.perf_counter() - started) / args.repeat * 1000
+        found_recall = f"{recall(found, cars):.3f}" if cars is not None else "-"
+        print(f"{name:<12} {inputs:>7} {len(found):>6} {found_recall:>7} {milliseconds:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
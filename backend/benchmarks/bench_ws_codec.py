@@ -0,0 +1,84 @@
+"""
+Benchmark WebSocket encoding cost and bytes on the wire
+
+Compares JSON and the compact MessagePack schema for parking updates of
+different sizes, and shows what encoding once per broadcast saves compared
+to encoding once per connection.
+
+Usage:
+    python -m benchmarks.bench_ws_codec --slots 10 100 500 --connections 1000
+"""
+
+import argparse
+import random
+import timeit
+
+from app.websocket.codec import (
+    EncodedMessage, encode, PROTOCOL_JSON, PROTOCOL_MSGPACK, MSGPACK_AVAILABLE
+)
+from app.models.parking_slot import SlotStatus
+
+
+def build_update(slot_count: int) -> dict:
+    """Build a realistic parking update message"""
+    statuses = [status.value for status in SlotStatus]
+    return {
+        "type": "parking_update",
+        "parking_lot_id": 42,
+        "slots": {str(1000 + i): random.choice(statuses) for i in range(slot_count)},
+        "summary": {"total_slots": slot_count, "available_slots": slot_count // 2},
+        "timestamp": 123456.789,
+        "epoch": "3f2a9c1b7d4e",
+        "seq": 1234,
+    }
+
+
+def bench_encode(message: dict, protocol: str, number: int) -> float:
+    """Average encode time in microseconds"""
+    seconds = timeit.timeit(lambda: encode(message, protocol), number=number)
+    return seconds / number * 1e6
+
+
+def bench_fanout(message: dict, protocol: str, connections: int) -> tuple:
+    """Total encode time in ms for one broadcast, per-connection vs cached"""
+    per_connection = timeit.timeit(
+        lambda: [encode(message, protocol) for _ in range(connections)], number=1
+    )
+    
+    def cached():
+        encoded = EncodedMessage(message)
+        for _ in range(connections):
+            encoded.frame(protocol)
+    
+    once = timeit.timeit(cached, number=1)
+    return per_connection * 1000, once * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WebSocket message encodings")
+    parser.add_argument("--slots", type=int, nargs="+", default=[10, 100, 500],
+                        help="Slots per update")
+    parser.add_argument("--number", type=int, default=2000, help="Encodes per measurement")
+    parser.add_argument("--connections", type=int, default=1000, help="Fan-out size")
+    args = parser.parse_args()
+    
+    protocols = [PROTOCOL_JSON]
+    if MSGPACK_AVAILABLE:
+        protocols.append(PROTOCOL_MSGPACK)
+    else:
+        print("msgpack not installed, benchmarking JSON only (pip install msgpack)")
+    
+    print(f"{'slots':>6} {'protocol':<20} {'bytes':>8} {'encode us':>10} "
+          f"{'fan-out ms':>11} {'cached ms':>10}")
+    for slot_count in args.slots:
+        message = build_update(slot_count)
+        for protocol in protocols:
+            size = len(encode(message, protocol))
+            encode_us = bench_encode(message, protocol, args.number)
+            fanout_ms, cached_ms = bench_fanout(message, protocol, args.connections)
+            print(f"{slot_count:>6} {protocol:<20} {size:>8} {encode_us:>10.1f} "
+                  f"{fanout_ms:>11.1f} {cached_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
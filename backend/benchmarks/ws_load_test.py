@@ -0,0 +1,414 @@
+"""
+WebSocket load test: many subscribers, driven slot changes, delivery stats
+
+Starts a local backend on a throwaway SQLite database (or targets --url),
+opens N WebSocket clients subscribed across the seeded parking lots, then
+changes slot statuses through the REST API at a fixed rate and measures how
+the updates reach subscribers.
+
+Reports:
+    - connect rate and connect failures
+    - end-to-end delivery latency percentiles (REST call -> client receive)
+    - server memory per connection (RSS growth while connecting)
+    - dropped deliveries and sequence gaps
+
+Usage:
+    python -m benchmarks.ws_load_test --clients 10000 --lots 100 --rate 50 --duration 60
+
+Each slot is changed at most once per round over all slots, so the change
+pipeline never coalesces two changes of the same slot (which would look
+like a drop). A single Python client process tops out at a few thousand
+busy sockets; when it saturates, latency numbers reflect the harness as
+much as the server, so watch the harness CPU too.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+import websockets
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Optional imports - memory measurement
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+    psutil = None
+
+
+class Stats:
+    """Counters and samples shared by all simulated clients"""
+    
+    def __init__(self):
+        self.connect_times: List[float] = []
+        self.connect_failures = 0
+        self.latencies: List[float] = []
+        self.deliveries = 0
+        self.expected_deliveries = 0
+        self.seq_gaps = 0
+        self.disconnects = 0
+        # (slot_id, status) -> perf_counter() when the change was sent
+        self.sent_at: Dict[Tuple[str, str], float] = {}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process, if it can be measured"""
+    if PSUTIL_AVAILABLE:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def raise_fd_limit(needed: int):
+    """Raise the open-file soft limit so thousands of sockets fit"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = min(hard, max(soft, needed))
+    if target > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    if target < needed:
+        print(f"⚠️  Open file limit {target} is below the {needed} sockets needed (ulimit -n)")
+
+
+def free_port() -> int:
+    """Find a free local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_database(database_url: str, lots: int, slots_per_lot: int) -> Dict[int, List[int]]:
+    """Create parking lots and slots, returning {lot_id: [slot_ids]}"""
+    # Settings are read at import time, so point them at the scratch DB first
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["DEBUG"] = "false"
+    from app.core.database import Base, engine, SessionLocal
+    from app.models.parking_lot import ParkingLot
+    from app.models.parking_slot import ParkingSlot, SlotStatus
+    
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        layout = {}
+        for i in range(lots):
+            lot = ParkingLot(
+                name=f"Load Test Lot {i}",
+                address=f"{i} Benchmark Road",
+                city="Loadville",
+                state="LT",
+                zip_code="00000",
+                latitude=0.0,
+                longitude=0.0,
+                price_per_hour=1.0,
+                total_slots=slots_per_lot,
+                available_slots=slots_per_lot
+            )
+            db.add(lot)
+            db.flush()
+            slots = [
+                ParkingSlot(parking_lot_id=lot.id, slot_number=f"S{n}", status=SlotStatus.AVAILABLE)
+                for n in range(slots_per_lot)
+            ]
+            db.add_all(slots)
+            db.flush()
+            layout[lot.id] = [slot.id for slot in slots]
+        db.commit()
+        return layout
+    finally:
+        db.close()
+
+
+def start_server(port: int, database_url: str, clients: int) -> subprocess.Popen:
+    """Run the backend in a subprocess with limits sized for the test"""
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        DEBUG="false",
+        WS_MAX_CONNECTIONS=str(clients + 100),
+        WS_MAX_CONNECTIONS_PER_IP=str(clients + 100),
+        REDIS_URL="redis://127.0.0.1:1/0"  # Skip Redis; the test is about fan-out
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app",
+         "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--backlog", "4096"],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+
+
+async def wait_for_server(base_url: str, timeout: float = 30.0):
+    """Poll /health until the server answers"""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy")
+
+
+async def fetch_layout(base_url: str) -> Dict[int, List[int]]:
+    """Read lots and slots from a running server"""
+    layout = {}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/api/v1/parking-lots/", params={"limit": 100}) as response:
+            lots = await response.json()
+        for lot in lots:
+            async with session.get(
+                f"{base_url}/api/v1/parking-slots/", params={"parking_lot_id": lot["id"]}
+            ) as response:
+                slots = await response.json()
+            if slots:
+                layout[lot["id"]] = [slot["id"] for slot in slots]
+    return layout
+
+
+async def run_client(
+    ws_url: str,
+    lot_id: int,
+    stats: Stats,
+    ready: asyncio.Event,
+    stop: asyncio.Event,
+    connected: List[int],
+    subscribers: Dict[int, int]
+):
+    """One simulated subscriber"""
+    started = time.perf_counter()
+    try:
+        websocket = await websockets.connect(ws_url, open_timeout=30, max_queue=None)
+    except Exception:
+        stats.connect_failures += 1
+        connected[1] += 1
+        if connected[0] + connected[1] >= connected[2]:
+            ready.set()
+        return
+    
+    try:
+        await websocket.send(json.dumps({"type": "subscribe", "parking_lot_id": lot_id}))
+        last_seq = None
+        subscribed = False
+        while not stop.is_set():
+            try:
+                raw = await asyncio.wait_for(websocket.recv(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            message = json.loads(raw)
+            message_type = message.get("type")
+            
+            if message_type == "snapshot" and not subscribed:
+                subscribed = True
+                last_seq = message["seq"]
+                # Only clients that got this far are expected to receive updates
+                subscribers[lot_id] = subscribers.get(lot_id, 0) + 1
+                stats.connect_times.append(time.perf_counter() - started)
+                connected[0] += 1
+                if connected[0] + connected[1] >= connected[2]:
+                    ready.set()
+            elif message_type == "parking_update":
+                received = time.perf_counter()
+                if last_seq is not None and message["seq"] != last_seq + 1:
+                    stats.seq_gaps += message["seq"] - last_seq - 1
+                last_seq = message["seq"]
+                for slot_id, status in message.get("slots", {}).items():
+                    sent = stats.sent_at.get((slot_id, status))
+                    if sent is not None:
+                        stats.deliveries += 1
+                        stats.latencies.append(received - sent)
+            elif message_type == "ping":
+                await websocket.send(json.dumps({"type": "pong"}))
+    except websockets.ConnectionClosed:
+        stats.disconnects += 1
+    finally:
+        await websocket.close()
+
+
+async def drive_changes(
+    base_url: str,
+    layout: Dict[int, List[int]],
+    subscribers: Dict[int, int],
+    rate: float,
+    duration: float,
+    stats: Stats
+):
+    """Flip slot statuses through the REST API at a fixed rate"""
+    # Interleave lots so consecutive changes hit different lots and slots
+    targets = []
+    for position in range(max(len(slots) for slots in layout.values())):
+        for lot_id, slots in layout.items():
+            if position < len(slots):
+                targets.append((lot_id, slots[position]))
+    current: Dict[int, str] = {}
+    interval = 1.0 / rate
+    deadline = time.perf_counter() + duration
+    next_send = time.perf_counter()
+    index = 0
+    
+    async def put_status(session, slot_id: int, status: str):
+        async with session.put(
+            f"{base_url}/api/v1/parking-slots/{slot_id}/status",
+            params={"new_status": status}
+        ) as response:
+            await response.read()
+    
+    connector = aiohttp.TCPConnector(limit=64)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        pending = set()
+        while time.perf_counter() < deadline:
+            lot_id, slot_id = targets[index % len(targets)]
+            index += 1
+            status = "occupied" if current.get(slot_id) != "occupied" else "available"
+            current[slot_id] = status
+            stats.sent_at[(str(slot_id), status)] = time.perf_counter()
+            stats.expected_deliveries += subscribers.get(lot_id, 0)
+            pending.add(asyncio.create_task(put_status(session, slot_id, status)))
+            pending = {task for task in pending if not task.done()}
+            
+            next_send += interval
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def run(args):
+    """Run the load test and print a report"""
+    raise_fd_limit(args.clients + 256)
+    server = None
+    scratch_dir = None
+    
+    if args.url:
+        base_url = args.url.rstrip("/")
+        layout = await fetch_layout(base_url)
+        server_pid = args.server_pid
+    else:
+        scratch_dir = tempfile.TemporaryDirectory(prefix="ws-load-")
+        database_url = f"sqlite:///{scratch_dir.name}/loadtest.db"
+        layout = seed_database(database_url, args.lots, args.slots_per_lot)
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(port, database_url, args.clients)
+        server_pid = server.pid
+        await wait_for_server(base_url)
+    
+    if not layout:
+        raise RuntimeError("No parking lots with slots to test against")
+    
+    ws_url = base_url.replace("http", "ws", 1) + "/ws"
+    lot_ids = list(layout)
+    stats = Stats()
+    ready = asyncio.Event()
+    stop = asyncio.Event()
+    connected = [0, 0, args.clients]  # connected, failed, total
+    subscribers: Dict[int, int] = {}  # Subscribed clients per lot
+    clients = []
+    
+    try:
+        rss_before = rss_bytes(server_pid) if server_pid else None
+        print(f"🔌 Connecting {args.clients} clients across {len(lot_ids)} lots...")
+        connect_started = time.perf_counter()
+        for i in range(args.clients):
+            lot_id = lot_ids[i % len(lot_ids)]
+            clients.append(asyncio.create_task(
+                run_client(ws_url, lot_id, stats, ready, stop, connected, subscribers)
+            ))
+            if args.connect_rate:
+                await asyncio.sleep(1.0 / args.connect_rate)
+        await asyncio.wait_for(ready.wait(), timeout=args.connect_timeout)
+        connect_elapsed = time.perf_counter() - connect_started
+        rss_after = rss_bytes(server_pid) if server_pid else None
+        
+        print(f"🚗 Driving {args.rate} slot changes/s for {args.duration}s...")
+        await drive_changes(base_url, layout, subscribers, args.rate, args.duration, stats)
+        # Let in-flight updates arrive
+        await asyncio.sleep(args.drain)
+    finally:
+        stop.set()
+        await asyncio.gather(*clients, return_exceptions=True)
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        if scratch_dir:
+            scratch_dir.cleanup()
+    
+    print("\n📊 Results")
+    print(f"  Clients connected:     {connected[0]}/{args.clients} "
+          f"({stats.connect_failures} failed, {stats.disconnects} dropped by server)")
+    print(f"  Connect rate:          {connected[0] / connect_elapsed:.0f} conn/s "
+          f"(p50 {percentile(stats.connect_times, 50) * 1000:.0f} ms, "
+          f"p99 {percentile(stats.connect_times, 99) * 1000:.0f} ms)")
+    if rss_before and rss_after and connected[0]:
+        per_connection = (rss_after - rss_before) / connected[0]
+        print(f"  Server memory:         {rss_after / 2**20:.0f} MiB "
+              f"(~{per_connection / 1024:.1f} KiB per connection)")
+    else:
+        print("  Server memory:         n/a (pass --server-pid with --url)")
+    latencies_ms = [latency * 1000 for latency in stats.latencies]
+    print(f"  Delivery latency (ms): p50 {percentile(latencies_ms, 50):.1f}  "
+          f"p90 {percentile(latencies_ms, 90):.1f}  p99 {percentile(latencies_ms, 99):.1f}  "
+          f"max {max(latencies_ms) if latencies_ms else float('nan'):.1f}")
+    if latencies_ms:
+        print(f"                         mean {statistics.mean(latencies_ms):.1f}")
+    dropped = max(0, stats.expected_deliveries - stats.deliveries)
+    print(f"  Deliveries:            {stats.deliveries}/{stats.expected_deliveries} "
+          f"({dropped} dropped, {stats.seq_gaps} sequence gaps)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the WebSocket fan-out")
+    parser.add_argument("--clients", type=int, default=1000, help="Simulated WebSocket clients")
+    parser.add_argument("--lots", type=int, default=20, help="Parking lots to seed")
+    parser.add_argument("--slots-per-lot", type=int, default=50, help="Slots per seeded lot")
+    parser.add_argument("--rate", type=float, default=20.0, help="Slot changes per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to drive changes")
+    parser.add_argument("--connect-rate", type=float, default=0,
+                        help="Max new connections per second (0 = as fast as possible)")
+    parser.add_argument("--connect-timeout", type=float, default=120.0,
+                        help="Seconds to wait for all clients to subscribe")
+    parser.add_argument("--drain", type=float, default=2.0,
+                        help="Seconds to wait for in-flight updates after driving")
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="PID of the --url server for memory stats")
+    args = parser.parse_args()
+    
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,19 @@ import uvicorn
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, Base, SessionLocal, upgrade_schema
+from app.core.security import decode_access_token
+from app.core.loop_monitor import loop_monitor
 from app.api.v1.router import api_router
 from app.websocket.manager import websocket_manager
+from app.events.pipeline import event_pipeline
+from app.events import hooks  # Registers the session change hooks
 from app.ai.detector import ParkingSlotDetector
 from app.ai.camera_manager import CameraManager
-from app.api.v1.endpoints.ai import init_ai_components
+from app.ai.sharding import DatabaseLeaseStore, LocalLeaseStore, MonitoringCoordinator
+from app.api.v1.endpoints.ai import init_ai_components, set_monitoring_coordinator
 from fastapi import WebSocket
+from typing import Optional
 import redis
 
 
@@ -27,13 +33,20 @@ async def lifespan(app: FastAPI):
     try:
         # Try to create tables, but don't fail if DB is not available
         Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
         print("✓ Database connection successful")
     except Exception as e:
         print(f"⚠ Database connection failed: {e}")
         print("⚠ Application will continue, but database features may not work")
         print("⚠ Please check your DATABASE_URL in .env file")
     
+    # Track event loop responsiveness (see /api/v1/ai/metrics)
+    loop_monitor.interval = settings.LOOP_MONITOR_INTERVAL
+    await loop_monitor.start()
+    
     # Initialize AI components
+    detector = None
+    camera_manager = None
     try:
         print("🤖 Initializing AI components...")
         detector = ParkingSlotDetector()
@@ -64,9 +77,49 @@ async def lifespan(app: FastAPI):
         print(f"⚠ AI initialization failed: {e}")
         print("⚠ AI features may not work")
     
+    # Pick up the lots that were being monitored before the restart
+    coordinator = None
+    if camera_manager and settings.MONITORING_SHARDING:
+        # This worker's share of them, by lease
+        coordinator = MonitoringCoordinator(
+            camera_manager,
+            detector,
+            store=LocalLeaseStore() if settings.MONITORING_LEASE_STORE == "local" else DatabaseLeaseStore(),
+            worker_id=settings.MONITORING_WORKER_ID or None,
+            heartbeat=settings.MONITORING_HEARTBEAT,
+            lease_ttl=settings.MONITORING_LEASE_TTL,
+            vnodes=settings.MONITORING_VNODES,
+            warmup=settings.CAMERA_RESUME_WARMUP
+        )
+        set_monitoring_coordinator(coordinator)
+        await coordinator.start()
+        print(f"✓ Monitoring as worker {coordinator.worker_id}")
+    elif camera_manager and settings.CAMERA_RESUME_ON_STARTUP:
+        db = SessionLocal()
+        try:
+            resumed = await camera_manager.resume_monitoring(db, detector, settings.CAMERA_RESUME_WARMUP)
+            if resumed:
+                print(f"✓ Resumed monitoring of {resumed} parking lots")
+        except Exception as e:
+            print(f"⚠ Resuming monitoring failed: {e}")
+        finally:
+            db.close()
+    
+    # Publish committed slot/lot changes to WebSocket subscribers
+    await event_pipeline.start(websocket_manager)
+    await websocket_manager.start()
+    
     yield
     # Shutdown
-    pass
+    await websocket_manager.stop()
+    await event_pipeline.stop()
+    await loop_monitor.stop()
+    if coordinator:
+        await coordinator.stop()
+    if camera_manager:
+        await camera_manager.close()
+    if detector:
+        await detector.close()
 
 
 app = FastAPI(
@@ -92,8 +145,16 @@ app.include_router(api_router, prefix="/api/v1")
 
 # WebSocket endpoint
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket_manager.handle_websocket(websocket)
+async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
+    # Anonymous clients may watch availability; a token ties the socket to a user
+    user_id = None
+    if token:
+        payload = decode_access_token(token)
+        if payload is None:
+            await websocket.close(code=1008)
+            return
+        user_id = payload.get("user_id")
+    await websocket_manager.handle_websocket(websocket, user_id=user_id)
 
 
 @app.get("/")
@@ -3,7 +3,7 @@ Seed script to create sample data for testing
 Run this to populate the database with sample data
 """
 
-from app.core.database import SessionLocal, Base, engine
+from app.core.database import SessionLocal, Base, engine, upgrade_schema
 from app.models.user import User, UserRole
 from app.models.parking_lot import ParkingLot
 from app.models.parking_slot import ParkingSlot, SlotStatus
@@ -12,6 +12,7 @@ from datetime import datetime, timedelta
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 db = SessionLocal()
 
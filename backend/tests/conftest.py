@@ -10,6 +10,7 @@ from sqlalchemy.pool import StaticPool
 
 from app.core.database import Base, get_db
 from app.core.config import settings
+from app.websocket.manager import websocket_manager
 from main import app
 
 # Create test database (in-memory SQLite)
@@ -21,6 +22,9 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Lot topics seed their snapshots from the test database
+websocket_manager.session_factory = TestingSessionLocal
+
 
 @pytest.fixture(scope="function")
 def db():
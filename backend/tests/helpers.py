@@ -0,0 +1,49 @@
+"""
+Stand-ins and helpers shared by the AI tests
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def write_video(path, frames: int, fps: float) -> str:
+    """Stand-in camera stream: a video file of numbered gray frames"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (320, 240))
+    for index in range(frames):
+        writer.write(np.full((240, 320, 3), index * 40, dtype=np.uint8))
+    writer.release()
+    return f"file://{path}"
+
+
+class FakeBoxes:
+    """ultralytics Boxes with numpy arrays in place of tensors"""
+    
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = np.array(xyxy, dtype=np.float32)
+        self.conf = np.array(conf, dtype=np.float32)
+        self.cls = np.array(cls, dtype=np.float32)
+    
+    def __len__(self):
+        return len(self.cls)
+
+
+def dark_blob_model(images, **kwargs):
+    """Stand-in detector: every dark blob is a car"""
+    results = []
+    for image in images:
+        count, _, stats, _ = cv2.connectedComponentsWithStats((image[:, :, 0] < 50).astype(np.uint8))
+        x, y, w, h = (stats[1:, i] for i in range(4))
+        boxes = FakeBoxes(np.stack([x, y, x + w, y + h], axis=1).reshape(-1, 4), [0.9] * (count - 1), [2] * (count - 1))
+        results.append(SimpleNamespace(boxes=boxes, names={2: "car"}))
+    return results
@@ -0,0 +1,45 @@
+"""
+Tests for adaptive monitoring intervals
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from app.ai.adaptive_interval import BookingCalendar, IntervalPolicy, parse_profile
+from app.models.booking import Booking, BookingStatus
+
+
+def test_adaptive_interval(db, test_user, test_parking_lot):
+    """Test that intervals follow the hour, slot activity and upcoming bookings"""
+    now = time.time()
+    booking_start = datetime.utcfromtimestamp(now) + timedelta(minutes=20)
+    db.add(Booking(
+        user_id=test_user.id,
+        parking_lot_id=test_parking_lot.id,
+        start_time=booking_start,
+        end_time=booking_start + timedelta(hours=2),
+        price_per_hour=test_parking_lot.price_per_hour,
+        total_price=test_parking_lot.price_per_hour * 2,
+        status=BookingStatus.CONFIRMED
+    ))
+    db.commit()
+    
+    profile = parse_profile("0-6:4,16-19:0.5")
+    assert profile[3] == 4 and profile[17] == 0.5 and profile[12] == 1
+    calendar = BookingCalendar(window=300)
+    policy = IntervalPolicy(calendar, profile, half_life=600, activity_gain=2, booking_interval=10)
+    policy.add(99, base=30, min_interval=5, max_interval=100)
+    assert policy.interval(99, now, hour=3) == 100
+    assert policy.interval(99, now, hour=17) == 15
+    
+    # Four transitions make ticks three times as frequent; two half-lives later one still counts
+    policy.record(99, 4, now)
+    assert policy.interval(99, now, hour=12) == 10
+    assert abs(policy.interval(99, now + 1200, hour=12) - 30 / 3 ** 0.5) < 1e-6
+    
+    calendar.load(db, [test_parking_lot.id], now)
+    policy.add(test_parking_lot.id, base=1000, min_interval=5, max_interval=2000)
+    # Wakes up as the booking's window opens, 5 minutes before it starts
+    assert abs(policy.interval(test_parking_lot.id, now, hour=12) - 900) < 1
+    assert policy.interval(test_parking_lot.id, now + 1000, hour=12) == 10
+    assert policy.stats()["lots"] == 2
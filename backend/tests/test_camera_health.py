@@ -0,0 +1,31 @@
+"""
+Tests for per-camera circuit breakers
+"""
+
+from app.ai.camera_health import CLOSED, HALF_OPEN, OPEN, CameraHealthTracker
+
+
+def test_circuit_breaker_backs_off_failing_camera():
+    """Test that a failing camera is taken out of rotation with a doubling backoff"""
+    health = CameraHealthTracker(failure_threshold=3, backoff_min=60, backoff_max=200, alpha=0.5)
+    assert health.record_failure(1, now=0) is None
+    assert health.record_failure(1, now=10) is None
+    assert health.record_failure(1, now=20) == 60
+    assert health.state(1) == OPEN and not health.allow(1, now=50)
+    assert health.retry_in(1, now=50) == 30
+    
+    # The probe after the backoff fails: open again for twice as long, capped
+    assert health.allow(1, now=80) and health.state(1) == HALF_OPEN
+    assert health.record_failure(1, now=81) == 120
+    assert health.allow(1, now=201)
+    assert health.record_failure(1, now=202) == 200
+    
+    assert health.allow(1, now=402)
+    assert health.record_success(1, latency=0.2, now=403)
+    assert health.state(1) == CLOSED and health.allow(1, now=404)
+    assert not health.record_success(1, latency=0.4, now=405)
+    
+    camera = health.snapshot(now=405)[0]
+    assert camera["consecutive_failures"] == 0 and camera["failures"] == 5
+    assert abs(camera["latency_ms"] - 300) < 1e-6 and 0 < camera["success_rate"] < 1
+    assert health.stats()["trips"] == 1 and health.stats()["recoveries"] == 1
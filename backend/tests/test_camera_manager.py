@@ -0,0 +1,71 @@
+"""
+Tests for camera feed fetching
+"""
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.ai.camera_manager import NOT_MODIFIED, CameraManager
+from tests.helpers import wait_for, write_video
+
+
+def snapshot_camera(snapshot: dict):
+    """Camera serving `snapshot["body"]` with an ETag, honouring If-None-Match"""
+    requests = []
+    
+    async def handler(request):
+        requests.append(request.transport.get_extra_info("peername"))
+        etag = f'"{snapshot["version"]}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(body=snapshot["body"], headers={"ETag": etag}, content_type="image/jpeg")
+    
+    app = web.Application()
+    app.router.add_get("/snapshot.jpg", handler)
+    return app, requests
+
+
+async def test_conditional_fetch_over_pooled_session():
+    """Test that unchanged snapshots return 304 over one kept-alive connection"""
+    snapshot = {"version": 1, "body": b"frame one"}
+    app, requests = snapshot_camera(snapshot)
+    manager = CameraManager()
+    async with TestServer(app) as server:
+        url = str(server.make_url("/snapshot.jpg"))
+        try:
+            assert await manager.fetch_bytes(url, conditional=True) == b"frame one"
+            assert await manager.fetch_bytes(url, conditional=True) is NOT_MODIFIED
+            # Plain fetches always get the image
+            assert await manager.fetch_bytes(url) == b"frame one"
+            
+            snapshot.update(version=2, body=b"frame two")
+            assert await manager.fetch_bytes(url, conditional=True) == b"frame two"
+            assert await manager.fetch_bytes(url, conditional=True) is NOT_MODIFIED
+            session = manager.session
+        finally:
+            await manager.close()
+    
+    assert len(requests) == 5
+    assert len(set(requests)) == 1
+    assert session.closed
+    assert manager.stats() == {
+        "requests": 5, "not_modified": 2, "errors": 0, "bytes": 27, "monitored": 0, "streams": {}
+    }
+
+
+async def test_monitoring_reuses_unchanged_stream_frame(tmp_path):
+    """Test that monitoring takes frames from a shared reader and skips repeats"""
+    url = write_video(tmp_path / "lot.avi", frames=2, fps=1)
+    manager = CameraManager()
+    try:
+        reader = manager.stream_reader(url)
+        await wait_for(lambda: reader.frame_id > 0)
+        frame, size = await manager._next_frame(1, url, False, lambda size: 1)
+        assert frame.shape == (240, 320, 3) and size is None
+        assert await manager._next_frame(1, url, True, lambda size: 1) is NOT_MODIFIED
+        assert manager.stream_reader(url) is reader
+        assert (await manager.fetch_image(url)).shape == (240, 320, 3)
+    finally:
+        await manager.close()
+    
+    assert manager.stream_readers == {} and reader.thread is None
@@ -0,0 +1,101 @@
+"""
+Tests for skipping inference on unchanged frames
+"""
+
+import numpy as np
+
+from app.ai import detector as detector_module
+from app.ai.camera_manager import CameraManager
+from app.ai.change_gate import FrameChangeGate
+from app.ai.detector import ParkingSlotDetector
+from app.ai.inference import InferenceExecutor
+from app.ai.slot_layout import SlotLayout
+from app.core.config import settings
+
+
+def test_change_gate():
+    """Test that the gate skips static frames and finds the slots that changed"""
+    layout = SlotLayout([1, 2], ["A1", "A2"], [
+        [[0.0, 0.0], [0.5, 0.0], [0.5, 1.0], [0.0, 1.0]],
+        [[0.5, 0.0], [1.0, 0.0], [1.0, 1.0], [0.5, 1.0]],
+    ])
+    rng = np.random.default_rng(0)
+    frame = np.full((200, 400, 3), 120, dtype=np.uint8)
+    # Two slots per frame, so one arrival moves the frame mean a lot
+    gate = FrameChangeGate(width=80, global_threshold=20)
+    
+    decision = gate.check("cam", frame, layout)
+    assert decision.full
+    gate.commit("cam", decision.thumbnail, {"slots": []}, layout)
+    
+    noisy = np.clip(frame + rng.integers(-3, 4, frame.shape), 0, 255).astype(np.uint8)
+    assert gate.check("cam", noisy, layout).skip
+    
+    arrival = frame.copy()
+    arrival[40:160, 240:360] = 20
+    decision = gate.check("cam", arrival, layout)
+    assert not decision.full
+    assert decision.changed_slots.tolist() == [False, True]
+    gate.commit("cam", decision.thumbnail, {"slots": []}, layout, decision.changed_slots)
+    assert gate.check("cam", arrival, layout).skip
+    
+    # Lighting changes and new layouts need the whole frame analysed again
+    assert gate.check("cam", (arrival * 0.6).astype(np.uint8), layout).full
+    assert gate.check("cam", arrival, layout.subset(np.array([True, False]))).full
+    assert gate.stats()["skipped"] == 2
+
+
+async def test_detect_if_changed(monkeypatch, tmp_path):
+    """Test that unchanged frames reuse results and changed slots are re-classified alone"""
+    model_path = tmp_path / "slot_classifier.onnx"
+    model_path.touch()
+    monkeypatch.setattr(settings, "SLOT_CLASSIFIER_PATH", model_path)
+    monkeypatch.setattr(settings, "CHANGE_GATE_GLOBAL_THRESHOLD", 50.0)
+    classified = []
+    
+    def fake_predict(path, size, image, layout):
+        classified.append(list(layout.slot_numbers))
+        return (image[0, 0, 0] < 100) * np.ones(len(layout), dtype=np.float32)
+    
+    monkeypatch.setattr(detector_module, "predict_slots", fake_predict)
+    layout = SlotLayout([7, 8], ["B1", "B2"], [
+        [[0.0, 0.0], [0.5, 0.0], [0.5, 1.0], [0.0, 1.0]],
+        [[0.5, 0.0], [1.0, 0.0], [1.0, 1.0], [0.5, 1.0]],
+    ])
+    frame = np.full((100, 200, 3), 150, dtype=np.uint8)
+    detector = ParkingSlotDetector(InferenceExecutor(mode="thread"))
+    try:
+        first = await detector.detect_if_changed(frame, 1, layout, engine="classifier")
+        again = await detector.detect_if_changed(frame.copy(), 1, layout, engine="classifier")
+        arrival = frame.copy()
+        arrival[:80, :80] = 30
+        changed = await detector.detect_if_changed(arrival, 1, layout, engine="classifier")
+    finally:
+        await detector.close()
+    
+    assert first["occupied_slots"] == 0
+    assert again["reused"] and again["slots"] == first["slots"]
+    assert classified == [["B1", "B2"], ["B1"]]
+    assert [slot["status"] for slot in changed["slots"]] == ["occupied", "available"]
+    assert changed["occupied_slots"] == 1
+
+
+async def test_stopped_lot_is_forgotten(monkeypatch, tmp_path):
+    """Test that stopping monitoring drops the lot's reference frame and cached results"""
+    model_path = tmp_path / "slot_classifier.onnx"
+    model_path.touch()
+    monkeypatch.setattr(settings, "SLOT_CLASSIFIER_PATH", model_path)
+    monkeypatch.setattr(detector_module, "predict_slots", lambda path, size, image, layout: np.zeros(len(layout)))
+    layout = SlotLayout([7], ["B1"], [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]]])
+    detector = ParkingSlotDetector(InferenceExecutor(mode="thread"))
+    manager = CameraManager()
+    try:
+        await manager.start_monitoring(1, "http://127.0.0.1:9/lot.jpg", detector, delay=60)
+        await detector.detect_if_changed(np.full((100, 200, 3), 150, dtype=np.uint8), 1, layout, engine="classifier")
+        assert detector.change_gate.cached((1, "main")) is not None
+        
+        await manager.stop_monitoring(1)
+        assert (1, "main") not in detector.change_gate.states
+    finally:
+        await manager.close()
+        await detector.close()
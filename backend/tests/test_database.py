@@ -0,0 +1,42 @@
+"""
+Tests for upgrading existing database schemas
+"""
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.ai.sharding import DatabaseLeaseStore
+from app.core.database import ADDED_COLUMNS, upgrade_schema
+
+
+def test_upgrade_schema_adds_missing_columns(tmp_path):
+    """Test that columns and indexes added since a table was created are added once"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        # parking_lots as it was before detection engines existed
+        connection.execute(text("CREATE TABLE parking_lots (id INTEGER PRIMARY KEY, name VARCHAR)"))
+        connection.execute(text("INSERT INTO parking_lots (id, name) VALUES (1, 'Old Lot')"))
+        # monitored_cameras as it was before monitoring was sharded
+        connection.execute(text(
+            "CREATE TABLE monitored_cameras (id INTEGER PRIMARY KEY, parking_lot_id INTEGER, "
+            "camera_url VARCHAR, interval FLOAT, priority INTEGER, min_interval FLOAT, max_interval FLOAT, "
+            "detection_engine VARCHAR, is_active BOOLEAN, created_at DATETIME, updated_at DATETIME)"
+        ))
+        connection.execute(text("INSERT INTO monitored_cameras (id, parking_lot_id, is_active) VALUES (1, 1, 1)"))
+    
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+    
+    for table in ("parking_lots", "monitored_cameras"):
+        columns = {column["name"] for column in inspect(engine).get_columns(table)}
+        assert {column for added_table, column, _ in ADDED_COLUMNS if added_table == table} <= columns
+    indexes = {index["name"] for index in inspect(engine).get_indexes("monitored_cameras")}
+    assert "ix_monitored_cameras_lease_owner" in indexes
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT detection_engine FROM parking_lots")).scalar() == "yolo"
+    
+    # Leases work on the upgraded table
+    store = DatabaseLeaseStore(sessionmaker(bind=engine))
+    assert store.claim("a", [1], now=0, ttl=30) == {1}
+    store.release("a", [1])
+    assert store.claim("b", [1], now=1, ttl=30) == {1}
@@ -0,0 +1,92 @@
+"""
+Tests for the slot change event pipeline
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+
+def _create_slot(db, parking_lot_id, slot_number="A1"):
+    from app.models.parking_slot import ParkingSlot, SlotStatus
+    
+    slot = ParkingSlot(
+        parking_lot_id=parking_lot_id,
+        slot_number=slot_number,
+        status=SlotStatus.AVAILABLE
+    )
+    db.add(slot)
+    db.commit()
+    db.refresh(slot)
+    return slot
+
+
+@pytest.fixture
+def slot(db, test_parking_lot):
+    """A slot committed before the client starts the event pipeline, so its creation is not published"""
+    return _create_slot(db, test_parking_lot.id)
+
+
+def _subscribe(websocket, parking_lot_id):
+    websocket.send_json({"type": "subscribe", "parking_lot_id": parking_lot_id})
+    assert websocket.receive_json()["type"] == "subscribed"
+    assert websocket.receive_json()["type"] == "snapshot"
+
+
+def test_slot_status_change_is_pushed(slot, client, test_parking_lot):
+    """Test that updating a slot status pushes an update to subscribers"""
+    with client.websocket_connect("/ws") as websocket:
+        _subscribe(websocket, test_parking_lot.id)
+        
+        response = client.put(
+            f"/api/v1/parking-slots/{slot.id}/status",
+            params={"new_status": "occupied"}
+        )
+        assert response.status_code == 200
+        
+        update = websocket.receive_json()
+        assert update["type"] == "parking_update"
+        assert update["parking_lot_id"] == test_parking_lot.id
+        assert update["slots"] == {str(slot.id): "occupied"}
+
+
+def test_booking_and_lot_updates_are_pushed(slot, client, test_parking_lot, auth_headers):
+    """Test that bookings and AI lot counters publish availability changes"""
+    start_time = datetime.utcnow() + timedelta(hours=1)
+    
+    with client.websocket_connect("/ws") as websocket:
+        _subscribe(websocket, test_parking_lot.id)
+        
+        response = client.post(
+            "/api/v1/bookings/",
+            json={
+                "parking_lot_id": test_parking_lot.id,
+                "slot_id": slot.id,
+                "start_time": start_time.isoformat(),
+                "end_time": (start_time + timedelta(hours=2)).isoformat()
+            },
+            headers=auth_headers
+        )
+        assert response.status_code == 201
+        assert websocket.receive_json()["slots"] == {str(slot.id): "reserved"}
+        
+        response = client.post(
+            f"/api/v1/parking-lots/{test_parking_lot.id}/update-slots",
+            json={"total_slots": 12, "available_slots": 7}
+        )
+        assert response.status_code == 200
+        update = websocket.receive_json()
+        assert update["summary"] == {"total_slots": 12, "available_slots": 7}
+
+
+def test_rolled_back_changes_are_not_published(db, test_parking_lot):
+    """Test that only committed changes reach the pipeline"""
+    from app.events.hooks import PENDING_EVENTS_KEY
+    from app.models.parking_slot import SlotStatus
+    
+    slot = _create_slot(db, test_parking_lot.id)
+    slot.status = SlotStatus.OCCUPIED
+    db.flush()
+    assert db.info[PENDING_EVENTS_KEY]
+    
+    db.rollback()
+    assert PENDING_EVENTS_KEY not in db.info
@@ -0,0 +1,232 @@
+"""
+Tests for off-loop model inference
+"""
+
+import asyncio
+import importlib.util
+import os
+import time
+from concurrent.futures import BrokenExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ai.batching import MicroBatcher
+from app.ai import runtimes
+from app.ai.inference import InferenceExecutor, InferenceBusyError, InferenceTimeoutError
+from app.core.loop_monitor import LoopLagMonitor
+
+
+def slow_model(seconds: float) -> str:
+    """Stand-in for a CPU-bound model call"""
+    time.sleep(seconds)
+    return "done"
+
+
+def dead_worker():
+    """Stand-in for a worker process that crashes"""
+    os._exit(1)
+
+
+async def test_inference_runs_off_the_event_loop():
+    """Test that a slow model call does not stall other tasks"""
+    executor = InferenceExecutor(mode="thread", workers=1, max_queue=2, timeout=5)
+    monitor = LoopLagMonitor(interval=0.01)
+    await monitor.start()
+    try:
+        assert await executor.run(slow_model, 0.2) == "done"
+    finally:
+        await monitor.stop()
+        executor.shutdown()
+    
+    assert monitor.stats()["samples"] > 5
+    assert monitor.stats()["max_ms"] < 100
+    assert executor.stats()["completed"] == 1
+
+
+async def test_inference_queue_is_bounded():
+    """Test that jobs beyond workers + max_queue are rejected"""
+    executor = InferenceExecutor(mode="thread", workers=1, max_queue=1, timeout=5)
+    try:
+        jobs = [asyncio.create_task(executor.run(slow_model, 0.1)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(InferenceBusyError):
+            await executor.run(slow_model, 0.1)
+        assert await asyncio.gather(*jobs) == ["done", "done"]
+    finally:
+        executor.shutdown()
+    
+    assert executor.stats()["rejected"] == 1
+    assert executor.stats()["pending"] == 0
+
+
+async def test_inference_timeout_keeps_slot_until_done():
+    """Test that a timed-out job still counts against the queue until it finishes"""
+    executor = InferenceExecutor(mode="thread", workers=1, max_queue=0, timeout=0.05)
+    try:
+        with pytest.raises(InferenceTimeoutError):
+            await executor.run(slow_model, 0.2)
+        assert executor.pending == 1
+        with pytest.raises(InferenceBusyError):
+            await executor.run(slow_model, 0.01)
+        
+        await asyncio.sleep(0.3)
+        assert executor.pending == 0
+    finally:
+        executor.shutdown()
+    
+    assert executor.stats()["timeouts"] == 1
+
+
+async def test_process_pool_is_replaced_after_a_worker_dies():
+    """Test that a crashed worker process fails its job but not the ones after it"""
+    executor = InferenceExecutor(mode="process", workers=1, timeout=30)
+    try:
+        with pytest.raises(BrokenExecutor):
+            await executor.run(dead_worker)
+        assert await executor.run(slow_model, 0) == "done"
+    finally:
+        executor.shutdown()
+    
+    assert executor.stats()["pending"] == 0
+
+
+async def test_micro_batcher_groups_concurrent_frames():
+    """Test that concurrent frames share one batch and get their own results"""
+    batches = []
+    
+    async def run_batch(frames):
+        batches.append(list(frames))
+        return [frame * 10 for frame in frames]
+    
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=50)
+    try:
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+    finally:
+        await batcher.stop()
+    
+    assert results == [0, 10, 20, 30, 40, 50]
+    assert [len(batch) for batch in batches] == [4, 2]
+    assert batcher.stats()["avg_batch_size"] == 3
+
+
+async def test_micro_batcher_fails_every_caller_in_a_failed_batch():
+    """Test that a batch error reaches each waiting caller"""
+    async def run_batch(frames):
+        raise InferenceTimeoutError("too slow")
+    
+    batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_ms=50)
+    try:
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+    finally:
+        await batcher.stop()
+    
+    assert all(isinstance(result, InferenceTimeoutError) for result in results)
+
+
+async def test_thread_workers_run_their_own_model(monkeypatch):
+    """Test that each pool thread predicts with its own model instance"""
+    import threading
+    from types import SimpleNamespace
+    from app.ai import detector as detector_module
+    from app.ai.detector import ParkingSlotDetector
+    
+    barrier = threading.Barrier(2)
+    used = []
+    
+    class FakeYOLO:
+        def __init__(self, weights, task=None):
+            pass
+        
+        def __call__(self, images, **kwargs):
+            # Both workers predict at the same time
+            barrier.wait(timeout=5)
+            used.append(self)
+            return [SimpleNamespace(boxes=None, names={}) for _ in images]
+    
+    monkeypatch.setattr(detector_module, "YOLO", FakeYOLO)
+    detector = ParkingSlotDetector(InferenceExecutor(mode="thread", workers=2))
+    detector.model, detector.weights = FakeYOLO("loaded.pt"), "loaded.pt"
+    try:
+        frames = [np.zeros((8, 8, 3), dtype=np.uint8)]
+        results = await asyncio.gather(*(detector.executor.run(detector._predict, frames) for _ in range(2)))
+    finally:
+        await detector.close()
+    
+    assert len(set(map(id, used))) == 2 and detector.model in used
+    assert all(len(vehicles) == 0 for [vehicles] in results)
+
+
+def test_select_runtime(monkeypatch, tmp_path):
+    """Test that the fastest runtime with an artifact and an installed package is chosen"""
+    weights = tmp_path / "detector.pt"
+    weights.touch()
+    (tmp_path / "detector.onnx").touch()
+    (tmp_path / "detector_openvino_model").mkdir()
+    monkeypatch.setattr(runtimes, "runtime_installed", lambda runtime: runtime != "openvino")
+    
+    assert runtimes.select_runtime(weights) == ("onnx", tmp_path / "detector.onnx")
+    assert runtimes.select_runtime(weights, "pytorch") == ("pytorch", weights)
+    # No TorchScript export, so the preference falls back to the fastest available
+    assert runtimes.select_runtime(weights, "torchscript")[0] == "onnx"
+    
+    # A published INT8 model beats the FP32 exports
+    (tmp_path / "detector.int8.onnx").touch()
+    assert runtimes.select_runtime(weights) == ("onnx-int8", tmp_path / "detector.int8.onnx")
+
+
+def test_fixed_batch_padding():
+    """Test that frames are padded to the exported batch size and padding is dropped"""
+    calls = []
+    
+    def model(images, **kwargs):
+        calls.append(len(images))
+        return [int(image[0, 0]) for image in images]
+    
+    frames = [np.full((2, 2), value, dtype=np.uint8) for value in range(5)]
+    assert runtimes.predict_fixed_batch(model, frames, 2) == [0, 1, 2, 3, 4]
+    assert calls == [2, 2, 2]
+    assert runtimes.predict_fixed_batch(model, frames, None) == [0, 1, 2, 3, 4]
+
+
+def test_detections_match():
+    """Test the tolerance used to compare runtimes"""
+    reference = (np.array([[0, 0, 100, 100], [200, 200, 260, 280]]), np.array([0.9, 0.6]), np.array([2, 7]))
+    close = (np.array([[201, 199, 260, 281], [1, 0, 100, 101]]), np.array([0.62, 0.88]), np.array([7, 2]))
+    shifted = (np.array([[30, 0, 130, 100], [200, 200, 260, 280]]), np.array([0.9, 0.6]), np.array([2, 7]))
+    
+    assert runtimes.detections_match(reference, close)
+    assert not runtimes.detections_match(reference, shifted)
+    assert not runtimes.detections_match(reference, (reference[0][:1], reference[1][:1], reference[2][:1]))
+
+
+WEIGHTS = Path("models/parking_slot_detector.pt")
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("ultralytics") is None or not WEIGHTS.exists(),
+    reason="needs ultralytics and trained weights"
+)
+@pytest.mark.parametrize("runtime", ["onnx", "openvino", "torchscript"])
+def test_runtime_parity(runtime):
+    """Test that an exported runtime finds the same detections as PyTorch"""
+    if runtime not in runtimes.available_runtimes(WEIGHTS):
+        pytest.skip(f"{runtime} export or package not available")
+    from ultralytics import YOLO
+    
+    manifest = runtimes.read_manifest(WEIGHTS)
+    options = {"conf": 0.5, "verbose": False, "imgsz": manifest.get("imgsz", 640)}
+    frames = [np.random.default_rng(seed).integers(0, 255, (640, 640, 3), dtype=np.uint8) for seed in range(3)]
+    reference = YOLO(str(WEIGHTS))(frames, **options)
+    exported = runtimes.predict_fixed_batch(
+        YOLO(str(runtimes.artifact_path(WEIGHTS, runtime)), task="detect"), frames, manifest.get("batch"), **options
+    )
+    
+    for ref, out in zip(reference, exported):
+        assert runtimes.detections_match(
+            (ref.boxes.xyxy.numpy(), ref.boxes.conf.numpy(), ref.boxes.cls.numpy()),
+            (out.boxes.xyxy.numpy(), out.boxes.conf.numpy(), out.boxes.cls.numpy())
+        )
@@ -0,0 +1,47 @@
+"""
+Tests for durable monitoring assignments
+"""
+
+import asyncio
+
+from app.ai.camera_manager import CameraManager
+from app.ai.monitoring_registry import active_assignments, deactivate_assignment, save_assignment
+from app.models.parking_lot import ParkingLot
+
+
+async def test_monitoring_assignments_are_resumed(db, test_parking_lot):
+    """Test that stored assignments are resumed with staggered first ticks, highest priority first"""
+    lots = [test_parking_lot] + [
+        ParkingLot(
+            name=f"Lot {i}", address="-", city="-", state="-", zip_code="-",
+            latitude=0.0, longitude=0.0, camera_url=f"http://127.0.0.1:9/lot{i}.jpg"
+        )
+        for i in range(3)
+    ]
+    db.add_all(lots[1:])
+    db.commit()
+    
+    save_assignment(db, lots[0].id)  # No camera URL to use: skipped
+    save_assignment(db, lots[1].id, interval=20, engine="classifier")
+    save_assignment(db, lots[2].id, "http://127.0.0.1:9/override.jpg", priority=5)
+    save_assignment(db, lots[3].id)
+    deactivate_assignment(db, lots[3].id)
+    assert [assignment.parking_lot_id for assignment, _ in active_assignments(db)] == [
+        lots[2].id, lots[0].id, lots[1].id
+    ]
+    
+    manager = CameraManager()
+    try:
+        assert await manager.resume_monitoring(db, detector=None, warmup=100) == 2
+        assert manager.camera_urls == {
+            lots[2].id: "http://127.0.0.1:9/override.jpg",
+            lots[1].id: "http://127.0.0.1:9/lot0.jpg",
+        }
+        assert manager.engines[lots[1].id] == "classifier"
+        assert manager.intervals.lots[lots[1].id].base == 20
+        
+        now = asyncio.get_running_loop().time()
+        due = {key: camera.due - now for key, camera in manager.scheduler.cameras.items()}
+        assert due[lots[2].id] < 1 and 49 < due[lots[1].id] <= 50
+    finally:
+        await manager.close()
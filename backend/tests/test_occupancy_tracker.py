@@ -0,0 +1,51 @@
+"""
+Tests for smoothing per-slot occupancy
+"""
+
+from app.ai.camera_manager import CameraManager
+from app.ai.detector import ParkingSlotDetector
+from app.ai.inference import InferenceExecutor
+from app.ai.occupancy_tracker import OccupancyTracker
+
+
+def test_occupancy_tracker_hysteresis():
+    """Test that single-frame flickers are ignored and steady changes reported once"""
+    tracker = OccupancyTracker(window=3, enter_threshold=0.6, exit_threshold=0.4, min_dwell=60)
+    
+    assert tracker.update("cam", [1, 2], [0.0, 1.0], now=0) == [(1, False), (2, True)]
+    # A person walking past slot 1 for one frame
+    assert tracker.update("cam", [1, 2], [1.0, 1.0], now=30) == []
+    assert tracker.update("cam", [1, 2], [0.0, 1.0], now=60) == []
+    
+    # A car parks in slot 1: the smoothed score crosses at t=90, then must dwell 60s
+    assert tracker.update("cam", [1, 2], [1.0, 1.0], now=90) == []
+    assert tracker.update("cam", [1, 2], [1.0, 1.0], now=120) == []
+    assert tracker.update("cam", [1, 2], [1.0, 1.0], now=150) == [(1, True)]
+    assert tracker.update("cam", [1, 2], [1.0, 1.0], now=180) == []
+    
+    # Statuses survive a layout change for slots that remain
+    assert tracker.update("cam", [2, 3], [1.0, 0.0], now=210) == [(3, False)]
+    assert tracker.statuses("cam") == {2: "occupied", 3: "available"}
+    assert tracker.stats()["changes"] == 1
+
+
+async def test_stopped_lot_is_resynced():
+    """Test that a lot picked up again reports every slot's status on its first reading"""
+    results = {"slots": [{"slot_id": 5, "slot_number": "C1", "status": "occupied"}]}
+    detector = ParkingSlotDetector(InferenceExecutor(mode="thread"))
+    manager = CameraManager()
+    try:
+        await manager.start_monitoring(1, "http://127.0.0.1:9/lot.jpg", detector, delay=60)
+        assert len(detector.occupancy_tracker.update_results((1, "main"), results)) == 1
+        assert detector.occupancy_tracker.update_results((1, "main"), results) == []
+        
+        # Handed over and back: the slot may have been changed in the database meanwhile
+        await manager.stop_monitoring(1)
+        assert detector.occupancy_tracker.statuses((1, "main")) == {}
+        await manager.start_monitoring(1, "http://127.0.0.1:9/lot.jpg", detector, delay=60)
+        assert detector.occupancy_tracker.update_results((1, "main"), results) == [
+            {"slot_id": 5, "slot_number": "C1", "status": "occupied"}
+        ]
+    finally:
+        await manager.close()
+        await detector.close()
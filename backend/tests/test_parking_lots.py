@@ -86,6 +86,17 @@ def test_update_parking_lot(client, test_parking_lot, admin_headers):
     assert data["price_per_hour"] == 7.0
 
 
+def test_update_parking_lot_rejects_local_camera(client, test_parking_lot, admin_headers):
+    """Test that a lot's camera cannot be pointed at a file on the server"""
+    for camera_url in ("file:///etc/passwd", "/videos/lot.mjpg"):
+        response = client.put(
+            f"/api/v1/parking-lots/{test_parking_lot.id}",
+            json={"camera_url": camera_url},
+            headers=admin_headers
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 def test_delete_parking_lot(client, test_parking_lot, admin_headers):
     """Test deleting parking lot"""
     response = client.delete(
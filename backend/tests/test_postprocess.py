@@ -0,0 +1,29 @@
+"""
+Tests for post-processing YOLO results
+"""
+
+from types import SimpleNamespace
+
+from app.ai.postprocess import Detections
+from tests.helpers import FakeBoxes
+
+
+def test_detections_from_result():
+    """Test that vehicles are pulled out of a YOLO result as arrays in one pass"""
+    result = SimpleNamespace(
+        boxes=FakeBoxes(
+            [[0, 0, 10, 10], [5, 5, 20, 20], [1, 2, 3, 4], [7, 7, 9, 9]],
+            [0.5, 0.8, 0.25, 0.6],
+            [2, 0, 7, 12]
+        ),
+        names={0: "person", 2: "Car", 7: "truck"}
+    )
+    
+    vehicles = Detections.from_result(result)
+    assert vehicles.boxes.tolist() == [[0, 0, 10, 10], [1, 2, 3, 4]]
+    assert vehicles.to_list() == [
+        {"bbox": [0.0, 0.0, 10.0, 10.0], "confidence": 0.5, "class": "Car", "status": "occupied"},
+        {"bbox": [1.0, 2.0, 3.0, 4.0], "confidence": 0.25, "class": "truck", "status": "occupied"},
+    ]
+    assert len(Detections.from_result(result, vehicles_only=False)) == 4
+    assert len(Detections.from_result(SimpleNamespace(boxes=FakeBoxes([], [], []), names={}))) == 0
@@ -0,0 +1,78 @@
+"""
+Tests for reduced decoding and letterboxing of frames
+"""
+
+import cv2
+import numpy as np
+
+from app.ai import detector as detector_module
+from app.ai.detector import ParkingSlotDetector
+from app.ai.inference import InferenceExecutor
+from app.ai.preprocess import Letterboxer, decode_image, jpeg_size, max_reduction, restore_scale
+from app.ai.slot_layout import SlotLayout
+from app.core.config import settings
+from tests.helpers import dark_blob_model
+
+
+def test_reduced_decode():
+    """Test that JPEGs are sized from their header and decoded at reduced size"""
+    frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    data = cv2.imencode(".jpg", frame)[1].tobytes()
+    
+    assert jpeg_size(data) == (1080, 1920)
+    assert jpeg_size(cv2.imencode(".png", frame[:8, :8])[1].tobytes()) is None
+    assert decode_image(data, 2).shape == (540, 960, 3)
+    assert max_reduction(1920, 640) == 2
+    assert max_reduction(3840, 640) == 4
+    assert max_reduction(1000, 640) == 1
+    
+    results = {"image_shape": [540, 960, 3], "detections": [{"bbox": [10, 20, 30, 40]}]}
+    restored = restore_scale(results, (1080, 1920))
+    assert restored["detections"][0]["bbox"] == [20, 40, 60, 80]
+    assert restored["image_shape"] == [1080, 1920, 3]
+    # Cached results are left alone
+    assert results["detections"][0]["bbox"] == [10, 20, 30, 40]
+
+
+async def test_letterboxed_detection(monkeypatch):
+    """Test that the slot area is letterboxed into reused buffers and boxes mapped back"""
+    monkeypatch.setattr(detector_module, "AI_AVAILABLE", True)
+    monkeypatch.setattr(settings, "INFERENCE_TILING", "never")
+    frame = np.full((900, 1600, 3), 200, dtype=np.uint8)
+    frame[100:440, 170:470] = 0
+    # Outside the slot area, so never seen
+    frame[800:850, 1400:1500] = 0
+    layout = SlotLayout([1, 2], ["A1", "A2"], [
+        [[0.1, 0.1], [0.3, 0.1], [0.3, 0.5], [0.1, 0.5]],
+        [[0.3, 0.1], [0.5, 0.1], [0.5, 0.5], [0.3, 0.5]],
+    ])
+    
+    detector = ParkingSlotDetector(InferenceExecutor(mode="thread"))
+    detector.model = dark_blob_model
+    detector.model_loaded = True
+    try:
+        for _ in range(3):
+            results = await detector.detect_slots(frame, 1, layout)
+    finally:
+        await detector.close()
+    
+    assert len(results["detections"]) == 1
+    assert np.allclose(results["detections"][0]["bbox"], [170, 100, 470, 440], atol=2)
+    assert results["slots"][0]["status"] == "occupied"
+    assert detector.letterboxer.stats() == {"size": 640, "allocated": 1, "free": 1}
+    assert detector.decode_reduction((2160, 3840), layout) == 2
+    assert detector.decode_reduction((2160, 3840)) == 4
+
+
+def test_letterbox_round_trip():
+    """Test that letterboxed boxes map back onto the cropped frame"""
+    letterboxer = Letterboxer(size=64)
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    buffer, transform = letterboxer.letterbox(image, np.array([40, 20, 200, 100]))
+    
+    # 160x80 region scaled by 0.4 to 64x32, centred vertically
+    assert (transform.scale, transform.pad_x, transform.pad_y) == (0.4, 0, 16)
+    assert (buffer[:16] == 114).all() and (buffer[16:48] == 0).all()
+    assert transform.to_frame(np.array([[0, 16, 64, 48]])).tolist() == [[40, 20, 200, 100]]
+    letterboxer.release(buffer)
+    assert letterboxer.letterbox(image)[0] is buffer
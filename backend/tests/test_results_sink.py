@@ -0,0 +1,76 @@
+"""
+Tests for the batched monitoring results sink
+"""
+
+from sqlalchemy.orm import sessionmaker
+
+from app.ai.results_sink import ResultsSink
+from app.models.parking_lot import ParkingLot
+from app.models.parking_slot import ParkingSlot, SlotStatus
+from tests.helpers import wait_for
+
+
+class FakeRedis:
+    """Records what a Redis pipeline would write"""
+    
+    def __init__(self):
+        self.values = {}
+        self.round_trips = 0
+    
+    def pipeline(self, transaction=True):
+        return self
+    
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+    
+    def execute(self):
+        self.round_trips += 1
+
+
+async def test_results_sink_batches_changes(db, test_parking_lot):
+    """Test that results are written as one batch of real changes, cached and published"""
+    statuses = [SlotStatus.AVAILABLE, SlotStatus.AVAILABLE, SlotStatus.OCCUPIED, SlotStatus.RESERVED]
+    slots = [
+        ParkingSlot(parking_lot_id=test_parking_lot.id, slot_number=f"A{i}", status=status)
+        for i, status in enumerate(statuses)
+    ]
+    db.add_all(slots)
+    db.commit()
+    ids = [slot.id for slot in slots]
+    
+    published = []
+    redis_client = FakeRedis()
+    sink = ResultsSink(
+        session_factory=sessionmaker(bind=db.get_bind()),
+        redis_client=redis_client,
+        publish=published.extend,
+        flush_interval=60,
+        batch_max_size=3
+    )
+    try:
+        results = {"parking_lot_id": test_parking_lot.id, "available_slots": 1}
+        sink.submit(test_parking_lot.id, results, [
+            {"slot_id": ids[0], "status": "occupied"},
+            {"slot_id": ids[2], "status": "occupied"},  # Already occupied
+        ])
+        # A later change of the same slot wins; reserved slots are not overridden
+        sink.submit(test_parking_lot.id, results, [
+            {"slot_id": ids[1], "status": "occupied"},
+            {"slot_id": ids[1], "status": "available"},
+            {"slot_id": ids[3], "status": "occupied"},
+        ])
+        # Three pending slots fill the batch, so it is written without waiting
+        await wait_for(lambda: sink.stats()["flushes"] == 1)
+    finally:
+        await sink.close()
+    
+    db.expire_all()
+    assert [slot.status for slot in db.query(ParkingSlot).order_by(ParkingSlot.id)] == [
+        SlotStatus.OCCUPIED, SlotStatus.AVAILABLE, SlotStatus.OCCUPIED, SlotStatus.RESERVED
+    ]
+    assert db.get(ParkingLot, test_parking_lot.id).available_slots == 1
+    assert [(event.slot_id, event.status) for event in published[:1]] == [(ids[0], "occupied")]
+    assert published[1].available_slots == 1
+    assert redis_client.round_trips == 1
+    assert f"parking_lot:{test_parking_lot.id}:slots" in redis_client.values
+    assert sink.stats()["slot_updates"] == 1 and sink.stats()["unchanged"] == 3
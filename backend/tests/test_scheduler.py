@@ -0,0 +1,60 @@
+"""
+Tests for the central camera scheduler
+"""
+
+import asyncio
+
+import numpy as np
+
+from app.ai.scheduler import CameraScheduler
+
+
+async def test_scheduler_respects_budget_and_priority():
+    """Test that ticks stay within the concurrency budget and overload slows low priorities first"""
+    runs = {key: 0 for key in range(6)}
+    running = []
+    peak = [0]
+    
+    async def tick(key):
+        running.append(key)
+        peak[0] = max(peak[0], len(running))
+        try:
+            await asyncio.sleep(0.02)
+            runs[key] += 1
+        finally:
+            running.remove(key)
+    
+    # Six cameras wanting a tick every 20 ms, with room for two at a time
+    scheduler = CameraScheduler(tick, max_concurrent=2, jitter=0.1)
+    for key in range(6):
+        scheduler.schedule(key, interval=0.02, priority=10 if key == 0 else 0)
+    await asyncio.sleep(0.6)
+    stats, completed = scheduler.stats(), sum(runs.values())
+    await scheduler.remove(5)
+    assert 5 not in scheduler.cameras and 5 not in scheduler.running
+    await scheduler.stop()
+    
+    assert peak[0] == 2
+    # The high-priority camera keeps its interval; the others share what is left
+    assert runs[0] > 2 * np.mean([runs[key] for key in range(1, 6)])
+    assert stats["cameras"] == 6 and stats["dispatched"] == completed + stats["running"]
+    assert stats["late"] > 0 and stats["lag_p99_ms"] > 20
+    assert scheduler.dispatcher is None and not scheduler.running
+
+
+async def test_scheduler_spreads_first_ticks():
+    """Test that cameras added together start spread over one interval"""
+    started = []
+    
+    async def tick(key):
+        started.append(asyncio.get_running_loop().time())
+    
+    scheduler = CameraScheduler(tick, max_concurrent=100)
+    for key in range(50):
+        scheduler.schedule(key, interval=0.5)
+    begin = asyncio.get_running_loop().time()
+    await asyncio.sleep(0.45)
+    await scheduler.stop()
+    
+    offsets = np.array(started[:50]) - begin
+    assert len(offsets) >= 35 and offsets.std() > 0.08
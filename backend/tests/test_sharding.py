@@ -0,0 +1,100 @@
+"""
+Tests for sharding monitored lots across workers
+"""
+
+from sqlalchemy.orm import sessionmaker
+
+from app.ai.camera_manager import CameraManager
+from app.ai.monitoring_registry import save_assignment
+from app.ai.sharding import DatabaseLeaseStore, HashRing, LocalLeaseStore, MonitoringCoordinator
+from app.models.parking_lot import ParkingLot
+
+
+def create_lots(db, count: int):
+    lots = [
+        ParkingLot(
+            name=f"Lot {i}", address="-", city="-", state="-", zip_code="-",
+            latitude=0.0, longitude=0.0, camera_url=f"http://127.0.0.1:9/lot{i}.jpg"
+        )
+        for i in range(count)
+    ]
+    db.add_all(lots)
+    db.commit()
+    for lot in lots:
+        save_assignment(db, lot.id)
+    return [lot.id for lot in lots]
+
+
+def test_hash_ring_moves_few_lots():
+    """Test that lots spread evenly and a joining worker takes only its share"""
+    ring = HashRing(["a", "b", "c"], vnodes=64)
+    owners = {key: ring.owner(key) for key in range(3000)}
+    counts = [list(owners.values()).count(worker) for worker in "abc"]
+    assert min(counts) > 700
+    
+    grown = HashRing(["a", "b", "c", "d"], vnodes=64)
+    moved = [key for key in owners if grown.owner(key) != owners[key]]
+    assert all(grown.owner(key) == "d" for key in moved)
+    assert 500 < len(moved) < 1000
+
+
+def test_database_leases_are_exclusive(db):
+    """Test that a lease is held by one worker until released or expired"""
+    lot_ids = create_lots(db, 2)
+    store = DatabaseLeaseStore(sessionmaker(bind=db.get_bind()))
+    assert store.claim("a", lot_ids, now=0, ttl=30) == set(lot_ids)
+    assert store.claim("b", lot_ids, now=10, ttl=30) == set()
+    store.release("a", lot_ids[:1])
+    assert store.claim("b", lot_ids, now=20, ttl=30) == {lot_ids[0]}
+    # a's other lease lapsed without renewal
+    assert store.claim("b", lot_ids, now=31, ttl=30) == set(lot_ids)
+    
+    store.heartbeat("a", now=40)
+    store.heartbeat("b", now=55)
+    assert store.live_workers(now=60, ttl=30) == {"a", "b"}
+    assert store.live_workers(now=75, ttl=30) == {"b"}
+    store.leave("b")
+    assert store.live_workers(now=75, ttl=30) == set()
+    assert store.claim("a", lot_ids, now=76, ttl=30) == set(lot_ids)
+
+
+async def test_workers_share_and_take_over_lots(db):
+    """Test that workers split lots without overlap, rebalance on join and take over a dead worker's lots"""
+    lot_ids = create_lots(db, 12)
+    clock = [1000.0]
+    store = LocalLeaseStore()
+    
+    def worker(worker_id):
+        return MonitoringCoordinator(
+            CameraManager(), detector=None, store=store, worker_id=worker_id,
+            session_factory=sessionmaker(bind=db.get_bind()), heartbeat=10, lease_ttl=30,
+            warmup=300, clock=lambda: clock[0]
+        )
+    
+    a, b = worker("a"), worker("b")
+    try:
+        await a.rebalance()
+        assert set(a.owned) == set(lot_ids)
+        assert set(a.camera_manager.camera_urls) == set(lot_ids)
+        
+        # b joins: nothing is taken from a until a hands its share over
+        await b.rebalance()
+        assert not b.owned
+        await a.rebalance()
+        await b.rebalance()
+        assert set(a.owned) | set(b.owned) == set(lot_ids)
+        assert not set(a.owned) & set(b.owned) and a.owned and b.owned
+        assert set(b.camera_manager.camera_urls) == set(b.owned)
+        assert a.stats()["released"] == len(b.owned)
+        
+        # a dies: once its heartbeat and leases lapse, b takes everything
+        clock[0] += 31
+        await b.rebalance()
+        assert set(b.owned) == set(lot_ids)
+        assert b.stats()["workers"] == 1
+    finally:
+        await a.camera_manager.close()
+        await b.stop()
+        await b.camera_manager.close()
+    
+    assert not store.leases and "b" not in store.heartbeats
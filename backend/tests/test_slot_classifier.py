@@ -0,0 +1,50 @@
+"""
+Tests for the per-slot crop classifier engine
+"""
+
+import numpy as np
+
+from app.ai import detector as detector_module
+from app.ai.detector import ParkingSlotDetector
+from app.ai.inference import InferenceExecutor
+from app.ai.slot_classifier import SlotClassifier, slot_boxes
+from app.ai.slot_layout import SlotLayout
+from app.core.config import settings
+
+
+def test_slot_classifier_batches_crops():
+    """Test that every slot becomes one crop of the classifier batch"""
+    layout = SlotLayout([1, 2], ["A1", "A2"], [
+        [[0.0, 0.0], [0.5, 0.0], [0.5, 1.0], [0.0, 1.0]],
+        [[0.9, 0.9], [1.2, 0.9], [1.2, 1.2]],
+    ])
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    
+    assert slot_boxes(layout, frame.shape).tolist() == [[0, 0, 100, 100], [180, 90, 200, 100]]
+    assert SlotClassifier("unused.onnx", input_size=32).blob(frame, layout).shape == (2, 3, 32, 32)
+
+
+async def test_classifier_engine(monkeypatch, tmp_path):
+    """Test that the classifier engine reports per-slot statuses without YOLO"""
+    model_path = tmp_path / "slot_classifier.onnx"
+    model_path.touch()
+    monkeypatch.setattr(settings, "SLOT_CLASSIFIER_PATH", model_path)
+    monkeypatch.setattr(
+        detector_module, "predict_slots",
+        lambda path, size, image, layout: np.array([0.9, 0.1], dtype=np.float32)
+    )
+    layout = SlotLayout([7, 8], ["B1", "B2"], [
+        [[0.0, 0.0], [0.5, 0.0], [0.5, 1.0]],
+        [[0.5, 0.0], [1.0, 0.0], [1.0, 1.0]],
+    ])
+    detector = ParkingSlotDetector(InferenceExecutor(mode="thread"))
+    try:
+        results = await detector.detect_slots(
+            np.zeros((10, 10, 3), dtype=np.uint8), 1, layout, engine="classifier"
+        )
+    finally:
+        await detector.close()
+    
+    assert results["engine"] == "classifier"
+    assert (results["total_slots"], results["occupied_slots"]) == (2, 1)
+    assert [slot["status"] for slot in results["slots"]] == ["occupied", "available"]
@@ -0,0 +1,97 @@
+"""
+Tests for slot layouts and per-slot occupancy
+"""
+
+import numpy as np
+from fastapi import status
+
+from app.ai.slot_layout import LayoutCache, SlotLayout, layout_cache
+
+
+def test_slot_layout_occupancy():
+    """Test that boxes are mapped onto the slots they cover"""
+    layout = SlotLayout(
+        [1, 2, 3],
+        ["A1", "A2", "A3"],
+        [
+            [[0.0, 0.0], [0.3, 0.0], [0.3, 0.5], [0.0, 0.5]],
+            [[0.3, 0.0], [0.6, 0.0], [0.6, 0.5], [0.3, 0.5]],
+            [[0.6, 0.0], [1.0, 0.0], [0.8, 0.5]],
+        ]
+    )
+    # A car filling A1 and slightly overhanging A2, on a 1000x400 frame
+    boxes = np.array([[0, 0, 330, 200]], dtype=np.float32)
+    occupied, coverage = layout.occupancy(boxes, (400, 1000, 3), threshold=0.4)
+    
+    assert occupied.tolist() == [True, False, False]
+    assert coverage[0] > 0.95
+    assert 0 < coverage[1] < 0.2
+    
+    occupied, _ = layout.occupancy(np.zeros((0, 4)), (400, 1000, 3), threshold=0.4)
+    assert not occupied.any()
+
+
+def test_upload_slot_layout(client, db, test_parking_lot, admin_headers):
+    """Test uploading a camera layout and loading it for detection"""
+    from app.models.parking_slot import ParkingSlot
+    
+    db.add(ParkingSlot(parking_lot_id=test_parking_lot.id, slot_number="A1"))
+    db.commit()
+    
+    layout = {
+        "regions": [
+            {"slot_number": "A1", "polygon": [[0, 0], [0.5, 0], [0.5, 1], [0, 1]]},
+            {"slot_number": "A2", "polygon": [[0.5, 0], [1, 0], [1, 1], [0.5, 1]]},
+        ]
+    }
+    url = f"/api/v1/parking-lots/{test_parking_lot.id}/layouts/north"
+    
+    response = client.put(url, json=layout, headers=admin_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "A2" in response.json()["detail"]
+    
+    response = client.put(url, json=layout, params={"create_missing": True}, headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    regions = response.json()["regions"]
+    assert [region["slot_number"] for region in regions] == ["A1", "A2"]
+    
+    response = client.get(url)
+    assert response.json()["regions"] == regions
+    
+    compiled = layout_cache.get(db, test_parking_lot.id, "north")
+    assert compiled.slot_numbers == ["A1", "A2"]
+    assert db.query(ParkingSlot).filter(ParkingSlot.camera_detection_id == "north").count() == 2
+    
+    # Points outside the frame are rejected
+    layout["regions"][0]["polygon"][0] = [1.5, 0]
+    response = client.put(url, json=layout, headers=admin_headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    layout_cache.invalidate(test_parking_lot.id)
+
+
+def test_layout_cache_expires(db, test_parking_lot):
+    """Test that cached layouts, and their absence, are reloaded after the TTL"""
+    from app.models.parking_slot import ParkingSlot
+    from app.models.slot_region import SlotRegion
+    
+    clock = [0.0]
+    cache = LayoutCache(ttl=30, clock=lambda: clock[0])
+    assert cache.get(db, test_parking_lot.id) is None
+    
+    # Uploaded by another process, which cannot invalidate this cache
+    slot = ParkingSlot(parking_lot_id=test_parking_lot.id, slot_number="A1")
+    db.add(slot)
+    db.flush()
+    db.add(SlotRegion(
+        parking_lot_id=test_parking_lot.id, parking_slot_id=slot.id,
+        polygon=[[0, 0], [0.5, 0], [0.5, 0.5], [0, 0.5]]
+    ))
+    db.commit()
+    assert cache.get(db, test_parking_lot.id) is None
+    
+    clock[0] = 30
+    layout = cache.get(db, test_parking_lot.id)
+    assert layout.slot_numbers == ["A1"]
+    # Reloading an unchanged layout keeps the same object
+    clock[0] = 60
+    assert cache.get(db, test_parking_lot.id) is layout
@@ -0,0 +1,81 @@
+"""
+Tests for Server-Sent Events availability streaming
+"""
+
+from fastapi import status
+
+from app.api.v1.endpoints.stream import event_stream
+from app.websocket.manager import websocket_manager
+from app.websocket.sse import StreamConnection, format_cursor, parse_last_event_id
+
+
+class FakeRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def test_last_event_id_round_trip():
+    """Test encoding and decoding the per-lot resume cursor"""
+    event_id = format_cursor("abc123", {2: 17, 1: 42})
+    assert event_id == "abc123/1:42,2:17"
+    assert parse_last_event_id(event_id) == ("abc123", {1: 42, 2: 17})
+    assert parse_last_event_id("garbage") == (None, {})
+    assert parse_last_event_id("abc/1:x") == (None, {})
+
+
+async def test_event_stream_resumes_from_last_event_id():
+    """Test that a resumed stream only receives missed updates"""
+    lot_id = 9101
+    for slot_id in range(3):
+        await websocket_manager.broadcast_parking_update(lot_id, {str(slot_id): "occupied"})
+    last_seq = websocket_manager.get_topic(lot_id).seq - 1
+    
+    connection = StreamConnection("10.0.0.2", websocket_manager.epoch, {lot_id: last_seq}, queue_size=16)
+    assert websocket_manager.register_stream(connection)
+    stream = event_stream(FakeRequest(), connection, [lot_id], websocket_manager.epoch)
+    
+    assert (await stream.__anext__()).startswith("retry:")
+    assert "event: subscribed" in await stream.__anext__()
+    missed = await stream.__anext__()
+    assert "event: parking_update" in missed
+    assert f"id: {websocket_manager.epoch}/{lot_id}:{last_seq + 1}" in missed
+    
+    await websocket_manager.broadcast_parking_update(lot_id, {"0": "available"})
+    live = await stream.__anext__()
+    assert '"0":"available"' in live
+    
+    await stream.aclose()
+    assert connection not in websocket_manager.stream_connections
+    assert lot_id not in websocket_manager.lot_subscribers
+
+
+async def test_slow_stream_is_ended_after_overflow():
+    """Test that an overflowing stream delivers what it has and then ends"""
+    lot_id = 9102
+    connection = StreamConnection("10.0.0.3", websocket_manager.epoch, {}, queue_size=2)
+    assert websocket_manager.register_stream(connection)
+    stream = event_stream(FakeRequest(), connection, [lot_id], None)
+    await stream.__anext__()
+    
+    # subscribed + snapshot fill the queue; after one is read, the first
+    # update fits and the second overflows
+    events = []
+    async for event in stream:
+        events.append(event)
+        if len(events) == 1:
+            await websocket_manager.broadcast_parking_update(lot_id, {"1": "occupied"})
+            await websocket_manager.broadcast_parking_update(lot_id, {"2": "occupied"})
+    
+    assert len(events) == 3
+    assert '"1":"occupied"' in events[2]
+    assert connection.overflowed
+    assert connection not in websocket_manager.stream_connections
+
+
+def test_stream_rejects_too_many_lots(client):
+    """Test the per-stream lot limit"""
+    from app.core.config import settings
+    
+    lot_ids = list(range(1, settings.SSE_MAX_LOTS_PER_STREAM + 2))
+    response = client.get("/api/v1/stream/availability", params={"lot_ids": lot_ids})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,105 @@
+"""
+Tests for persistent camera stream readers
+"""
+
+import time
+
+import numpy as np
+
+from app.ai.monitoring_registry import active_assignments, save_assignment
+from app.ai.stream_reader import StreamReader, is_network_url, is_stream_url
+from app.api.v1.endpoints import ai as ai_endpoints
+from app.core.config import settings
+from tests.helpers import wait_for, write_video
+
+
+async def test_stream_reader_keeps_latest_frame(tmp_path):
+    """Test that a stream is read continuously and replayed after it ends"""
+    url = write_video(tmp_path / "lot.avi", frames=5, fps=50)
+    assert is_stream_url(url) and is_stream_url("rtsp://cam/1") and is_stream_url("http://cam/video.mjpg")
+    assert not is_stream_url("http://cam/snapshot.jpg")
+    
+    reader = StreamReader(url)
+    reader.start()
+    try:
+        await wait_for(lambda: reader.frame_id > 7)
+        frame_id, frame = reader.latest()
+    finally:
+        reader.stop()
+    
+    assert frame_id > 7 and frame.shape == (240, 320, 3)
+    # The file was played again from the start
+    assert reader.reconnects >= 1
+    assert reader.thread is None and not reader.connected
+    assert reader.latest(max_age=0) is None
+
+
+class FlakyCapture:
+    """Capture that fails to open a few times, then delivers frames"""
+    
+    def __init__(self, attempts: list):
+        attempts.append(time.monotonic())
+        self.opened = len(attempts) > 3
+    
+    def isOpened(self):
+        return self.opened
+    
+    def get(self, prop):
+        return 0
+    
+    def read(self, image=None):
+        time.sleep(0.01)
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+    
+    def release(self):
+        pass
+
+
+async def test_stream_reader_backs_off():
+    """Test that failed opens are retried with a doubling delay"""
+    attempts = []
+    reader = StreamReader(
+        "rtsp://cam/1", backoff_min=0.05, backoff_max=0.1,
+        open_capture=lambda source: FlakyCapture(attempts)
+    )
+    reader.start()
+    try:
+        await wait_for(lambda: reader.frame_id > 0)
+        stats = reader.stats()
+    finally:
+        reader.stop()
+    
+    delays = np.diff(attempts)
+    assert len(attempts) == 4 and stats["reconnects"] == 3 and stats["connected"]
+    assert delays[0] >= 0.05 and delays[1] >= 0.1 and delays[2] < 0.15
+
+
+def test_request_camera_urls_must_be_remote(client, db, test_parking_lot, monkeypatch):
+    """Test that camera URLs opening local files are refused unless CAMERA_ALLOW_FILE_URLS is set"""
+    assert is_network_url("rtsp://cam/1") and is_network_url("http://cam:8080/video.mjpg")
+    assert not is_network_url("file:///etc/passwd") and not is_network_url("/videos/lot.mjpg")
+    assert not is_network_url("http:///etc/lot.mjpg")
+    
+    monkeypatch.setattr(ai_endpoints, "detector", object())
+    monkeypatch.setattr(ai_endpoints, "camera_manager", object())
+    response = client.post(
+        "/api/v1/ai/detect-from-url",
+        params={"parking_lot_id": test_parking_lot.id, "camera_url": "file:///etc/passwd"}
+    )
+    assert response.status_code == 400
+    response = client.post(
+        f"/api/v1/ai/parking-lot/{test_parking_lot.id}/start-monitoring",
+        params={"camera_url": "/videos/lot.mjpg"}
+    )
+    assert response.status_code == 400
+    
+    # Nor through the lot's own camera, whichever way it got there
+    test_parking_lot.camera_url = "file:///etc/passwd"
+    db.commit()
+    response = client.post(f"/api/v1/ai/parking-lot/{test_parking_lot.id}/start-monitoring")
+    assert response.status_code == 400
+    save_assignment(db, test_parking_lot.id)
+    assert [camera_url for _, camera_url in active_assignments(db)] == [None]
+    
+    monkeypatch.setattr(settings, "CAMERA_ALLOW_FILE_URLS", True)
+    assert [camera_url for _, camera_url in active_assignments(db)] == ["file:///etc/passwd"]
@@ -0,0 +1,77 @@
+"""
+Tests for tiled inference on high-resolution frames
+"""
+
+import numpy as np
+
+from app.ai import detector as detector_module
+from app.ai.detector import ParkingSlotDetector
+from app.ai.inference import InferenceExecutor
+from app.ai.postprocess import Detections
+from app.ai.slot_layout import SlotLayout
+from app.ai.tiling import layout_tiles, merge_tile_detections, suppress_duplicates, tile_grid
+from app.core.config import settings
+from tests.helpers import dark_blob_model
+
+
+def test_tile_layout():
+    """Test that tiles overlap, cover the frame and skip areas without slots"""
+    tiles = tile_grid((2160, 3840, 3), tile_size=640, overlap=0.2)
+    assert len(tiles) == 8 * 4
+    assert tiles[:, 2].max() == 3840 and tiles[:, 3].max() == 2160
+    assert tiles[1, 0] == 512
+    
+    # One row of slots along the bottom left of the frame
+    layout = SlotLayout([1, 2], ["A1", "A2"], [
+        [[0.01, 0.9], [0.05, 0.9], [0.05, 0.99], [0.01, 0.99]],
+        [[0.05, 0.9], [0.09, 0.9], [0.09, 0.99], [0.05, 0.99]],
+    ])
+    assert layout_tiles((2160, 3840, 3), layout).tolist() == [[0, 1520, 640, 2160]]
+
+
+def test_merge_tile_detections():
+    """Test that a car seen by two overlapping tiles is reported once, uncut"""
+    tiles = np.array([[0, 0, 640, 640], [512, 0, 1152, 640]])
+    # The left tile cuts the car at its right edge, yet is more confident
+    left = Detections([[560, 100, 640, 200], [10, 10, 60, 60]], [0.9, 0.8], [2, 2])
+    right = Detections([[48, 100, 188, 200]], [0.85], [2])
+    merged = merge_tile_detections([left, right], tiles, (640, 1152, 3))
+    
+    assert merged.boxes.tolist() == [[560, 100, 700, 200], [10, 10, 60, 60]]
+    
+    # Only the left tile was kept, but the frame goes on to its right: a box
+    # at that edge is still cut off and ranks below a complete one
+    left = Detections([[560, 100, 640, 200], [540, 100, 630, 200]], [0.9, 0.8], [2, 2])
+    merged = merge_tile_detections([left], tiles[:1], (1080, 1920, 3))
+    assert merged.boxes.tolist() == [[540, 100, 630, 200]]
+
+
+def test_suppressed_boxes_do_not_suppress():
+    """Test that a box overlapping only a suppressed box is kept, as in greedy NMS"""
+    # A overlaps B, B overlaps C, A and C do not overlap
+    boxes = np.array([[0, 0, 100, 100], [30, 0, 130, 100], [60, 0, 160, 100]], dtype=float)
+    keep = suppress_duplicates(boxes, np.array([0.9, 0.8, 0.7]), np.zeros(3), np.zeros(3), iou_threshold=0.5)
+    assert keep.tolist() == [0, 2]
+
+
+async def test_tiled_detection(monkeypatch):
+    """Test that large frames are detected tile by tile and merged"""
+    monkeypatch.setattr(detector_module, "AI_AVAILABLE", True)
+    monkeypatch.setattr(settings, "INFERENCE_TILING", "always")
+    frame = np.full((900, 1600, 3), 200, dtype=np.uint8)
+    frame[100:150, 200:260] = 0
+    # Straddles the border between the first and second tile columns
+    frame[400:450, 600:700] = 0
+    
+    detector = ParkingSlotDetector(InferenceExecutor(mode="thread"))
+    detector.model = dark_blob_model
+    detector.model_loaded = True
+    try:
+        results = await detector.detect_slots(frame, 1)
+    finally:
+        await detector.close()
+    
+    assert results["tiles"] == 6
+    assert sorted(d["bbox"] for d in results["detections"]) == [
+        [200.0, 100.0, 260.0, 150.0], [600.0, 400.0, 700.0, 450.0]
+    ]
@@ -0,0 +1,217 @@
+"""
+Tests for WebSocket real-time updates
+"""
+
+import pytest
+
+from app.websocket.manager import websocket_manager
+from app.websocket.topics import LotTopic
+
+
+def test_topic_sequences_and_replays():
+    """Test that topics number messages and replay what a client missed"""
+    topic = LotTopic(parking_lot_id=1, buffer_size=3)
+    for i in range(5):
+        topic.publish({"type": "parking_update", "slots": {i: "occupied"}})
+    
+    assert topic.seq == 5
+    assert [m["seq"] for m in topic.since(3)] == [4, 5]
+    assert topic.since(5) == []
+    # Sequence 2 has been evicted from the buffer, so a snapshot is needed
+    assert topic.since(1) is None
+    assert topic.since(9) is None
+    
+    snapshot = topic.snapshot()
+    assert snapshot["seq"] == 5
+    assert len(snapshot["slots"]) == 5
+
+
+def test_websocket_subscribe_and_resume(client):
+    """Test subscribing to a lot and resuming from the last sequence number"""
+    lot_id = 9001
+    
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"type": "subscribe", "parking_lot_id": lot_id})
+        subscribed = websocket.receive_json()
+        assert subscribed["type"] == "subscribed"
+        assert websocket.receive_json()["type"] == "snapshot"
+        
+        client.portal.call(websocket_manager.broadcast_parking_update, lot_id, {"1": "occupied"})
+        update = websocket.receive_json()
+        assert update["type"] == "parking_update"
+        assert update["seq"] == subscribed["seq"] + 1
+        epoch = update["epoch"]
+        last_seq = update["seq"]
+    
+    # Updates published while disconnected are replayed on resume
+    client.portal.call(websocket_manager.broadcast_parking_update, lot_id, {"2": "occupied"})
+    client.portal.call(websocket_manager.broadcast_parking_update, lot_id, {"1": "available"})
+    
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({
+            "type": "subscribe",
+            "parking_lot_id": lot_id,
+            "last_seq": last_seq,
+            "epoch": epoch
+        })
+        assert websocket.receive_json()["type"] == "subscribed"
+        missed = [websocket.receive_json(), websocket.receive_json()]
+        assert [m["seq"] for m in missed] == [last_seq + 1, last_seq + 2]
+        assert missed[1]["slots"] == {"1": "available"}
+    
+    # An unknown epoch always gets a snapshot
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({
+            "type": "subscribe",
+            "parking_lot_id": lot_id,
+            "last_seq": last_seq,
+            "epoch": "stale"
+        })
+        assert websocket.receive_json()["type"] == "subscribed"
+        snapshot = websocket.receive_json()
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["slots"] == {"1": "available", "2": "occupied"}
+
+
+def test_snapshot_is_seeded_from_database(client, db, test_parking_lot):
+    """Test that the first subscriber gets the stored lot state, not an empty snapshot"""
+    from app.models.parking_slot import ParkingSlot, SlotStatus
+    
+    slots = [
+        ParkingSlot(parking_lot_id=test_parking_lot.id, slot_number=f"S{i}", status=status)
+        for i, status in enumerate([SlotStatus.AVAILABLE, SlotStatus.OCCUPIED])
+    ]
+    db.add_all(slots)
+    db.commit()
+    websocket_manager.topics.pop(test_parking_lot.id, None)
+    
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"type": "subscribe", "parking_lot_id": test_parking_lot.id})
+        assert websocket.receive_json()["type"] == "subscribed"
+        snapshot = websocket.receive_json()
+        assert snapshot["slots"] == {str(slots[0].id): "available", str(slots[1].id): "occupied"}
+        assert snapshot["summary"] == {"total_slots": 10, "available_slots": 5}
+
+
+def test_websocket_msgpack_protocol(client):
+    """Test negotiating the compact MessagePack protocol"""
+    msgpack = pytest.importorskip("msgpack")
+    from app.websocket.codec import PROTOCOL_MSGPACK, STATUS_CODES
+    
+    lot_id = 9002
+    with client.websocket_connect("/ws", subprotocols=[PROTOCOL_MSGPACK]) as websocket:
+        assert websocket.accepted_subprotocol == PROTOCOL_MSGPACK
+        websocket.send_bytes(msgpack.packb({"type": "subscribe", "parking_lot_id": lot_id}))
+        assert msgpack.unpackb(websocket.receive_bytes())["type"] == "subscribed"
+        assert msgpack.unpackb(websocket.receive_bytes())["t"] == 2
+        
+        client.portal.call(
+            websocket_manager.broadcast_parking_update, lot_id, {"5": "occupied", "6": "available"}
+        )
+        update = msgpack.unpackb(websocket.receive_bytes())
+        assert update["t"] == 1
+        assert update["l"] == lot_id
+        assert update["u"] == [5, STATUS_CODES["occupied"], 6, STATUS_CODES["available"]]
+
+
+def test_encoded_message_is_serialized_once_per_protocol():
+    """Test that frames are cached per protocol"""
+    from app.websocket.codec import EncodedMessage, PROTOCOL_JSON
+    
+    encoded = EncodedMessage({"type": "parking_update", "parking_lot_id": 1, "slots": {}})
+    assert encoded.frame(None) is encoded.frame(PROTOCOL_JSON)
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a Starlette WebSocket"""
+    
+    def __init__(self, host="10.0.0.1", headers=None):
+        self.scope = {"subprotocols": []}
+        self.client = type("Address", (), {"host": host})()
+        self.headers = headers or {}
+        self.sent = []
+        self.accepted = False
+        self.close_code = None
+    
+    async def accept(self, subprotocol=None):
+        self.accepted = True
+    
+    async def send_text(self, text):
+        self.sent.append(text)
+    
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+async def test_multiple_connections_per_user_and_limits():
+    """Test that a user's devices are all tracked and limits are enforced"""
+    from app.websocket.manager import WebSocketManager
+    
+    manager = WebSocketManager()
+    manager.max_connections_per_user = 2
+    phone, tablet, laptop = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    
+    assert await manager.connect(phone, user_id=7) is not None
+    assert await manager.connect(tablet, user_id=7) is not None
+    assert await manager.connect(laptop, user_id=7) is None
+    assert laptop.close_code == 1008
+    assert len(manager.user_connections[7]) == 2
+    
+    await manager.send_to_user(7, {"type": "booking_reminder"})
+    assert len(phone.sent) == 1 and len(tablet.sent) == 1
+    
+    manager.disconnect(phone)
+    assert len(manager.user_connections[7]) == 1
+    assert manager.ip_connections["10.0.0.1"] == 1
+
+
+async def test_per_ip_limit_uses_forwarded_address():
+    """Test that behind a trusted proxy clients are limited by their own address"""
+    from app.websocket.manager import WebSocketManager
+    
+    manager = WebSocketManager()
+    manager.max_connections_per_ip = 1
+    
+    def proxied(client):
+        return FakeWebSocket(host="10.0.0.254", headers={"x-forwarded-for": f"1.2.3.4, {client}"})
+    
+    # Untrusted, everyone shares the proxy's address
+    assert await manager.connect(proxied("203.0.113.1")) is not None
+    assert await manager.connect(proxied("203.0.113.2")) is None
+    
+    manager.trust_forwarded_for = True
+    assert await manager.connect(proxied("203.0.113.2")) is not None
+    assert await manager.connect(proxied("203.0.113.2")) is None
+    assert set(manager.ip_connections) == {"10.0.0.254", "203.0.113.2"}
+
+
+async def test_idle_connections_are_pinged_and_reaped():
+    """Test heartbeat pings quiet clients and reaps silent ones"""
+    from app.websocket.manager import WebSocketManager
+    
+    manager = WebSocketManager()
+    manager.ping_interval = 0
+    manager.idle_timeout = 60
+    websocket = FakeWebSocket()
+    connection = await manager.connect(websocket)
+    await manager.subscribe(connection, parking_lot_id=9003)
+    websocket.sent.clear()
+    
+    await manager.reap_idle_connections()
+    assert '"type":"ping"' in websocket.sent[0]
+    
+    connection.last_seen -= 120
+    await manager.reap_idle_connections()
+    assert websocket.close_code == 1001
+    assert websocket not in manager.active_connections
+    assert 9003 not in manager.lot_subscribers
+    assert manager.ip_connections == {}
+
+
+def test_websocket_rejects_invalid_token(client):
+    """Test that an invalid token is refused during the handshake"""
+    from starlette.websockets import WebSocketDisconnect
+    
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/ws?token=not-a-jwt"):
+            pass